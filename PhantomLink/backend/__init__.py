@@ -3,6 +3,7 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import os
 import secrets
+from server_session import create_session_interface
 
 # Initialize SQLAlchemy (without passing `app` yet)
 db = SQLAlchemy()
@@ -38,6 +39,9 @@ def create_app():
     # Initialize database with the app
     db.init_app(app)
 
+    # Keep session data on the server; the cookie only holds the session ID
+    app.session_interface = create_session_interface(db)
+
     return app
 
 # Create app instance
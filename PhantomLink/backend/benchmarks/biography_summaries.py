@@ -0,0 +1,65 @@
+"""
+Compares the biography kept in a ghost prompt by the extractive summarizer with
+plain truncation to the same token budget, over a directory of saved person
+pages (*.html, parsed with wiki_parser.parse_person_page).
+
+For each page it reports the article size, the summarizer's run time, and the
+share of the article's distinct content words each approach keeps (a rough
+measure of how much of the whole life story reaches the prompt). With --show
+it prints both versions for the first page.
+
+Usage:
+    python benchmarks/biography_summaries.py path/to/person_pages [--tokens 450] [--show]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import wiki_parser
+from context_window import estimate_tokens, truncate_to_tokens
+from prompt_builder import CITATION
+from summarizer import STOPWORDS, WORD, summarize
+
+
+def content_words(text):
+    return {word for word in WORD.findall(text.lower()) if word not in STOPWORDS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixture_dir")
+    parser.add_argument("--tokens", type=int, default=450, help="Biography budget (what PROMPT_TOKEN_BUDGET leaves after the persona text).")
+    parser.add_argument("--show", action="store_true")
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(args.fixture_dir, "*.html")))
+    if not pages:
+        print(f"No *.html fixtures found in {args.fixture_dir}")
+        return
+
+    print(f"{'page':32} {'tokens':>7} {'summary ms':>11} {'truncated':>10} {'summary':>8}")
+    for number, path in enumerate(pages):
+        with open(path, encoding="utf-8") as f:
+            page = wiki_parser.parse_person_page(f.read())
+        biography = CITATION.sub("", "\n\n".join(page["paragraphs"])).strip()
+        vocabulary = content_words(biography) or {""}
+
+        start = time.perf_counter()
+        summary = summarize(biography, args.tokens)
+        elapsed = time.perf_counter() - start
+        truncated = truncate_to_tokens(biography, args.tokens)
+
+        print(
+            f"{os.path.basename(path)[:32]:32} {estimate_tokens(biography):7} {elapsed * 1000:11.1f} "
+            f"{len(content_words(truncated)) / len(vocabulary):10.0%} {len(content_words(summary)) / len(vocabulary):8.0%}"
+        )
+        if args.show and number == 0:
+            print(f"\n--- truncated ---\n{truncated}\n\n--- summary ---\n{summary}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark for the list-page candidate extractor.
+
+Reads saved "List of people from" pages (*.html) from a fixture directory and reports,
+for each page, the number of candidates and the expected number of person-page fetches
+per successful pick, before (every /wiki/ anchor) and after (extract_candidate_links).
+
+When the directory has an expected_people.json (file name -> the people the page
+lists), it also reports how many of them each extractor finds and how many other
+links it returns. extract_candidate_links must find every listed person, in page
+order, among the links the original extractor returned; the script exits with 1
+if it doesn't. benchmarks/fixtures/list_pages holds a full page and an action=parse
+body and is used by default.
+
+The expected fetch count treats the people in expected_people.json as the ones a pick
+is looking for: drawing without replacement from n candidates of which k are listed
+people takes (n + 1) / (k + 1) fetches on average. The fixtures don't record who is
+deceased, so this compares the extractors rather than predicting live fetch counts.
+Pages are parsed with wiki_parser.parse_html, like the scraper does.
+
+Usage:
+    python benchmarks/candidate_extraction.py [path/to/list_pages]
+"""
+import glob
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from wiki_parser import parse_html
+from wiki_scraper import extract_candidate_links
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "list_pages")
+
+
+def extract_all_links(soup):
+    """The original extractor: every /wiki/ anchor on the page."""
+    links = []
+    for anchor in soup.find_all('a', href=True):
+        href = anchor['href']
+        if href.startswith('/wiki/') and ':' not in href and '#' not in href:
+            links.append(f"https://en.wikipedia.org{href}")
+    return links
+
+
+def expected_fetches(candidates, people):
+    """Returns the average fetches until a listed person is drawn, or None if none is a candidate."""
+    hits = len(set(candidates) & set(people or ()))
+    if not hits:
+        return None
+    return (len(candidates) + 1) / (hits + 1)
+
+
+def format_fetches(fetches):
+    # The page has no expected_people.json entry, or none of its people were extracted
+    return f"{fetches:.1f}" if fetches else "-"
+
+
+def check_candidates(before, after, people):
+    """Returns the problems with the new extractor's output for a page listing `people`."""
+    problems = []
+    missing = [url for url in people if url not in after]
+    if missing:
+        problems.append(f"missing {', '.join(missing)}")
+    if [url for url in after if url in people] != [url for url in people if url in after]:
+        problems.append("people out of page order")
+    extra = set(after) - set(before)
+    if extra:
+        problems.append(f"not on the original list: {', '.join(sorted(extra))}")
+    return problems
+
+
+def main(fixture_dir):
+    pages = sorted(glob.glob(os.path.join(fixture_dir, "*.html")))
+    if not pages:
+        print(f"No *.html fixtures found in {fixture_dir}")
+        return 0
+
+    expected_path = os.path.join(fixture_dir, "expected_people.json")
+    expected = {}
+    if os.path.exists(expected_path):
+        with open(expected_path, encoding="utf-8") as f:
+            expected = json.load(f)
+
+    failures = 0
+    print(f"{'page':40} {'before':>8} {'after':>8} {'people':>12} {'fetches before':>15} {'fetches after':>14}")
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            soup = parse_html(f.read())
+
+        before = extract_all_links(soup)
+        after = extract_candidate_links(soup)
+        people = expected.get(os.path.basename(path))
+        fetches_before = expected_fetches(before, people)
+        fetches_after = expected_fetches(after, people)
+        found = f"{len(set(people) & set(after))}/{len(people)}" if people else "-"
+        print(
+            f"{os.path.basename(path)[:40]:40} {len(before):8} {len(after):8} {found:>12} "
+            f"{format_fetches(fetches_before):>15} {format_fetches(fetches_after):>14}"
+        )
+        if people:
+            for problem in check_candidates(before, after, people):
+                failures += 1
+                print(f"    FAIL {problem}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print(__doc__)
+        sys.exit(1)
+    sys.exit(main(sys.argv[1] if len(sys.argv) == 2 else FIXTURE_DIR))
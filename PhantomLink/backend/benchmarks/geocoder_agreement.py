@@ -0,0 +1,75 @@
+"""
+Checks that the offline geocoder names the same city and state as expected.
+
+Every point in fixtures/geocode_points.json is labelled with its city and state.
+The offline answer is compared with that label and, with --online, with a live
+Nominatim answer for the same point (one request per second). Exits non-zero
+when the offline agreement rate is below --min-agreement.
+
+Usage:
+    GEONAMES_CITIES_FILE=cities1000.txt GEONAMES_ADMIN1_FILE=admin1CodesASCII.txt \
+        python benchmarks/geocoder_agreement.py [--online] [--min-agreement 0.9]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import offline_geocoder
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "geocode_points.json")
+
+
+def same_place(a, b):
+    return bool(a and b) and a["city"].casefold() == b["city"].casefold() and (a["state"] or "").casefold() == (b["state"] or "").casefold()
+
+
+def nominatim_place(latitude, longitude):
+    import geocode_cache
+
+    location = geocode_cache.geolocator.reverse((latitude, longitude), exactly_one=True)
+    if not location:
+        return None
+    address = location.raw.get("address", {})
+    return {"city": address.get("city") or address.get("town") or address.get("village") or "", "state": address.get("state")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--online", action="store_true", help="Also compare against live Nominatim answers.")
+    parser.add_argument("--min-agreement", type=float, default=0.9)
+    args = parser.parse_args()
+
+    with open(FIXTURE) as f:
+        points = json.load(f)
+
+    agreed = online_agreed = 0
+    for point in points:
+        expected = {"city": point["city"], "state": point["state"]}
+        offline = offline_geocoder.lookup(point["latitude"], point["longitude"])
+        match = same_place(offline, expected)
+        agreed += match
+
+        line = f"{'ok  ' if match else 'DIFF'} {point['city']}, {point['state']} -> "
+        line += f"{offline['city']}, {offline['state']} ({offline['distance_km']} km)" if offline else "no city in radius"
+        if args.online:
+            online = nominatim_place(point["latitude"], point["longitude"])
+            online_match = same_place(offline, online)
+            online_agreed += online_match
+            line += f" | Nominatim: {online['city']}, {online['state']}" if online else " | Nominatim: none"
+            line += "" if online_match else " (differs)"
+            time.sleep(1)
+        print(line)
+
+    rate = agreed / len(points)
+    print(f"\nOffline vs fixture labels: {agreed}/{len(points)} ({rate:.0%})")
+    if args.online:
+        print(f"Offline vs Nominatim: {online_agreed}/{len(points)} ({online_agreed / len(points):.0%})")
+    sys.exit(0 if rate >= args.min_agreement else 1)
+
+
+if __name__ == "__main__":
+    main()
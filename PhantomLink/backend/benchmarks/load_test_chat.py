@@ -0,0 +1,125 @@
+"""
+Concurrent-chat load test for the backend.
+
+Starts CONCURRENCY simulated users. Each one shares a location once and then sends
+/chat messages in a loop. The script reports throughput, latency percentiles and
+how many chats were in flight at once. With sync workers, throughput is capped at
+GUNICORN_WORKERS / OpenAI latency. With gthread or gevent workers, it should keep
+scaling with the number of concurrent users.
+
+To measure the server rather than OpenAI, run a stub OpenAI endpoint that sleeps
+before answering and point the backend at it:
+
+    python benchmarks/load_test_chat.py --stub-openai 8001 --stub-delay 2
+    OPENAI_API_BASE=http://localhost:8001/v1 gunicorn -c gunicorn.conf.py server:app
+
+Then, in another shell:
+
+    python benchmarks/load_test_chat.py --base-url http://localhost:5000 --concurrency 64 --duration 30
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+def serve_stub_openai(port, delay):
+    """Serves a minimal /v1/chat/completions endpoint that answers after `delay` seconds."""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            body = json.dumps({
+                "id": "stub",
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "Boo..."}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    print(f"Stub OpenAI listening on http://localhost:{port}/v1 (delay {delay}s)")
+    ThreadingHTTPServer(("0.0.0.0", port), StubHandler).serve_forever()
+
+
+def run_user(base_url, latitude, longitude, deadline, results, in_flight, lock):
+    client = requests.Session()
+    response = client.post(f"{base_url}/location", json={"latitude": latitude, "longitude": longitude}, timeout=60)
+    if response.status_code != 200:
+        results.append((False, 0.0))
+        return
+
+    while time.time() < deadline:
+        with lock:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight[1], in_flight[0])
+        start = time.time()
+        try:
+            response = client.post(f"{base_url}/chat", json={"message": "Hello, is anyone there?"}, timeout=300)
+            ok = response.status_code == 200
+        except requests.exceptions.RequestException:
+            ok = False
+        results.append((ok, time.time() - start))
+        with lock:
+            in_flight[0] -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--latitude", type=float, default=47.6588)
+    parser.add_argument("--longitude", type=float, default=-117.4260)
+    parser.add_argument("--stub-openai", type=int, metavar="PORT", help="only run the stub OpenAI server")
+    parser.add_argument("--stub-delay", type=float, default=2.0)
+    args = parser.parse_args()
+
+    if args.stub_openai:
+        serve_stub_openai(args.stub_openai, args.stub_delay)
+        return
+
+    results = []
+    in_flight = [0, 0]
+    lock = threading.Lock()
+    deadline = time.time() + args.duration
+    users = [
+        threading.Thread(
+            target=run_user,
+            args=(args.base_url, args.latitude, args.longitude, deadline, results, in_flight, lock),
+        )
+        for _ in range(args.concurrency)
+    ]
+    start = time.time()
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.time() - start
+
+    latencies = sorted(latency for ok, latency in results if ok)
+    failures = sum(1 for ok, _ in results if not ok)
+    if not latencies:
+        print(f"No successful chats ({failures} failures)")
+        return
+
+    print(f"Users:            {args.concurrency}")
+    print(f"Successful chats: {len(latencies)} ({failures} failures) in {elapsed:.1f}s")
+    print(f"Throughput:       {len(latencies) / elapsed:.2f} chats/s")
+    print(f"Latency p50/p95:  {statistics.median(latencies):.2f}s / {latencies[int(len(latencies) * 0.95) - 1]:.2f}s")
+    print(f"Peak in flight:   {in_flight[1]}")
+
+
+if __name__ == "__main__":
+    main()
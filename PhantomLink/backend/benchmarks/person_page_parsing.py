@@ -0,0 +1,145 @@
+"""
+Micro-benchmark for parsing Wikipedia person pages.
+
+Compares the original path (full html.parser tree, then the deceased check, the
+details lookup and the <p> collection each walking it) with
+wiki_parser.parse_person_page, over a directory of saved person pages (*.html).
+Reports the best parse time and the peak traced memory per page for each, and
+checks that both paths read the same verdict, details, paragraphs and infobox image
+(exiting with 1 if they don't). benchmarks/fixtures/person_pages is used by default.
+
+The original path is kept here, as it was in wiki_scraper before the scraper moved to
+parse_person_page, so there is still something to measure against.
+
+Usage:
+    python benchmarks/person_page_parsing.py [path/to/person_pages] [--repeat 5]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup
+import wiki_parser
+from grab_picture import extract_infobox_image
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "person_pages")
+
+
+def is_person_deceased(soup):
+    infobox = soup.find('table', {'class': 'infobox'})
+    if infobox:
+        born_row = infobox.find('th', string='Born')
+        died_row = infobox.find('th', string='Died')
+        if born_row and died_row:
+            birth_date = born_row.find_next('td').get_text(strip=True)
+            death_date = died_row.find_next('td').get_text(strip=True)
+            if birth_date and death_date:
+                return True
+    return False
+
+
+def extract_person_details(soup):
+    try:
+        name = soup.find('h1', {'id': 'firstHeading'}).get_text()
+        infobox = soup.find('table', {'class': 'infobox'})
+        birth_year = death_year = occupation = None
+        if infobox:
+            birth_row = infobox.find('th', string='Born')
+            death_row = infobox.find('th', string='Died')
+            occupation_row = infobox.find('th', string='Occupation')
+            if birth_row:
+                match = re.search(r'\d{4}', birth_row.find_next('td').get_text(strip=True))
+                birth_year = int(match.group(0)) if match else None
+            if death_row:
+                death_info = death_row.find_next('td')
+                match = re.search(r'(\d{4})', death_info.text) if death_info else None
+                if match:
+                    death_year = match.group(1)
+            if occupation_row:
+                occupation = occupation_row.find_next('td').get_text(strip=True)
+        return name, birth_year, death_year, occupation
+    except Exception:
+        return None, None, None, None
+
+
+def parse_original(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    deceased = is_person_deceased(soup)
+    details = extract_person_details(soup)
+    paragraphs = [p.get_text() for p in soup.select('p') if p.get_text(strip=True)]
+    image_url = extract_infobox_image(soup)
+    return deceased, details, paragraphs, image_url
+
+
+def compare(html):
+    """Returns the fields parse_person_page reads differently from the original path."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        deceased, details, paragraphs, image_url = parse_original(html)
+    page = wiki_parser.parse_person_page(html)
+    new = {
+        "is_deceased": page["is_deceased"],
+        "details": (page["name"], page["birth_year"], page["death_year"], page["occupation"]),
+        "paragraphs": page["paragraphs"],
+        "image_url": page["image_url"],
+    }
+    original = {"is_deceased": deceased, "details": details, "paragraphs": paragraphs, "image_url": image_url}
+    return [field for field in original if original[field] != new[field]]
+
+
+def measure(function, html, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # extract_infobox_image prints when a page has no infobox
+            function(html)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixture_dir", nargs="?", default=FIXTURE_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = sorted(glob.glob(os.path.join(args.fixture_dir, "*.html")))
+    if not pages:
+        print(f"No *.html fixtures found in {args.fixture_dir}")
+        return 0
+
+    failures = 0
+    print(f"parse_person_page uses the {wiki_parser.PARSER} parser")
+    print(f"{'page':32} {'KB':>6} {'original ms':>12} {'new ms':>8} {'original MB':>12} {'new MB':>8}")
+    for path in pages:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        original_time, original_peak = measure(parse_original, html, args.repeat)
+        new_time, new_peak = measure(wiki_parser.parse_person_page, html, args.repeat)
+        print(
+            f"{os.path.basename(path)[:32]:32} {len(html) / 1024:6.0f} "
+            f"{original_time * 1000:12.1f} {new_time * 1000:8.1f} "
+            f"{original_peak / 2**20:12.1f} {new_peak / 2**20:8.1f}"
+        )
+        differences = compare(html)
+        if differences:
+            failures += 1
+            print(f"    FAIL parse_person_page reads {', '.join(differences)} differently")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
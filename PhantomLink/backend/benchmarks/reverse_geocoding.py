@@ -0,0 +1,88 @@
+"""
+Latency benchmark for reverse geocoding.
+
+Compares the offline GeoNames geocoder (offline_geocoder.lookup) with a warm
+hit in the shared geocode cache and, with --online N, with N live Nominatim
+calls (sent one per second to respect Nominatim's usage policy). Points are
+scattered around the fixture cities.
+
+Usage:
+    GEONAMES_CITIES_FILE=cities1000.txt GEONAMES_ADMIN1_FILE=admin1CodesASCII.txt \
+        python benchmarks/reverse_geocoding.py [--points 10000] [--online 5]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "geocode_points.json")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50_us": round(statistics.median(samples) * 1e6, 1),
+        "p99_us": round(samples[int(len(samples) * 0.99) - 1] * 1e6, 1),
+        "mean_us": round(statistics.mean(samples) * 1e6, 1),
+    }
+
+
+def timed(function, points):
+    samples = []
+    for latitude, longitude in points:
+        start = time.perf_counter()
+        function(latitude, longitude)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10000)
+    parser.add_argument("--online", type=int, default=0, help="Number of live Nominatim calls to time.")
+    args = parser.parse_args()
+
+    # Keep the benchmark's cache entries out of the real data directory
+    os.environ.setdefault("GEOCODE_CACHE_FILE", os.path.join(tempfile.mkdtemp(), "geocode_benchmark.sqlite3"))
+    import geocode_cache
+    import offline_geocoder
+
+    with open(FIXTURE) as f:
+        cities = json.load(f)
+    rng = random.Random(0)
+    points = [
+        (city["latitude"] + rng.uniform(-0.2, 0.2), city["longitude"] + rng.uniform(-0.2, 0.2))
+        for city in (rng.choice(cities) for _ in range(args.points))
+    ]
+
+    start = time.perf_counter()
+    offline_geocoder.load_index()
+    print(f"Offline index load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    offline_geocoder.lookup(*points[0])  # Touch the memory-mapped pages once
+    print("offline_geocoder.lookup:", percentiles(timed(offline_geocoder.lookup, points)))
+
+    # Warm cache hits: fill the cache with the offline answers, then read them back
+    for latitude, longitude in points:
+        cell, _ = geocode_cache.snap(latitude, longitude)
+        geocode_cache._store(cell, offline_geocoder.reverse(latitude, longitude))
+    print("geocode cache hit:       ", percentiles(timed(lambda lat, lon: geocode_cache._lookup(geocode_cache.snap(lat, lon)[0]), points)))
+
+    if args.online:
+        samples = []
+        for latitude, longitude in points[:args.online]:
+            start = time.perf_counter()
+            geocode_cache.geolocator.reverse((latitude, longitude), exactly_one=True)
+            samples.append(time.perf_counter() - start)
+            time.sleep(1)
+        print("Nominatim (live):        ", percentiles(samples))
+
+
+if __name__ == "__main__":
+    main()
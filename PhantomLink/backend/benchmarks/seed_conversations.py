@@ -0,0 +1,110 @@
+"""
+Seeds a Postgres database with users and conversations and times the hot queries.
+
+Inserts --users users and --conversations conversations (1M by default) with
+generate_series, refreshes planner statistics, then reports the average latency
+of the /conversations, /ghosts, add_ghost and reset-token lookups together with
+EXPLAIN ANALYZE for one run of each. Run it once before and once after
+`python migrate.py` to see the effect of the indexes.
+
+Only run this against a scratch database; --cleanup removes the seeded rows.
+
+Usage:
+    SQLALCHEMY_DATABASE_URI=postgresql://... python benchmarks/seed_conversations.py \
+        [--conversations 1000000] [--users 10000] [--runs 200] [--skip-seed] [--cleanup]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import text
+from __init__ import app, db
+
+SEED_PREFIX = "seed_user_"
+CITIES = [("Spokane", "Washington"), ("Boise", "Idaho"), ("Portland", "Oregon"), ("Missoula", "Montana")]
+
+
+def seed(connection, users, conversations):
+    start = time.perf_counter()
+    connection.execute(text(
+        "INSERT INTO users (username, email, password, reset_token) "
+        "SELECT :prefix || n, :prefix || n || '@example.com', 'x', "
+        "CASE WHEN n % 100 = 0 THEN md5(n::text) END "
+        "FROM generate_series(1, :users) AS n ON CONFLICT DO NOTHING"
+    ), {"prefix": SEED_PREFIX, "users": users})
+    connection.execute(text(
+        "INSERT INTO conversations (user_id, ghost_name, chat_log, location, timestamp) "
+        "SELECT u.ids[1 + (n % array_length(u.ids, 1))], 'Ghost ' || (n % 500), "
+        "repeat('User: hello ghost\n\nGhost: ...boo...\n\n', 20), 'Spokane, Washington', "
+        "now() - (n || ' minutes')::interval "
+        "FROM generate_series(1, :conversations) AS n, "
+        "(SELECT array_agg(id) AS ids FROM users WHERE username LIKE :pattern) AS u"
+    ), {"conversations": conversations, "pattern": SEED_PREFIX + "%"})
+    connection.execute(text(
+        "INSERT INTO ghosts (name, prompt, city, state) "
+        "SELECT 'Seed Ghost ' || n, 'prompt', (ARRAY[:c0, :c1, :c2, :c3])[1 + n % 4], "
+        "(ARRAY[:s0, :s1, :s2, :s3])[1 + n % 4] FROM generate_series(1, 20000) AS n "
+        "ON CONFLICT DO NOTHING"
+    ), {**{f"c{i}": city for i, (city, _) in enumerate(CITIES)}, **{f"s{i}": state for i, (_, state) in enumerate(CITIES)}})
+    connection.execute(text("ANALYZE users; ANALYZE conversations; ANALYZE ghosts"))
+    print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+
+def queries(connection):
+    user_ids = [row[0] for row in connection.execute(
+        text("SELECT id FROM users WHERE username LIKE :pattern"), {"pattern": SEED_PREFIX + "%"})]
+    tokens = [row[0] for row in connection.execute(text("SELECT reset_token FROM users WHERE reset_token IS NOT NULL LIMIT 100"))]
+    return [
+        ("/conversations", "SELECT id, ghost_name, location, timestamp FROM conversations "
+                           "WHERE user_id = :user_id ORDER BY timestamp DESC",
+         lambda: {"user_id": random.choice(user_ids)}),
+        ("/ghosts", "SELECT * FROM ghosts WHERE city = :city AND state = :state",
+         lambda: dict(zip(("city", "state"), random.choice(CITIES)))),
+        ("add_ghost", "SELECT * FROM ghosts WHERE name = :name LIMIT 1",
+         lambda: {"name": f"Seed Ghost {random.randint(1, 20000)}"}),
+        ("reset token", "SELECT * FROM users WHERE reset_token = :token LIMIT 1",
+         lambda: {"token": random.choice(tokens or ["missing"])}),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.cleanup:
+            with db.engine.begin() as connection:
+                connection.execute(text("DELETE FROM users WHERE username LIKE :pattern"), {"pattern": SEED_PREFIX + "%"})
+                connection.execute(text("DELETE FROM ghosts WHERE name LIKE 'Seed Ghost %'"))
+            print("Removed seeded rows.")
+            return
+
+        if not args.skip_seed:
+            with db.engine.begin() as connection:
+                seed(connection, args.users, args.conversations)
+
+        with db.engine.connect() as connection:
+            for name, sql, params in queries(connection):
+                timings = []
+                for _ in range(args.runs):
+                    start = time.perf_counter()
+                    connection.execute(text(sql), params()).fetchall()
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                print(f"\n{name}: avg {sum(timings) / len(timings) * 1000:.2f} ms, "
+                      f"p95 {timings[int(len(timings) * 0.95) - 1] * 1000:.2f} ms")
+                plan = connection.execute(text(f"EXPLAIN ANALYZE {sql}"), params()).fetchall()
+                print("\n".join(f"    {row[0]}" for row in plan))
+
+
+if __name__ == "__main__":
+    main()
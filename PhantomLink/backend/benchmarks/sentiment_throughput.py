@@ -0,0 +1,136 @@
+"""
+Throughput and memory benchmark for sentiment_analysis.
+
+Reports messages/sec for one-at-a-time analyze_sentiment calls and for
+analyze_many, then forks --workers processes twice to compare their memory:
+
+  per-worker load - each worker imports sentiment_analysis after the fork
+                    (gunicorn without preload_app)
+  preloaded       - the parent imports it and calls gc.freeze() before forking
+                    (gunicorn.conf.py's preload_app)
+
+Memory is read from /proc/<pid>/smaps_rollup, so the RSS part only runs on Linux.
+RSS counts shared pages in every worker; PSS splits them between the workers
+and "private" is what each worker really adds.
+
+Usage:
+    python benchmarks/sentiment_throughput.py [--messages 20000] [--workers 4] [--file messages.txt]
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+SAMPLE_MESSAGES = [
+    "hello?", "hi", "yes", "no", "who are you?", "ok",
+    "Hello there, ghost! I would love to hear your story.",
+    "I'm not afraid of you. Tell me what happened in this house.",
+    "This is boring, you are useless and I hate this app.",
+    "Go away. Nobody wants you here.",
+    "That is so sad, I'm sorry for what happened to you.",
+    "What was the town like when you were alive? Were you happy here?",
+    "Thank you for talking with me, you are wonderful!",
+    "Why won't you answer me? This is frustrating.",
+]
+
+
+def build_messages(count, path=None):
+    if path:
+        with open(path) as f:
+            lines = [line.strip() for line in f if line.strip()]
+        return [lines[i % len(lines)] for i in range(count)]
+    rng = random.Random(0)
+    # Long messages are mostly unique; short replies repeat, like in real chats
+    return [
+        rng.choice(SAMPLE_MESSAGES) if rng.random() < 0.5
+        else f"{rng.choice(SAMPLE_MESSAGES)} {rng.choice(SAMPLE_MESSAGES)} ({i})"
+        for i in range(count)
+    ]
+
+
+def memory_kb(pid="self"):
+    """Returns {"rss", "pss", "private"} in KB for a process."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            fields = line.split()
+            if fields[0] in ("Rss:", "Pss:", "Private_Clean:", "Private_Dirty:"):
+                values[fields[0][:-1]] = int(fields[1])
+    return {"rss": values["Rss"], "pss": values["Pss"], "private": values["Private_Clean"] + values["Private_Dirty"]}
+
+
+def throughput(messages):
+    from sentiment_analysis import analyze_many, analyze_sentiment
+
+    start = time.perf_counter()
+    for message in messages:
+        analyze_sentiment(message)
+    single = len(messages) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    analyze_many(messages)
+    batched = len(messages) / (time.perf_counter() - start)
+    return {"analyze_sentiment_per_sec": round(single), "analyze_many_per_sec": round(batched)}
+
+
+def fork_workers(workers, messages, preload):
+    """Forks workers that score messages, then measures all of them while they are alive."""
+    if preload:
+        import sentiment_analysis  # noqa: F401
+        gc.freeze()
+
+    children = []
+    for _ in range(workers):
+        ready_read, ready_write = os.pipe()
+        release_read, release_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                from sentiment_analysis import analyze_many
+
+                analyze_many(messages)
+                status = 0
+            finally:
+                # Always answer, so the parent never waits on a worker that failed
+                os.write(ready_write, b"1")
+                if status == 0:
+                    os.read(release_read, 1)
+                os._exit(status)
+        os.read(ready_read, 1)
+        children.append((pid, release_write))
+
+    usage = [memory_kb(pid) for pid, _ in children]
+    for pid, release_write in children:
+        os.write(release_write, b"1")
+        os.waitpid(pid, 0)
+    return {key: round(sum(u[key] for u in usage) / len(usage)) for key in ("rss", "pss", "private")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--file", help="Messages to score, one per line (e.g. exported from the messages table).")
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, args.file)
+    results = {"messages": len(messages)}
+
+    if os.path.exists("/proc/self/smaps_rollup"):
+        # Per-worker loading first, while this process hasn't imported NLTK yet
+        results["per_worker_load_kb"] = fork_workers(args.workers, messages[:1000], preload=False)
+        results["preloaded_kb"] = fork_workers(args.workers, messages[:1000], preload=True)
+        gc.unfreeze()
+
+    results.update(throughput(messages))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
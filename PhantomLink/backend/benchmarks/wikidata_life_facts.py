@@ -0,0 +1,82 @@
+"""
+Compares the Wikidata traffic of the API backend's deceased check for one city:
+
+  claims - wbgetentities with props=claims (every statement of every item), plus a
+           wbgetentities props=labels request for the chosen person's occupation
+  sparql - mediawiki_api.fetch_life_facts: one SPARQL query per 50 items returning
+           only the birth/death years and the occupation label
+
+Both run over the same Wikidata items, those of a "List of people from" page's
+candidates. Reports requests, response bytes and time for each. Needs network access.
+
+Usage:
+    python benchmarks/wikidata_life_facts.py "List of people from Spokane, Washington"
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import http_client
+import mediawiki_api
+
+WIKIDATA_API_URL = "https://www.wikidata.org/w/api.php"
+
+
+def measure(fetch):
+    """Runs fetch with http_client.get wrapped, returning (requests, bytes, seconds)."""
+    sizes = []
+    original = http_client.get
+
+    def counting_get(url, **kwargs):
+        response = original(url, **kwargs)
+        sizes.append(len(response.content))
+        return response
+
+    http_client.get = counting_get
+    try:
+        start = time.perf_counter()
+        fetch()
+        elapsed = time.perf_counter() - start
+    finally:
+        http_client.get = original
+    return {"requests": len(sizes), "bytes": sum(sizes), "seconds": round(elapsed, 2)}
+
+
+def fetch_claims(item_ids):
+    occupation_id = None
+    for batch in mediawiki_api._batches(item_ids):
+        response = http_client.get(WIKIDATA_API_URL, params={
+            "action": "wbgetentities", "ids": "|".join(batch), "props": "claims", "format": "json",
+        })
+        response.raise_for_status()
+        for entity in response.json().get("entities", {}).values():
+            for claim in entity.get("claims", {}).get("P106", []):
+                occupation_id = occupation_id or claim["mainsnak"].get("datavalue", {}).get("value", {}).get("id")
+    if occupation_id:
+        http_client.get(WIKIDATA_API_URL, params={
+            "action": "wbgetentities", "ids": occupation_id, "props": "labels", "languages": "en", "format": "json",
+        }).raise_for_status()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("list_title")
+    args = parser.parse_args()
+
+    candidates = mediawiki_api.fetch_list_candidates(args.list_title) or []
+    item_ids = sorted(set(mediawiki_api.fetch_wikidata_ids([mediawiki_api.url_to_title(url) for url in candidates]).values()))
+    print(f"{len(candidates)} candidates, {len(item_ids)} Wikidata items")
+
+    results = {
+        "claims": measure(lambda: fetch_claims(item_ids)),
+        "sparql": measure(lambda: mediawiki_api.fetch_life_facts(item_ids)),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import json
+import os
+import random
+import time
+from local_store import get_connection
+
+# SQLite file that stores each city's candidate list and every person verdict
+INDEX_FILE = os.getenv("CANDIDATE_INDEX_FILE", "candidate_index.sqlite3")
+# Known deceased people a city needs before picks are served from the index alone
+MIN_INDEXED_DECEASED = int(os.getenv("CANDIDATE_INDEX_MIN_DECEASED", "5"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS city_lists (
+  city TEXT NOT NULL,
+  state TEXT NOT NULL,
+  list_url TEXT NOT NULL,
+  indexed_at REAL NOT NULL,
+  PRIMARY KEY (city, state)
+);
+
+CREATE TABLE IF NOT EXISTS city_candidates (
+  city TEXT NOT NULL,
+  state TEXT NOT NULL,
+  person_url TEXT NOT NULL,
+  PRIMARY KEY (city, state, person_url)
+);
+
+CREATE TABLE IF NOT EXISTS person_verdicts (
+  person_url TEXT PRIMARY KEY,
+  is_deceased INTEGER NOT NULL,
+  name TEXT,
+  birth_year INTEGER,
+  death_year TEXT,
+  occupation TEXT,
+  paragraphs TEXT,
+  checked_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS person_images (
+  person_url TEXT PRIMARY KEY,
+  image_url TEXT
+);
+"""
+
+
+def _connection():
+    return get_connection(INDEX_FILE, SCHEMA)
+
+
+def get_candidates(city, state):
+    """
+    Returns the indexed candidate URLs for a city, or None if the city was never indexed.
+    """
+    connection = _connection()
+    indexed = connection.execute(
+        "SELECT 1 FROM city_lists WHERE city = ? AND state = ?", (city, state)
+    ).fetchone()
+    if not indexed:
+        return None
+
+    rows = connection.execute(
+        "SELECT person_url FROM city_candidates WHERE city = ? AND state = ?", (city, state)
+    ).fetchall()
+    return [row["person_url"] for row in rows]
+
+
+def save_candidates(city, state, list_url, candidate_urls):
+    """
+    Stores the candidate person URLs scraped from a city's list page.
+    """
+    connection = _connection()
+    with connection:
+        connection.execute("BEGIN")
+        connection.execute("DELETE FROM city_candidates WHERE city = ? AND state = ?", (city, state))
+        connection.executemany(
+            "INSERT OR IGNORE INTO city_candidates (city, state, person_url) VALUES (?, ?, ?)",
+            [(city, state, url) for url in candidate_urls],
+        )
+        connection.execute(
+            "INSERT OR REPLACE INTO city_lists (city, state, list_url, indexed_at) VALUES (?, ?, ?, ?)",
+            (city, state, list_url, time.time()),
+        )
+
+
+def get_verdict(person_url):
+    """
+    Looks up the stored verdict for a person page.
+
+    Returns:
+        tuple: (is_deceased, details, paragraphs), or None if the page was never checked.
+               details and paragraphs are None for people that are not deceased.
+    """
+    row = _connection().execute(
+        "SELECT * FROM person_verdicts WHERE person_url = ?", (person_url,)
+    ).fetchone()
+    if not row:
+        return None
+    if not row["is_deceased"]:
+        return False, None, None
+    return True, _row_details(row), json.loads(row["paragraphs"] or "[]")
+
+
+def save_verdict(person_url, is_deceased, details=None, paragraphs=None):
+    """
+    Records whether a person page is deceased, with its parsed details when it is.
+    """
+    name, birth_year, death_year, occupation = details or (None, None, None, None)
+    _connection().execute(
+        "INSERT OR REPLACE INTO person_verdicts "
+        "(person_url, is_deceased, name, birth_year, death_year, occupation, paragraphs, checked_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            person_url,
+            1 if is_deceased else 0,
+            name,
+            birth_year,
+            death_year,
+            occupation,
+            json.dumps(paragraphs) if is_deceased else None,
+            time.time(),
+        ),
+    )
+
+
+def get_image(person_url):
+    """
+    Looks up the infobox image stored for a person page.
+
+    Returns:
+        tuple: (True, image_url) if the page was already parsed (image_url may be None when
+               the page has no infobox image), otherwise (False, None).
+    """
+    row = _connection().execute(
+        "SELECT image_url FROM person_images WHERE person_url = ?", (person_url,)
+    ).fetchone()
+    return (True, row["image_url"]) if row else (False, None)
+
+
+def save_image(person_url, image_url):
+    """
+    Records the infobox image URL (or None) found on a person page.
+    """
+    _connection().execute(
+        "INSERT OR REPLACE INTO person_images (person_url, image_url) VALUES (?, ?)", (person_url, image_url)
+    )
+
+
+def get_unchecked_candidates(city, state):
+    """
+    Returns a city's indexed candidate URLs that have no verdict yet.
+    """
+    rows = _connection().execute(
+        "SELECT c.person_url FROM city_candidates c "
+        "LEFT JOIN person_verdicts v ON v.person_url = c.person_url "
+        "WHERE c.city = ? AND c.state = ? AND v.person_url IS NULL",
+        (city, state),
+    ).fetchall()
+    return [row["person_url"] for row in rows]
+
+
+def pick_deceased(city, state, exclude=(), min_known=MIN_INDEXED_DECEASED):
+    """
+    Picks a random known deceased person for a city without any network I/O.
+
+    Args:
+        exclude: Person URLs that must not be picked.
+        min_known (int): Only pick if at least this many deceased people (not counting
+                         `exclude`) are indexed, so a city isn't stuck on the first few found.
+
+    Returns:
+        tuple: (details, paragraphs, person_url), or None if too few deceased people are indexed.
+    """
+    connection = _connection()
+    rows = connection.execute(
+        "SELECT v.person_url FROM city_candidates c "
+        "JOIN person_verdicts v ON v.person_url = c.person_url "
+        "WHERE c.city = ? AND c.state = ? AND v.is_deceased = 1",
+        (city, state),
+    ).fetchall()
+    excluded = set(exclude)
+    person_urls = [row["person_url"] for row in rows if row["person_url"] not in excluded]
+    if not person_urls or len(person_urls) < min_known:
+        return None
+
+    row = connection.execute(
+        "SELECT * FROM person_verdicts WHERE person_url = ?", (random.choice(person_urls),)
+    ).fetchone()
+    return _row_details(row), json.loads(row["paragraphs"] or "[]"), row["person_url"]
+
+
+def _row_details(row):
+    return row["name"], row["birth_year"], row["death_year"], row["occupation"]
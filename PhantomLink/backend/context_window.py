@@ -0,0 +1,119 @@
+import os
+import openai
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional; fall back to a character-based estimate
+    _encoding = None
+
+# Number of most recent user/assistant exchanges sent to OpenAI verbatim
+KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+# Maximum prompt size (system prompt + summary + recent turns) in tokens
+TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2500"))
+# Model used to roll older turns into the running summary
+SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-3.5-turbo")
+SUMMARY_MAX_TOKENS = 150
+
+# Tokens OpenAI adds around every message and at the start of the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+
+def estimate_tokens(text):
+    """Estimates the number of tokens in a string, using tiktoken when it's installed."""
+    if not text:
+        return 0
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts a string down to at most max_tokens tokens (estimated the same way as estimate_tokens)."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if _encoding:
+        tokens = _encoding.encode(text)
+        return text if len(tokens) <= max_tokens else _encoding.decode(tokens[:max_tokens])
+    return text[:(max_tokens - 1) * 4]
+
+
+def count_message_tokens(messages):
+    """Estimates the prompt tokens for a list of OpenAI chat messages."""
+    return sum(estimate_tokens(message["content"]) + TOKENS_PER_MESSAGE for message in messages) + TOKENS_PER_REPLY
+
+
+def build_context(conversation, summary=None):
+    """
+    Builds the message list sent to OpenAI for a conversation.
+
+    The system prompt and the last KEEP_TURNS exchanges are sent as-is, older turns are
+    rolled into a cached summary, and fewer recent turns are kept if needed to stay within
+    TOKEN_BUDGET.
+
+    Args:
+        conversation (list): The full conversation, starting with the system message.
+        summary (dict): The cached summary from the previous call ({"upto": int, "text": str}), if any.
+
+    Returns:
+        tuple: (messages, summary, prompt_tokens) where summary should be cached for the next call.
+    """
+    summary = summary or {"upto": 1, "text": ""}
+    system_message, history = conversation[0], conversation[1:]
+
+    # Keep as many recent messages as the budget allows, always including the newest one
+    keep = min(len(history), KEEP_TURNS * 2 + 1)
+    reserved = count_message_tokens([system_message]) + SUMMARY_MAX_TOKENS + TOKENS_PER_MESSAGE
+    while keep > 1 and reserved + count_message_tokens(history[-keep:]) > TOKEN_BUDGET:
+        keep -= 1
+
+    first_kept = len(conversation) - keep
+    if first_kept > summary["upto"]:
+        summary = summarize_turns(summary, conversation[summary["upto"]:first_kept], first_kept)
+
+    messages = [system_message]
+    if summary["text"]:
+        messages.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation: {summary['text']}"
+        })
+    messages.extend(conversation[first_kept:])
+
+    prompt_tokens = count_message_tokens(messages)
+    print(f"Context: {len(messages)} messages, ~{prompt_tokens} prompt tokens ({len(conversation)} in conversation)")
+    return messages, summary, prompt_tokens
+
+
+def summarize_turns(summary, messages, upto):
+    """
+    Folds messages that left the context window into the running summary.
+
+    If the summary call fails the previous summary is kept, so a chat turn never fails
+    because of summarization.
+    """
+    transcript = "\n".join(
+        f"{'User' if message['role'] == 'user' else 'Ghost'}: {message['content']}"
+        for message in messages if message["role"] in ["user", "assistant"]
+    )
+    try:
+        response = openai.ChatCompletion.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Summarize this conversation between a visitor and a ghost in under 80 words. "
+                    "Keep names, facts and promises that were mentioned."
+                },
+                {
+                    "role": "user",
+                    "content": f"Earlier summary: {summary['text'] or 'None'}\n\nNew messages:\n{transcript}"
+                },
+            ],
+            temperature=0,
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+        return {"upto": upto, "text": response.choices[0].message["content"].strip()}
+    except Exception as e:
+        print(f"Error summarizing conversation: {e}")
+        return summary
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+from geopy.geocoders import Nominatim
+from local_store import get_connection
+import offline_geocoder
+from keyed_lock import KeyedLock
+
+# Coordinates are snapped to a grid of this many degrees (0.01 is roughly 1 km) before lookup
+GRID_DEGREES = float(os.getenv("GEOCODE_GRID_DEGREES", "0.01"))
+# Seconds a cached answer stays valid; places without an address are retried sooner
+CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+NEGATIVE_TTL = int(os.getenv("GEOCODE_NEGATIVE_TTL", "3600"))
+# Least recently used cells are evicted above this many entries
+MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "50000"))
+# How long one worker may hold a cell's lookup before others stop waiting for it
+LEASE_SECONDS = float(os.getenv("GEOCODE_LEASE_SECONDS", "10"))
+
+CACHE_FILE = os.getenv("GEOCODE_CACHE_FILE", "geocode_cache.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocode_cells (
+  cell TEXT PRIMARY KEY,
+  raw TEXT,
+  fetched_at REAL NOT NULL,
+  last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_geocode_cells_last_used ON geocode_cells (last_used);
+
+CREATE TABLE IF NOT EXISTS geocode_leases (
+  cell TEXT PRIMARY KEY,
+  owner TEXT NOT NULL,
+  expires_at REAL NOT NULL
+);
+"""
+
+# Hits only refresh last_used when it is older than this, so reads rarely write
+TOUCH_INTERVAL = 60
+
+geolocator = Nominatim(user_agent="phantomlink")
+
+# Serializes lookups of one cell within this process
+_cell_lock = KeyedLock()
+_metrics = {
+    "offline_hits": 0, "hits": 0, "misses": 0, "coalesced": 0,
+    "upstream_calls": 0, "upstream_errors": 0, "upstream_seconds": 0.0,
+}
+_metrics_lock = threading.Lock()
+
+
+def _connection():
+    return get_connection(CACHE_FILE, SCHEMA)
+
+
+def snap(latitude, longitude):
+    """Returns the grid cell key and the cell's center for a coordinate."""
+    lat_index = round(float(latitude) / GRID_DEGREES)
+    lon_index = round(float(longitude) / GRID_DEGREES)
+    center = (round(lat_index * GRID_DEGREES, 6), round(lon_index * GRID_DEGREES, 6))
+    return f"{lat_index}:{lon_index}", center
+
+
+def reverse_geocode(latitude, longitude):
+    """
+    Reverse-geocodes a coordinate at city level through the shared cache.
+
+    Nearby coordinates share a grid cell, and a cell is looked up on Nominatim at most once
+    per CACHE_TTL. When a GeoNames dump is configured, the offline geocoder answers first
+    and Nominatim is only asked about points with no city nearby. Concurrent misses for
+    the same cell wait for a single upstream call, both between threads of a worker and
+    between gunicorn workers.
+
+    Returns:
+        dict: Nominatim's raw answer ("address", "display_name", ...), or None if the
+              coordinate isn't in any known place. Raises geopy errors if Nominatim fails.
+    """
+    if offline_geocoder.enabled():
+        try:
+            raw = offline_geocoder.reverse(latitude, longitude)
+        except Exception as e:
+            print(f"Offline geocoder failed, falling back to Nominatim: {e}")
+            raw = None
+        if raw:
+            _count("offline_hits")
+            return raw
+
+    cell, center = snap(latitude, longitude)
+
+    found, raw = _lookup(cell)
+    if found:
+        _count("hits")
+        return raw
+
+    with _cell_lock(cell):
+        # Another thread of this worker may have filled the cell while we waited
+        found, raw = _lookup(cell)
+        if found:
+            _count("coalesced")
+            return raw
+
+        # Another worker holding the cell's lease is already asking Nominatim; wait for its answer
+        owner = f"{os.getpid()}:{threading.get_ident()}"
+        deadline = time.time() + LEASE_SECONDS
+        while not _acquire_lease(cell, owner) and time.time() < deadline:
+            time.sleep(0.1)
+            found, raw = _lookup(cell)
+            if found:
+                _count("coalesced")
+                return raw
+
+        _count("misses")
+        try:
+            raw = _fetch(center)
+            _store(cell, raw)
+            return raw
+        finally:
+            _release_lease(cell, owner)
+
+
+def _lookup(cell):
+    row = _connection().execute(
+        "SELECT raw, fetched_at, last_used FROM geocode_cells WHERE cell = ?", (cell,)
+    ).fetchone()
+    if not row:
+        return False, None
+
+    now = time.time()
+    raw = json.loads(row["raw"]) if row["raw"] else None
+    if now - row["fetched_at"] > (CACHE_TTL if raw else NEGATIVE_TTL):
+        return False, None
+
+    if now - row["last_used"] > TOUCH_INTERVAL:
+        _connection().execute("UPDATE geocode_cells SET last_used = ? WHERE cell = ?", (now, cell))
+    return True, raw
+
+
+def _store(cell, raw):
+    now = time.time()
+    connection = _connection()
+    connection.execute(
+        "INSERT OR REPLACE INTO geocode_cells (cell, raw, fetched_at, last_used) VALUES (?, ?, ?, ?)",
+        (cell, json.dumps(raw) if raw else None, now, now),
+    )
+    connection.execute(
+        "DELETE FROM geocode_cells WHERE cell IN ("
+        "SELECT cell FROM geocode_cells ORDER BY last_used "
+        "LIMIT MAX(0, (SELECT COUNT(*) FROM geocode_cells) - ?))",
+        (MAX_ENTRIES,),
+    )
+
+
+def _fetch(center):
+    start = time.perf_counter()
+    try:
+        location = geolocator.reverse(center, exactly_one=True)
+    except Exception:
+        _count("upstream_errors")
+        raise
+    finally:
+        _count("upstream_calls")
+        _count("upstream_seconds", time.perf_counter() - start)
+    return location.raw if location else None
+
+
+def _acquire_lease(cell, owner):
+    """Claims the upstream lookup for a cell across workers; expired leases are taken over."""
+    now = time.time()
+    connection = _connection()
+    connection.execute("DELETE FROM geocode_leases WHERE cell = ? AND expires_at < ?", (cell, now))
+    cursor = connection.execute(
+        "INSERT OR IGNORE INTO geocode_leases (cell, owner, expires_at) VALUES (?, ?, ?)",
+        (cell, owner, now + LEASE_SECONDS),
+    )
+    return cursor.rowcount == 1
+
+
+def _release_lease(cell, owner):
+    _connection().execute("DELETE FROM geocode_leases WHERE cell = ? AND owner = ?", (cell, owner))
+
+
+def _count(name, amount=1):
+    with _metrics_lock:
+        _metrics[name] += amount
+
+
+def get_metrics():
+    """Returns this worker's cache hit/miss counters and the shared cache size."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    answered = metrics["offline_hits"] + metrics["hits"] + metrics["coalesced"]
+    lookups = answered + metrics["misses"]
+    metrics["hit_ratio"] = round(answered / lookups, 4) if lookups else None
+    metrics["upstream_seconds"] = round(metrics["upstream_seconds"], 4)
+    metrics["entries"] = _connection().execute("SELECT COUNT(*) FROM geocode_cells").fetchone()[0]
+    return metrics
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from __init__ import app
+from local_store import get_connection
+from models import Ghost
+
+# Cities whose /ghosts response each worker keeps in memory
+MEMORY_ENTRIES = int(os.getenv("GHOST_CACHE_MEMORY_ENTRIES", "256"))
+
+CACHE_FILE = os.getenv("GHOST_CACHE_FILE", "ghost_cache.sqlite3")
+
+# ghost_list_versions is bumped after every committed change to a city's ghosts; cached
+# responses are only used while their version is still the current one
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ghost_list_versions (
+  city TEXT NOT NULL,
+  state TEXT NOT NULL,
+  version INTEGER NOT NULL,
+  changed_at REAL NOT NULL,
+  PRIMARY KEY (city, state)
+);
+
+CREATE TABLE IF NOT EXISTS ghost_list_responses (
+  city TEXT NOT NULL,
+  state TEXT NOT NULL,
+  version INTEGER NOT NULL,
+  body TEXT NOT NULL,
+  etag TEXT NOT NULL,
+  last_modified REAL NOT NULL,
+  PRIMARY KEY (city, state)
+);
+"""
+
+TIERS = ("memory", "shared", "database")
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+_metrics = {tier: {"hits": 0, "seconds": 0.0} for tier in TIERS}
+_metrics_lock = threading.Lock()
+
+
+def _connection():
+    return get_connection(CACHE_FILE, SCHEMA)
+
+
+def _current_version(city, state):
+    row = _connection().execute(
+        "SELECT version, changed_at FROM ghost_list_versions WHERE city = ? AND state = ?", (city, state)
+    ).fetchone()
+    return (row["version"], row["changed_at"]) if row else (0, None)
+
+
+def invalidate(city, state):
+    """
+    Marks a city's cached /ghosts response as stale in every worker.
+
+    Call it after the change is committed: a response built from the old rows can then
+    only ever be stored under the old version, which nobody reads any more.
+    """
+    _connection().execute(
+        "INSERT INTO ghost_list_versions (city, state, version, changed_at) VALUES (?, ?, 1, ?) "
+        "ON CONFLICT (city, state) DO UPDATE SET version = version + 1, changed_at = excluded.changed_at",
+        (city, state, time.time()),
+    )
+
+
+def get_ghost_list(city, state):
+    """
+    Returns the serialized /ghosts response for a city from the fastest tier that has it.
+
+    Lookups check this worker's LRU first, then the SQLite file shared by the workers on
+    the host, and only then query the database.
+
+    Returns:
+        dict: {"body" (JSON text), "etag", "last_modified" (epoch seconds), "tier"}.
+    """
+    start = time.perf_counter()
+    version, changed_at = _current_version(city, state)
+    key = (city, state)
+
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry and entry["version"] == version:
+            _memory.move_to_end(key)
+        else:
+            entry = None
+    if entry:
+        return _record("memory", entry, start)
+
+    row = _connection().execute(
+        "SELECT body, etag, last_modified FROM ghost_list_responses WHERE city = ? AND state = ? AND version = ?",
+        (city, state, version),
+    ).fetchone()
+    if row:
+        entry = {"version": version, "body": row["body"], "etag": row["etag"], "last_modified": row["last_modified"]}
+        _remember(key, entry)
+        return _record("shared", entry, start)
+
+    # Same bytes jsonify sent before /ghosts was cached (sorted keys, compact, trailing newline)
+    ghosts = _serialize(Ghost.query.filter_by(city=city, state=state).all())
+    body = app.json.response({"ghosts": ghosts}).get_data(as_text=True)
+    entry = {
+        "version": version,
+        "body": body,
+        "etag": hashlib.sha1(body.encode()).hexdigest(),
+        # Cities that never changed since the cache was added report when they were first cached
+        "last_modified": changed_at or time.time(),
+    }
+    _connection().execute(
+        "INSERT OR REPLACE INTO ghost_list_responses (city, state, version, body, etag, last_modified) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (city, state, version, entry["body"], entry["etag"], entry["last_modified"]),
+    )
+    _remember(key, entry)
+    return _record("database", entry, start)
+
+
+def _serialize(ghosts):
+    return [
+        {
+            "id": ghost.id,
+            "name": ghost.name,
+            "city": ghost.city,
+            "state": ghost.state,
+            "image_url": ghost.image_url,
+            "details": ghost.get_details(),
+        }
+        for ghost in ghosts
+    ]
+
+
+def _remember(key, entry):
+    with _memory_lock:
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _record(tier, entry, start):
+    with _metrics_lock:
+        _metrics[tier]["hits"] += 1
+        _metrics[tier]["seconds"] += time.perf_counter() - start
+    return dict(entry, tier=tier)
+
+
+def get_metrics():
+    """Returns this worker's lookups per tier, their average latency and the cache hit ratio."""
+    with _metrics_lock:
+        tiers = {tier: dict(counts) for tier, counts in _metrics.items()}
+    with _memory_lock:
+        memory_entries = len(_memory)
+
+    total = sum(counts["hits"] for counts in tiers.values())
+    for counts in tiers.values():
+        counts["avg_ms"] = round(counts["seconds"] / counts["hits"] * 1000, 3) if counts["hits"] else None
+        counts["ratio"] = round(counts["hits"] / total, 4) if total else None
+        del counts["seconds"]
+    return {
+        "lookups": total,
+        "hit_ratio": round((total - tiers["database"]["hits"]) / total, 4) if total else None,
+        "memory_entries": memory_entries,
+        "tiers": tiers,
+    }
@@ -0,0 +1,259 @@
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from __init__ import app, db
+from wiki_scraper import fetch_wikipedia_page
+from gpt_prompt_maker import gpt_prompt_maker
+from grab_picture import fetch_image_from_wikipedia
+from image_cache import cached_image_for
+import ghost_cache
+from models import Ghost, GhostJob, seconds_between
+
+# Seconds an idle worker waits before polling the queue again
+POLL_INTERVAL = float(os.getenv("GHOST_JOB_POLL_INTERVAL", "1"))
+# Jobs running longer than this are assumed to belong to a dead worker and are retried
+STALE_AFTER = timedelta(seconds=int(os.getenv("GHOST_JOB_STALE_AFTER", "300")))
+# A pool job picks again when another job claimed its person first, at most this many times
+CLAIM_ATTEMPTS = int(os.getenv("GHOST_JOB_CLAIM_ATTEMPTS", "3"))
+
+# Marks the error of a pool job whose person already had a ghost; refills don't back off for these
+DUPLICATE_GHOST = "already has a ghost"
+
+
+def enqueue_ghost_job(city, state, kind="session"):
+    """
+    Queues a job that builds a ghost prompt for a city. Returns the job ID.
+
+    "session" jobs keep the prompt on the job for one visitor; "pool" jobs store the
+    finished ghost as a pooled Ghost row (see ghost_pool.py).
+    """
+    job = GhostJob(city=city, state=state, kind=kind, status="queued")
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def get_job(job_id):
+    return GhostJob.query.get(job_id)
+
+
+def wait_for_job(job_id, timeout):
+    """
+    Returns the job once it's finished, or None if it's still queued/running after `timeout` seconds.
+    """
+    deadline = time.time() + timeout
+    while True:
+        job = get_job(job_id)
+        if job is None or job.status in ("done", "failed"):
+            return job
+        if time.time() >= deadline:
+            return None
+        time.sleep(0.25)
+        db.session.expire_all()
+
+
+def claim_next_job():
+    """
+    Claims the oldest queued (or stale running) job for this worker.
+
+    Uses SELECT ... FOR UPDATE SKIP LOCKED so several workers never claim the same job.
+    """
+    now = datetime.utcnow()
+    job = (
+        GhostJob.query.filter(
+            or_(
+                GhostJob.status == "queued",
+                (GhostJob.status == "running") & (GhostJob.started_at < now - STALE_AFTER),
+            )
+        )
+        .order_by(GhostJob.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+
+    job.status = "running"
+    job.started_at = now
+    job.attempts += 1
+    db.session.commit()
+    return job
+
+
+def run_job(job):
+    """
+    Scrapes a deceased person for the job's city and stores the finished ghost prompt.
+    Pool jobs skip people that have a ghost or are claimed by another pool job, and add the ghost to the pool.
+    """
+    name = None
+    try:
+        if job.kind == "pool":
+            result, paragraphs, wikipedia_page = pick_unclaimed_person(job)
+        else:
+            result, paragraphs, wikipedia_page = fetch_wikipedia_page(job.city, job.state)
+        if result:
+            name, birth_year, death_year, occupation = result
+            job.name = name
+            job.prompt = gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs, wikipedia_page)
+            job.wikipedia_url = wikipedia_page
+            job.status = "done"
+            if job.kind == "pool" and not add_pooled_ghost(job, birth_year, death_year, occupation):
+                job.status = "failed"
+                job.error = f"{name} {DUPLICATE_GHOST}."
+        elif wikipedia_page:
+            job.status = "failed"
+            job.error = f"Everyone picked for this location {DUPLICATE_GHOST} or is taken by another job."
+        else:
+            job.status = "failed"
+            job.error = "No deceased person found for this location."
+        job.finished_at = datetime.utcnow()
+        # Also inserts the pooled Ghost, which can collide with ux_ghosts_name
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        _fail(job, f"{name} {DUPLICATE_GHOST} (added by another job or request).")
+    except Exception as e:
+        db.session.rollback()
+        _fail(job, str(e))
+
+    if job.kind == "pool" and job.status == "done":
+        ghost_cache.invalidate(job.city, job.state)
+    print(f"Ghost job {job.id} for {job.city}, {job.state}: {job.status} ({job.name or job.error})")
+
+
+def _fail(job, error):
+    """Records a failed job after its transaction was rolled back."""
+    job.status = "failed"
+    job.error = error
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def pick_unclaimed_person(job):
+    """
+    Picks a person for a pool job that no ghost and no other running pool job has.
+
+    The pick is stored on the job before the slow prompt is built, so concurrent jobs
+    for the city skip it. When two jobs claim the same person at once, the older job
+    keeps it and the newer one picks again.
+
+    Returns:
+        tuple: (details, paragraphs, person_url), as fetch_wikipedia_page does. If every
+               attempt was taken, details is None and person_url is the last one tried.
+    """
+    exclude = set()
+    wikipedia_page = None
+    for _ in range(CLAIM_ATTEMPTS):
+        exclude |= pooled_urls(job.city, job.state) | claimed_urls(job)
+        result, paragraphs, wikipedia_page = fetch_wikipedia_page(job.city, job.state, exclude)
+        if not result:
+            return result, paragraphs, wikipedia_page
+        if not Ghost.query.filter_by(name=result[0]).first():
+            job.wikipedia_url = wikipedia_page
+            db.session.commit()
+            if wikipedia_page not in claimed_urls(job, older_only=True):
+                return result, paragraphs, wikipedia_page
+            job.wikipedia_url = None
+            db.session.commit()
+        exclude.add(wikipedia_page)
+    return None, [], wikipedia_page
+
+
+def claimed_urls(job, older_only=False):
+    """Returns the Wikipedia URLs other running pool jobs for the job's city have picked."""
+    jobs = GhostJob.query.filter(
+        GhostJob.kind == "pool",
+        GhostJob.city == job.city,
+        GhostJob.state == job.state,
+        GhostJob.status == "running",
+        GhostJob.wikipedia_url.isnot(None),
+        GhostJob.id != job.id,
+    )
+    if older_only:
+        jobs = jobs.filter(GhostJob.id < job.id)
+    return {url for (url,) in jobs.with_entities(GhostJob.wikipedia_url)}
+
+
+def pooled_urls(city, state):
+    """Returns the Wikipedia URLs of every ghost already stored for a city."""
+    ghosts = Ghost.query.filter_by(city=city, state=state).with_entities(Ghost.details).all()
+    urls = set()
+    for (details,) in ghosts:
+        url = json.loads(details).get("wikipedia_url") if details else None
+        if url:
+            urls.add(url)
+    return urls
+
+
+def add_pooled_ghost(job, birth_year, death_year, occupation):
+    """
+    Stores a finished pool job as a ready-made Ghost row with its image and details.
+
+    Returns:
+        bool: False if a ghost with the same name already exists.
+    """
+    if Ghost.query.filter_by(name=job.name).first():
+        return False
+
+    image_url = cached_image_for(fetch_image_from_wikipedia(job.wikipedia_url)) or "/pics/ghost_portrait.png"
+    db.session.add(Ghost(
+        name=job.name,
+        prompt=job.prompt,
+        city=job.city,
+        state=job.state,
+        image_url=image_url,
+        details=json.dumps({
+            "birth_year": birth_year,
+            "death_year": death_year,
+            "occupation": occupation,
+            "wikipedia_url": job.wikipedia_url,
+        }),
+        pooled=True,
+    ))
+    return True
+
+
+def job_stats():
+    """
+    Returns job counts per status and the average queue/run time of jobs finished in the last hour.
+    """
+    counts = dict(db.session.query(GhostJob.status, func.count(GhostJob.id)).group_by(GhostJob.status).all())
+    recent = GhostJob.query.filter(
+        GhostJob.finished_at >= datetime.utcnow() - timedelta(hours=1)
+    ).with_entities(GhostJob.created_at, GhostJob.started_at, GhostJob.finished_at).all()
+
+    queue_times = [seconds_between(created, started) for created, started, _ in recent if started]
+    run_times = [seconds_between(started, finished) for _, started, finished in recent if started]
+    return {
+        "counts": counts,
+        "finished_last_hour": len(recent),
+        "avg_queue_seconds": round(sum(queue_times) / len(queue_times), 3) if queue_times else None,
+        "avg_run_seconds": round(sum(run_times) / len(run_times), 3) if run_times else None,
+    }
+
+
+def run_worker():
+    """Processes ghost jobs until the process is stopped."""
+    with app.app_context():
+        GhostJob.__table__.create(db.engine, checkfirst=True)
+        print("Ghost job worker started.")
+        while True:
+            job = claim_next_job()
+            if job is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            try:
+                run_job(job)
+            except Exception as e:
+                # e.g. the database went away while recording the result; the job is retried once stale
+                db.session.rollback()
+                print(f"Error running ghost job {job.id}: {e}")
+            db.session.remove()
+
+
+if __name__ == "__main__":
+    run_worker()
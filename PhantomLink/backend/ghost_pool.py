@@ -0,0 +1,139 @@
+import os
+from datetime import datetime, timedelta
+import click
+from sqlalchemy import func, or_
+from __init__ import app, db
+from models import Ghost, GhostJob
+from ghost_jobs import DUPLICATE_GHOST, enqueue_ghost_job, claim_next_job, run_job
+
+# Ready-made ghosts kept per active (city, state)
+POOL_TARGET = int(os.getenv("GHOST_POOL_TARGET", "5"))
+# The pool is refilled up to POOL_TARGET once fewer than this many ghosts are ready
+POOL_LOW_WATER = int(os.getenv("GHOST_POOL_LOW_WATER", "2"))
+# After a refill job fails (e.g. the city has no new people left) wait this long before retrying
+RETRY_AFTER = timedelta(seconds=int(os.getenv("GHOST_POOL_RETRY_AFTER", "3600")))
+
+
+def ready_count(city, state):
+    return Ghost.query.filter_by(city=city, state=state, pooled=True).count()
+
+
+def refill_pool(city, state):
+    """
+    Queues pool jobs for a city once its pool drops below POOL_LOW_WATER.
+
+    Jobs that are already queued or running count towards the target, so calling this
+    on every request never queues more than POOL_TARGET ghosts per city.
+
+    Returns:
+        int: The number of ghosts ready right now.
+    """
+    ready = ready_count(city, state)
+    if ready >= POOL_LOW_WATER:
+        return ready
+
+    jobs = GhostJob.query.filter_by(kind="pool", city=city, state=state)
+    pending = jobs.filter(GhostJob.status.in_(("queued", "running"))).count()
+    # Losing a person to another job doesn't mean the city has run out of people
+    recently_failed = jobs.filter(
+        GhostJob.status == "failed",
+        GhostJob.finished_at >= datetime.utcnow() - RETRY_AFTER,
+        or_(GhostJob.error.is_(None), ~GhostJob.error.contains(DUPLICATE_GHOST)),
+    ).first()
+    if recently_failed:
+        db.session.rollback()
+        return ready
+
+    for _ in range(POOL_TARGET - ready - pending):
+        enqueue_ghost_job(city, state, kind="pool")
+    db.session.rollback()
+    return ready
+
+
+def take_pooled_ghost(city, state):
+    """
+    Hands out one ready-made ghost for a city, or None if the pool is empty.
+
+    The row is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent chats never get
+    the same ghost and never wait on each other. The pool is topped up afterwards.
+    """
+    ghost = (
+        Ghost.query.filter_by(city=city, state=state, pooled=True)
+        .order_by(Ghost.id)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if ghost is None:
+        db.session.rollback()
+    else:
+        ghost.pooled = False
+        db.session.commit()
+        print(f"Took pooled ghost for {city}, {state}: {ghost.name}")
+
+    try:
+        refill_pool(city, state)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error refilling the ghost pool for {city}, {state}: {e}")
+    return ghost
+
+
+def pool_stats():
+    """
+    Returns the number of ready ghosts and the cities whose pool is below the low-water mark.
+    """
+    ready = dict(
+        ((city, state), count)
+        for city, state, count in db.session.query(Ghost.city, Ghost.state, func.count(Ghost.id))
+        .filter(Ghost.pooled.is_(True))
+        .group_by(Ghost.city, Ghost.state)
+        .all()
+    )
+    return {
+        "target": POOL_TARGET,
+        "low_water": POOL_LOW_WATER,
+        "ready": sum(ready.values()),
+        "cities": len(ready),
+        "low_cities": sorted(f"{city}, {state}" for (city, state), count in ready.items() if count < POOL_LOW_WATER),
+    }
+
+
+@app.cli.command("seed-ghost-pools")
+@click.argument("locations", nargs=-1)
+@click.option("--file", "path", type=click.Path(exists=True), help="File with one City,State per line.")
+@click.option("--run", is_flag=True, help="Work through the job queue in this process instead of leaving it to the worker.")
+def seed_ghost_pools(locations, path, run):
+    """
+    Queues ghosts for each City,State until its pool is full.
+
+    Example: flask --app server seed-ghost-pools "Spokane,Washington" "Boise,Idaho"
+    """
+    entries = list(locations)
+    if path:
+        with open(path) as f:
+            entries.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    for entry in entries:
+        city, _, state = (part.strip() for part in entry.partition(","))
+        if not city or not state:
+            print(f"Skipping '{entry}': expected City,State")
+            continue
+
+        ready = ready_count(city, state)
+        pending = GhostJob.query.filter(
+            GhostJob.kind == "pool",
+            GhostJob.city == city,
+            GhostJob.state == state,
+            GhostJob.status.in_(("queued", "running")),
+        ).count()
+        queued = max(0, POOL_TARGET - ready - pending)
+        for _ in range(queued):
+            enqueue_ghost_job(city, state, kind="pool")
+        print(f"{city}, {state}: {ready} ready, {pending} pending, {queued} queued")
+
+    if run:
+        while True:
+            job = claim_next_job()
+            if job is None:
+                break
+            run_job(job)
@@ -2,28 +2,40 @@ import re
 from datetime import datetime
 from wiki_scraper import fetch_wikipedia_page  
 
-def gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs):
+def persona_parts(name, birth_year, death_year, occupation):
+    """
+    Returns the persona prompt around the biography: (introduction, instructions).
+
+    prompt_builder fits the biography between them; both parts are always kept whole.
+    """
     speaking_style = determine_speaking_style(birth_year)
     goal = determine_goal(occupation)
 
-    if goal != None:
-        prompt = (
+    introduction = (
         f"Imagine you are {name}, a historical figure born in {birth_year or 'Unknown'} and died in {death_year or 'Unknown'}. "
-        f"Your occupation was {occupation or 'Unknown'}. The goal of speaking to the living is to {goal}. Speak {speaking_style} Here is a brief summary about you:\n\n{paragraphs}\n\n"
-        "Using the provided information, continue the conversation as if you were that person. Never break character, never respond as if you were AI. Also never say more than 3 sentences."
+        f"Your occupation was {occupation or 'Unknown'}. "
     )
-    else:
-       prompt = (
-        f"Imagine you are {name}, a historical figure born in {birth_year or 'Unknown'} and died in {death_year or 'Unknown'}. "
-        f"Your occupation was {occupation or 'Unknown'}. Speak {speaking_style} Here is a brief summary about you:\n\n{paragraphs}\n\n"
-        "Using the provided information, continue the conversation as if you were that person. Never break character, never respond as if you were AI." 
-       )
-    
-    
-    
-    print("\nGenerated GPT Prompt:")
-    print(prompt)
-    return prompt
+    if goal != None:
+        introduction += f"The goal of speaking to the living is to {goal}. "
+    introduction += f"Speak {speaking_style} Here is a brief summary about you:\n\n"
+
+    instructions = "\n\nUsing the provided information, continue the conversation as if you were that person. Never break character, never respond as if you were AI."
+    if goal != None:
+        instructions += " Also never say more than 3 sentences."
+    return introduction, instructions
+
+
+def gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs, wikipedia_url=None):
+    """
+    Builds the ghost's persona prompt within PROMPT_TOKEN_BUDGET (see prompt_builder).
+
+    Args:
+        paragraphs (list or str): The scraped biography.
+        wikipedia_url (str): The person's page; finished prompts are cached under it.
+    """
+    from prompt_builder import build_prompt
+
+    return build_prompt(name, birth_year, death_year, occupation, paragraphs, wikipedia_url)
 
 def determine_speaking_style(birth_year):
     if not birth_year:
@@ -61,26 +73,16 @@ def determine_goal(occupation):
 
 def handle_wikipedia_data(city, state):
     """
-    Fetches Wikipedia data for a given city and state and processes it
-    to ensure the paragraphs do not exceed a specified word limit.
+    Fetches Wikipedia data for a given city and state and builds the ghost prompt from it.
     """
     # Fetch the Wikipedia data for the given city and state
-    result, paragraphs = fetch_wikipedia_page(city, state)
+    result, paragraphs, wikipedia_page = fetch_wikipedia_page(city, state)
 
     if result:
-        # Ensure that the result contains the expected number of values
-        if len(result) == 5:
-            name, birth_year, death_year, occupation, cause_of_death = result
-        else:
-            # Provide defaults for missing values if necessary
-            name, birth_year, death_year, occupation, cause_of_death = result + [None] * (5 - len(result))
-        
-        # Limit the paragraphs to a maximum of 3,000 words
-        paragraph_words = " ".join(paragraphs).split()  # Split paragraphs into words
-        limited_paragraph_words = paragraph_words[:3000]  # Limit to 3,000 words
-        limited_paragraphs = " ".join(limited_paragraph_words)  # Rejoin to form the text
-        
-        # Pass the data to the GPT prompt maker
-        gpt_prompt_maker(name, birth_year, death_year, occupation, limited_paragraphs)
+        name, birth_year, death_year, occupation = result
+
+        # The prompt builder trims the biography to the prompt's token budget
+        return gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs, wikipedia_page)
     else:
         print("No valid information found. Please check the city/state.")
+        return None
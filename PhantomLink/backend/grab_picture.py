@@ -1,38 +1,41 @@
 import requests
-from bs4 import BeautifulSoup
+import http_client
+import candidate_index
+from wiki_parser import parse_html, INFOBOX_ONLY
+from mediawiki_api import fetch_page_image
+from wiki_scraper import WIKI_BACKEND
 
 def fetch_image_from_wikipedia(wikipedia_url):
     """
     Fetch the main image URL from the infobox of a Wikipedia page.
 
+    Pages already parsed by the scraper are answered from the candidate index
+    without downloading them again.
+
     Args:
         wikipedia_url (str): The URL of the Wikipedia page to scrape.
 
     Returns:
         str: The URL of the image if found, otherwise None.
     """
+    found, image_url = candidate_index.get_image(wikipedia_url)
+    if found:
+        return image_url
+
+    if WIKI_BACKEND == "api":
+        image_url = fetch_page_image(wikipedia_url)
+        candidate_index.save_image(wikipedia_url, image_url)
+        return image_url
+
     try:
         # Send a GET request to the Wikipedia page
-        response = requests.get(wikipedia_url)
+        response = http_client.get(wikipedia_url)
         response.raise_for_status()  # Raise an exception for HTTP errors
 
-        # Parse the HTML content using BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Find the infobox element
-        infobox = soup.find('table', class_='infobox')
-        if not infobox:
-            print("No infobox found on the page.")
-            return None
-
-        # Find the image within the infobox
-        image_tag = infobox.find('img')
-        if not image_tag:
-            print("No image found in the infobox.")
-            return None
-
-        # Construct the full image URL
-        image_url = f"https:{image_tag['src']}"
+        # Parse only the infobox, which is all we need for the image
+        soup = parse_html(response.text, INFOBOX_ONLY)
+        image_url = extract_infobox_image(soup)
+        candidate_index.save_image(wikipedia_url, image_url)
         return image_url
 
     except requests.exceptions.RequestException as e:
@@ -41,3 +44,23 @@ def fetch_image_from_wikipedia(wikipedia_url):
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return None
+
+
+def extract_infobox_image(soup):
+    """
+    Returns the full URL of the first image in a parsed page's infobox, or None.
+    """
+    # Find the infobox element
+    infobox = soup.find('table', class_='infobox')
+    if not infobox:
+        print("No infobox found on the page.")
+        return None
+
+    # Find the image within the infobox
+    image_tag = infobox.find('img')
+    if not image_tag:
+        print("No image found in the infobox.")
+        return None
+
+    # Construct the full image URL
+    return f"https:{image_tag['src']}"
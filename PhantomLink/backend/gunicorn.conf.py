@@ -0,0 +1,54 @@
+import gc
+import os
+
+# Gunicorn settings for the backend (gunicorn -c gunicorn.conf.py server:app)
+#
+# /chat spends most of its time waiting on OpenAI and Wikipedia, so each worker serves
+# many requests at once instead of one:
+#   gthread (default) - a thread pool per worker; needs no monkey patching.
+#   gevent            - greenlets; psycopg2 is made cooperative with psycogreen.
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "256"))
+
+# Import the app once in the master and fork workers from it, so NLTK and its VADER
+# lexicon (~45 MB per process) and other read-only module state are shared copy-on-write.
+# Off by default for gevent: preloading imports ssl and requests before the worker can
+# monkey-patch them.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0" if worker_class == "gevent" else "1") == "1"
+
+# Streaming chat replies and slow Wikipedia scrapes can take a while
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    if preload_app:
+        # Keep the preloaded objects out of the garbage collector's scans, which would
+        # otherwise touch (and so copy) their pages in every worker
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        # Never reuse database connections the master may have opened while importing the app
+        from __init__ import db, app
+
+        with app.app_context():
+            db.engine.dispose(close=False)
+
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
+        server.log.info("Patched psycopg2 for gevent in worker %s", worker.pid)
+
+
+def worker_exit(server, worker):
+    # Write chat messages still waiting in the write-behind buffer before the worker goes away
+    import transcript_writer
+
+    transcript_writer.flush()
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Connect/read timeouts (seconds) applied to every outbound request
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+# Maximum simultaneous keep-alive connections per host (extra requests wait for a free one)
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+# Retries for connection errors and 429/5xx answers, with exponential backoff
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+
+USER_AGENT = "PhantomLink/1.0 (https://phantom-link.com; no-reply@phantom-link.com)"
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session with pooled keep-alive connections and retries.
+
+    A new session is built after a fork so workers never share sockets.
+    """
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(pid)
+            if session is None:
+                session = _build_session()
+                _sessions.clear()
+                _sessions[pid] = session
+    return session
+
+
+def _build_session():
+    retry = Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=MAX_RETRIES,
+        status=MAX_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get(url, **kwargs):
+    """
+    Sends a GET request through the shared session.
+
+    Accepts the same arguments as requests.get; a (connect, read) timeout is applied
+    unless one is given. Raises requests.exceptions.RequestException on failure.
+    """
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    host = urlsplit(url).netloc
+    start = time.perf_counter()
+    try:
+        response = get_session().get(url, **kwargs)
+    except requests.exceptions.RequestException:
+        _record(host, time.perf_counter() - start, error=True)
+        raise
+    _record(host, time.perf_counter() - start, error=response.status_code >= 400)
+    return response
+
+
+def _record(host, elapsed, error):
+    with _metrics_lock:
+        stats = _metrics.setdefault(host, {"requests": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["requests"] += 1
+        stats["errors"] += 1 if error else 0
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+
+def get_metrics():
+    """Returns request counts, errors and response times per host for this worker."""
+    with _metrics_lock:
+        return {
+            host: {
+                "requests": stats["requests"],
+                "errors": stats["errors"],
+                "avg_seconds": round(stats["total_seconds"] / stats["requests"], 4),
+                "max_seconds": round(stats["max_seconds"], 4),
+            }
+            for host, stats in _metrics.items()
+        }
@@ -0,0 +1,147 @@
+import hashlib
+import io
+import os
+import re
+import time
+import click
+import requests
+from PIL import Image, UnidentifiedImageError
+import ghost_cache
+import http_client
+from __init__ import app, db
+from local_store import DATA_DIR, get_connection
+from models import Ghost
+
+# Thumbnails live here, named after a hash of the original image, so they never change
+IMAGE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join(DATA_DIR, "images"))
+# Longest side of a thumbnail in pixels
+THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "400"))
+# Portraits larger than this are not downloaded
+MAX_IMAGE_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+WEBP_QUALITY = 80
+
+# Path the backend serves thumbnails under (nginx maps /api/images/ to IMAGE_DIR)
+PUBLIC_PREFIX = "/images/"
+THUMBNAIL_NAME = re.compile(r"^[0-9a-f]{40}\.webp$")
+
+INDEX_FILE = "image_cache.sqlite3"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_sources (
+  source_url TEXT PRIMARY KEY,
+  digest TEXT NOT NULL,
+  cached_at REAL NOT NULL
+);
+"""
+
+
+def _connection():
+    return get_connection(INDEX_FILE, SCHEMA)
+
+
+def public_url(digest):
+    return f"{PUBLIC_PREFIX}{digest}.webp"
+
+
+def is_cached_url(image_url):
+    return bool(image_url) and image_url.startswith(PUBLIC_PREFIX)
+
+
+def cache_image(source_url):
+    """
+    Downloads a portrait once and stores it as a WebP thumbnail.
+
+    The file is named after the SHA-1 of the original image and the thumbnail size, so the
+    same portrait is stored once however many ghosts or URLs point at it.
+
+    Args:
+        source_url (str): The remote image URL (e.g. an upload.wikimedia.org infobox image).
+
+    Returns:
+        str: The thumbnail's public path ("/images/<digest>.webp"), or None if the image
+             couldn't be downloaded or decoded.
+    """
+    row = _connection().execute(
+        "SELECT digest FROM image_sources WHERE source_url = ?", (source_url,)
+    ).fetchone()
+    if row and os.path.exists(os.path.join(IMAGE_DIR, f"{row['digest']}.webp")):
+        return public_url(row["digest"])
+
+    try:
+        # Closing the response hands its connection back to the pool, even when the body is cut short
+        with http_client.get(source_url, stream=True) as response:
+            response.raise_for_status()
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data.extend(chunk)
+                if len(data) > MAX_IMAGE_BYTES:
+                    print(f"Image {source_url} is larger than {MAX_IMAGE_BYTES} bytes; not caching it.")
+                    return None
+    except requests.exceptions.RequestException as e:
+        print(f"Error downloading image {source_url}: {e}")
+        return None
+
+    data = bytes(data)
+    digest = hashlib.sha1(data + f":{THUMBNAIL_SIZE}".encode()).hexdigest()
+    if not os.path.exists(os.path.join(IMAGE_DIR, f"{digest}.webp")):
+        try:
+            _write_thumbnail(data, digest)
+        except (UnidentifiedImageError, OSError, ValueError) as e:
+            print(f"Error creating a thumbnail for {source_url}: {e}")
+            return None
+
+    _connection().execute(
+        "INSERT OR REPLACE INTO image_sources (source_url, digest, cached_at) VALUES (?, ?, ?)",
+        (source_url, digest, time.time()),
+    )
+    return public_url(digest)
+
+
+def _write_thumbnail(data, digest):
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        os.makedirs(IMAGE_DIR, exist_ok=True)
+        path = os.path.join(IMAGE_DIR, f"{digest}.webp")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        image.save(temporary, "WEBP", quality=WEBP_QUALITY, method=6)
+        os.replace(temporary, path)
+
+
+def cached_image_for(image_url):
+    """
+    Returns the cached thumbnail path for a ghost's image_url, falling back to the
+    original URL when it can't be cached (and leaving local paths like /pics/... alone).
+    """
+    if not image_url or not image_url.startswith(("http://", "https://")):
+        return image_url
+    return cache_image(image_url) or image_url
+
+
+@app.cli.command("backfill-ghost-images")
+@click.option("--batch-size", default=50, help="Ghosts updated per commit.")
+def backfill_ghost_images(batch_size):
+    """
+    Downloads the remote portraits of existing ghosts and points them at cached thumbnails.
+    """
+    ghosts = Ghost.query.filter(Ghost.image_url.like("http%")).order_by(Ghost.id).all()
+    print(f"{len(ghosts)} ghosts still use remote images.")
+
+    updated = failed = 0
+    changed = set()
+    for position, ghost in enumerate(ghosts, start=1):
+        cached = cache_image(ghost.image_url)
+        if cached:
+            ghost.image_url = cached
+            changed.add((ghost.city, ghost.state))
+            updated += 1
+        else:
+            failed += 1
+        if position % batch_size == 0:
+            db.session.commit()
+            print(f"{position}/{len(ghosts)} processed")
+    db.session.commit()
+    for city, state in changed:
+        ghost_cache.invalidate(city, state)
+    print(f"Cached {updated} images; {failed} could not be downloaded and keep their remote URL.")
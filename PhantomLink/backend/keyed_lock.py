@@ -0,0 +1,35 @@
+import threading
+from contextlib import contextmanager
+
+
+class KeyedLock:
+    """
+    One lock per key within this process, e.g. per geocode cell or per person page.
+
+    A key's lock only exists while some thread holds or waits for it, so the table
+    never grows with the number of keys ever seen.
+
+    Example:
+        _probe_lock = KeyedLock()
+        with _probe_lock(person_url):
+            ...
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def __call__(self, key):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+        try:
+            yield
+        finally:
+            with self._guard:
+                entry[0].release()
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key]
@@ -0,0 +1,41 @@
+import os
+import sqlite3
+import threading
+
+# Directory that holds the backend's local SQLite files (shared by every gunicorn worker on the host)
+DATA_DIR = os.getenv("PHANTOM_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+_local = threading.local()
+
+
+def get_connection(filename, schema=None):
+    """
+    Returns this thread's connection to a SQLite file in DATA_DIR.
+
+    Connections are cached per thread and per process, so a connection opened before
+    gunicorn forks is never reused by a worker.
+
+    Args:
+        filename (str): Name of the SQLite file inside DATA_DIR.
+        schema (str): Optional SQL script run once when the connection is opened.
+
+    Returns:
+        sqlite3.Connection: A connection in WAL mode with autocommit enabled.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    key = (os.getpid(), filename)
+    connection = connections.get(key)
+    if connection is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        connection = sqlite3.connect(os.path.join(DATA_DIR, filename), timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        if schema:
+            connection.executescript(schema)
+        connections[key] = connection
+
+    return connection
@@ -0,0 +1,216 @@
+import os
+import random
+from urllib.parse import unquote
+import requests
+import http_client
+import candidate_index
+from wiki_parser import parse_html
+
+# API endpoints (point these at a local stub server for tests)
+MEDIAWIKI_API_URL = os.getenv("MEDIAWIKI_API_URL", "https://en.wikipedia.org/w/api.php")
+WIKIDATA_SPARQL_URL = os.getenv("WIKIDATA_SPARQL_URL", "https://query.wikidata.org/sparql")
+
+# Titles/IDs per request allowed by the MediaWiki and Wikibase APIs
+BATCH_SIZE = 50
+
+# Life facts of a batch of Wikidata items: only the values the deceased check reads, with the
+# occupation's English label. Items that are not humans (P31 = Q5) are not returned.
+LIFE_FACTS_QUERY = """
+SELECT ?item (MIN(YEAR(?born)) AS ?birthYear) (MIN(YEAR(?died)) AS ?deathYear) (MIN(?occupationLabel) AS ?occupation)
+WHERE {
+  VALUES ?item { %s }
+  ?item wdt:P31 wd:Q5 .
+  OPTIONAL { ?item wdt:P569 ?born . }
+  OPTIONAL { ?item wdt:P570 ?died . }
+  OPTIONAL { ?item wdt:P106 ?job . ?job rdfs:label ?occupationLabel . FILTER(LANG(?occupationLabel) = "en") }
+}
+GROUP BY ?item
+"""
+
+
+def url_to_title(url):
+    return unquote(url.rsplit('/wiki/', 1)[-1]).replace('_', ' ')
+
+
+def _query(api_url, params):
+    params = dict(params, format="json", formatversion=2)
+    response = http_client.get(api_url, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def _batches(items):
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def fetch_list_candidates(list_title):
+    """
+    Fetches the candidate person URLs of a "List of people from" page.
+
+    Uses action=parse, which returns only the article body instead of the full skin.
+
+    Returns:
+        list: Candidate URLs, or None if the page doesn't exist.
+    """
+    from wiki_scraper import extract_candidate_links
+
+    data = _query(MEDIAWIKI_API_URL, {"action": "parse", "page": list_title, "prop": "text", "redirects": 1})
+    if "error" in data:
+        print(f"MediaWiki API could not parse {list_title}: {data['error'].get('info')}")
+        return None
+    return extract_candidate_links(parse_html(data["parse"]["text"]))
+
+
+def fetch_wikidata_ids(titles):
+    """
+    Maps article titles to their Wikidata item IDs, 50 titles per request.
+    """
+    ids = {}
+    for batch in _batches(titles):
+        data = _query(MEDIAWIKI_API_URL, {
+            "action": "query",
+            "prop": "pageprops",
+            "ppprop": "wikibase_item",
+            "redirects": 1,
+            "titles": "|".join(batch),
+        })
+        query = data.get("query", {})
+
+        # Follow normalization and redirects back to the titles we asked for
+        aliases = {}
+        for mapping in query.get("normalized", []) + query.get("redirects", []):
+            aliases[mapping["to"]] = aliases.get(mapping["from"], mapping["from"])
+
+        for page in query.get("pages", []):
+            item = page.get("pageprops", {}).get("wikibase_item")
+            if item:
+                ids[aliases.get(page["title"], page["title"])] = item
+    return ids
+
+
+def fetch_life_facts(item_ids):
+    """
+    Reads birth year, death year and occupation from Wikidata, 50 items per request.
+
+    Uses one SPARQL query per batch instead of wbgetentities with props=claims, which
+    returns every statement of every item (often hundreds of KB per batch of people)
+    and needed a second request for the occupation label.
+
+    Returns:
+        dict: item ID -> {"is_human", "birth_year", "death_year", "occupation"}.
+    """
+    facts = {}
+    for batch in _batches(item_ids):
+        response = http_client.get(WIKIDATA_SPARQL_URL, params={
+            "query": LIFE_FACTS_QUERY % " ".join(f"wd:{item_id}" for item_id in batch),
+            "format": "json",
+        })
+        response.raise_for_status()
+        found = {}
+        for row in response.json()["results"]["bindings"]:
+            item_id = row["item"]["value"].rsplit("/", 1)[-1]
+            found[item_id] = {
+                "is_human": True,
+                "birth_year": _binding_year(row, "birthYear"),
+                "death_year": _binding_year(row, "deathYear"),
+                "occupation": row.get("occupation", {}).get("value"),
+            }
+        for item_id in batch:
+            facts[item_id] = found.get(item_id) or {
+                "is_human": False, "birth_year": None, "death_year": None, "occupation": None,
+            }
+    return facts
+
+
+def fetch_page_summary(title):
+    """
+    Fetches the plain-text article and lead image of one article in a single request.
+
+    Returns:
+        dict: {"extract": str, "image_url": str or None}.
+    """
+    data = _query(MEDIAWIKI_API_URL, {
+        "action": "query",
+        "prop": "extracts|pageimages",
+        "explaintext": 1,
+        "exsectionformat": "plain",
+        "piprop": "thumbnail",
+        "pithumbsize": 400,
+        "redirects": 1,
+        "titles": title,
+    })
+    for page in data.get("query", {}).get("pages", []):
+        return {"extract": page.get("extract", ""), "image_url": page.get("thumbnail", {}).get("source")}
+    return {"extract": "", "image_url": None}
+
+
+def find_deceased_person(candidate_urls):
+    """
+    API-backed counterpart of wiki_scraper.find_deceased_person.
+
+    Checks every candidate at once through batched pageprops and Wikidata lookups, picks
+    a random deceased person and fetches only that person's text and image.
+
+    Returns:
+        tuple: (details, paragraphs, person_url), or (None, [], None) if no candidate qualifies.
+    """
+    try:
+        urls = {url_to_title(url): url for url in candidate_urls}
+        titles = list(urls)
+        item_ids = fetch_wikidata_ids(titles)
+        facts = fetch_life_facts(sorted(set(item_ids.values())))
+
+        deceased = []
+        for title in titles:
+            fact = facts.get(item_ids.get(title))
+            if fact and fact["is_human"] and fact["birth_year"] and fact["death_year"]:
+                deceased.append(title)
+            else:
+                candidate_index.save_verdict(urls[title], False)
+
+        if not deceased:
+            print("No valid deceased pages found.")
+            return None, [], None
+
+        title = random.choice(deceased)
+        fact = facts[item_ids[title]]
+        summary = fetch_page_summary(title)
+        occupation = fact["occupation"].capitalize() if fact["occupation"] else None
+
+        person_url = urls[title]
+        details = (title, fact["birth_year"], str(fact["death_year"]), occupation)
+        paragraphs = [paragraph for paragraph in summary["extract"].split("\n") if paragraph.strip()]
+        print(f"\nFound deceased person through the MediaWiki API: {title}")
+
+        candidate_index.save_verdict(person_url, True, details, paragraphs)
+        candidate_index.save_image(person_url, summary["image_url"])
+        return details, paragraphs, person_url
+
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        print(f"An error occurred while querying the MediaWiki API: {e}")
+        return None, [], None
+
+
+def fetch_page_image(wikipedia_url):
+    """Returns the lead image of an article through the pageimages API, or None."""
+    try:
+        data = _query(MEDIAWIKI_API_URL, {
+            "action": "query",
+            "prop": "pageimages",
+            "piprop": "thumbnail",
+            "pithumbsize": 400,
+            "redirects": 1,
+            "titles": url_to_title(wikipedia_url),
+        })
+        for page in data.get("query", {}).get("pages", []):
+            return page.get("thumbnail", {}).get("source")
+        return None
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"An error occurred while fetching the page image: {e}")
+        return None
+
+
+def _binding_year(row, name):
+    value = row.get(name, {}).get("value", "")
+    return int(value) if value.lstrip("-").isdigit() else None
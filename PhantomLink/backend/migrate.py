@@ -0,0 +1,83 @@
+import os
+import re
+import sys
+from datetime import datetime
+from sqlalchemy import text
+from __init__ import app, db
+
+# Versioned SQL migrations, applied in file name order: NNNN_description.sql
+MIGRATIONS_DIR = os.getenv("MIGRATIONS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations"))
+MIGRATION_FILE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+# Any constant works; it only has to be the same in every process running migrations
+ADVISORY_LOCK_ID = 7_412_903
+
+
+def list_migrations(directory=MIGRATIONS_DIR):
+    """Returns (version, name, path) for every migration file, oldest first."""
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((match.group(1), match.group(2), os.path.join(directory, filename)))
+    return migrations
+
+
+def _ensure_table(connection):
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(16) PRIMARY KEY, name VARCHAR(200) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def applied_versions(connection):
+    _ensure_table(connection)
+    return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def migrate(directory=MIGRATIONS_DIR):
+    """
+    Applies every pending migration, each in its own transaction.
+
+    On Postgres a transaction-level advisory lock makes concurrent runs (e.g. several
+    containers starting at once) apply each migration exactly once.
+
+    Returns:
+        list: The versions applied by this run.
+    """
+    applied = []
+    for version, name, path in list_migrations(directory):
+        with open(path) as f:
+            sql = f.read()
+
+        with db.engine.begin() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+            if version in applied_versions(connection):
+                continue
+
+            print(f"Applying migration {version}_{name}...")
+            # no_parameters: psycopg2 would otherwise read literal % signs (e.g. LIKE 'User: %') as placeholders
+            connection.execution_options(no_parameters=True).exec_driver_sql(sql)
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.utcnow()},
+            )
+            applied.append(version)
+    return applied
+
+
+def status(directory=MIGRATIONS_DIR):
+    """Prints every migration and whether it has been applied."""
+    with db.engine.begin() as connection:
+        done = applied_versions(connection)
+    for version, name, _ in list_migrations(directory):
+        print(f"{'applied' if version in done else 'pending'}  {version}_{name}")
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        if sys.argv[1:2] == ["status"]:
+            status()
+        else:
+            applied = migrate()
+            print(f"Applied {len(applied)} migration(s)." if applied else "Database is up to date.")
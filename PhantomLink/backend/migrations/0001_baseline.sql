@@ -0,0 +1,59 @@
+-- Schema as of db/init.sql, the server-side session table and the ghost pool columns.
+-- Every statement is idempotent, so databases created by init.sql (or by older
+-- versions of it) are brought to the same starting point.
+
+CREATE TABLE IF NOT EXISTS users (
+  id SERIAL PRIMARY KEY,
+  username VARCHAR(80) NOT NULL UNIQUE,
+  email VARCHAR(120) NOT NULL UNIQUE,
+  password VARCHAR(200) NOT NULL,
+  confirmation_code VARCHAR(6),
+  is_email_verified BOOLEAN DEFAULT FALSE,
+  reset_token VARCHAR(256)
+);
+
+CREATE TABLE IF NOT EXISTS ghosts (
+  id SERIAL PRIMARY KEY,
+  name VARCHAR(120) NOT NULL,
+  prompt TEXT NOT NULL,
+  city VARCHAR(80),
+  state VARCHAR(80),
+  image_url VARCHAR(200)
+);
+ALTER TABLE ghosts ADD COLUMN IF NOT EXISTS details TEXT;
+ALTER TABLE ghosts ADD COLUMN IF NOT EXISTS pooled BOOLEAN NOT NULL DEFAULT FALSE;
+CREATE INDEX IF NOT EXISTS idx_ghosts_pool ON ghosts (city, state, id) WHERE pooled;
+
+CREATE TABLE IF NOT EXISTS conversations (
+  id SERIAL PRIMARY KEY,
+  user_id INT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  ghost_name VARCHAR(255) NOT NULL,
+  chat_log TEXT NOT NULL,
+  location VARCHAR(255),
+  timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ghost_jobs (
+  id SERIAL PRIMARY KEY,
+  kind VARCHAR(16) NOT NULL DEFAULT 'session',
+  city VARCHAR(80) NOT NULL,
+  state VARCHAR(80) NOT NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',
+  name VARCHAR(120),
+  prompt TEXT,
+  wikipedia_url VARCHAR(500),
+  error TEXT,
+  attempts INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP,
+  finished_at TIMESTAMP
+);
+ALTER TABLE ghost_jobs ADD COLUMN IF NOT EXISTS kind VARCHAR(16) NOT NULL DEFAULT 'session';
+CREATE INDEX IF NOT EXISTS idx_ghost_jobs_status_id ON ghost_jobs (status, id);
+
+CREATE TABLE IF NOT EXISTS server_sessions (
+  session_key VARCHAR(128) PRIMARY KEY,
+  data TEXT NOT NULL,
+  expires_at DOUBLE PRECISION NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_server_sessions_expires_at ON server_sessions (expires_at);
@@ -0,0 +1,21 @@
+-- Indexes for the lookups the routes run on every request.
+
+-- add_ghost looks ghosts up by name; a unique index also stops two concurrent
+-- add_ghost calls from both inserting the same ghost. Older duplicates are
+-- dropped first, keeping the oldest row.
+DELETE FROM ghosts duplicate
+USING ghosts original
+WHERE duplicate.name = original.name AND duplicate.id > original.id;
+CREATE UNIQUE INDEX IF NOT EXISTS ux_ghosts_name ON ghosts (name);
+
+-- /ghosts: WHERE city = ? AND state = ?
+CREATE INDEX IF NOT EXISTS idx_ghosts_city_state ON ghosts (city, state, id);
+
+-- /conversations: WHERE user_id = ? ORDER BY timestamp DESC
+CREATE INDEX IF NOT EXISTS idx_conversations_user_timestamp ON conversations (user_id, timestamp DESC, id DESC);
+
+-- /reset-password: WHERE reset_token = ?  (only users with a pending reset have one)
+CREATE INDEX IF NOT EXISTS idx_users_reset_token ON users (reset_token) WHERE reset_token IS NOT NULL;
+
+-- Ghost pool refills count a city's queued/running/failed pool jobs
+CREATE INDEX IF NOT EXISTS idx_ghost_jobs_city_state ON ghost_jobs (city, state, kind, status);
@@ -0,0 +1,28 @@
+-- Store conversations one message per row instead of a flat "User: ...\n\nGhost: ..." string.
+
+CREATE TABLE IF NOT EXISTS messages (
+  conversation_id INT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+  seq INT NOT NULL,                      -- 1-based position in the conversation
+  role VARCHAR(16) NOT NULL,             -- user or assistant
+  content TEXT NOT NULL,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (conversation_id, seq)
+);
+
+ALTER TABLE conversations ALTER COLUMN chat_log DROP NOT NULL;
+
+-- Split existing chat logs at every blank line that starts a new "User: " or "Ghost: " message
+INSERT INTO messages (conversation_id, seq, role, content, created_at)
+SELECT c.id,
+       part.seq,
+       CASE WHEN part.text LIKE 'User: %' THEN 'user' ELSE 'assistant' END,
+       regexp_replace(part.text, '^(User|Ghost): ', ''),
+       COALESCE(c.timestamp, CURRENT_TIMESTAMP)
+FROM conversations c
+CROSS JOIN LATERAL regexp_split_to_table(c.chat_log, E'\n\n(?=(User|Ghost): )') WITH ORDINALITY AS part(text, seq)
+WHERE c.chat_log IS NOT NULL AND c.chat_log <> ''
+ON CONFLICT DO NOTHING;
+
+-- The messages now hold the transcript; drop the flat copies so their TOAST space can be reused
+UPDATE conversations SET chat_log = NULL
+WHERE chat_log IS NOT NULL AND EXISTS (SELECT 1 FROM messages m WHERE m.conversation_id = conversations.id);
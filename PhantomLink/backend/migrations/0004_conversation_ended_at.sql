@@ -0,0 +1,5 @@
+-- Conversations are now saved from their first turn; ended_at marks the ones the user finished.
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS ended_at TIMESTAMP;
+
+-- Every conversation saved before this migration was saved by /end-conversation
+UPDATE conversations SET ended_at = timestamp WHERE ended_at IS NULL;
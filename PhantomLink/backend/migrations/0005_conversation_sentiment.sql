@@ -0,0 +1,18 @@
+-- Per-conversation sentiment curves, filled by `flask --app server sentiment-trajectories`.
+
+CREATE TABLE IF NOT EXISTS conversation_sentiment (
+  conversation_id INT PRIMARY KEY REFERENCES conversations(id) ON DELETE CASCADE,
+  user_turns INT NOT NULL,
+  final_score INT NOT NULL,              -- session['user_sentiment'] after the last turn
+  min_score INT NOT NULL,
+  max_score INT NOT NULL,
+  warm_turn INT,                         -- first user turn whose running score reached WARM_SCORE
+  hostile_turn INT,                      -- first user turn at or below HOSTILE_SCORE
+  warm_turns INT NOT NULL,               -- user turns answered in each prompt tier
+  neutral_turns INT NOT NULL,
+  hostile_turns INT NOT NULL,
+  mean_compound DOUBLE PRECISION,
+  scores TEXT NOT NULL,                  -- JSON list: running score after each user turn
+  compounds TEXT NOT NULL,               -- JSON list: VADER compound score of each user turn
+  analyzed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+from __init__ import db
+
+
+class User(db.Model):
+    __tablename__ = "users"
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    confirmation_code = db.Column(db.String(6))
+    is_email_verified = db.Column(db.Boolean, default=False)
+    reset_token = db.Column(db.String(256))
+
+    # Relationship with Conversation
+    conversations = db.relationship('Conversation', backref='user', lazy=True)
+
+class Ghost(db.Model):
+    __tablename__ = "ghosts"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+    prompt = db.Column(db.Text, nullable=False)
+    city = db.Column(db.String(80))
+    state = db.Column(db.String(80))
+    image_url = db.Column(db.String(200))
+    details = db.Column(db.Text)  # JSON: birth_year, death_year, occupation, wikipedia_url
+    pooled = db.Column(db.Boolean, nullable=False, default=False)  # Ready-made and not handed out by /chat yet
+
+    def get_details(self):
+        return json.loads(self.details) if self.details else {}
+
+class Conversation(db.Model):
+    __tablename__ = 'conversations'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    ghost_name = db.Column(db.String(255), nullable=False, default="Unknown")  # Ensure ghost_name exists
+    chat_log = db.deferred(db.Column(db.Text, nullable=True))  # Legacy flat transcript; new ones are in messages
+    location = db.Column(db.String(255), nullable=True)  # Add location column
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    ended_at = db.Column(db.DateTime)  # None while the chat is still going
+
+
+class Message(db.Model):
+    """One user or ghost message of a saved conversation, in order."""
+    __tablename__ = "messages"
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id', ondelete="CASCADE"), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)  # 1-based position in the conversation
+    role = db.Column(db.String(16), nullable=False)  # user or assistant
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class GhostJob(db.Model):
+    __tablename__ = "ghost_jobs"
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(16), nullable=False, default="session")  # session: one visitor's ghost, pool: a pooled Ghost row
+    city = db.Column(db.String(80), nullable=False)
+    state = db.Column(db.String(80), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="queued")  # queued, running, done, failed
+    name = db.Column(db.String(120))
+    prompt = db.Column(db.Text)
+    wikipedia_url = db.Column(db.String(500))
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "city": self.city,
+            "state": self.state,
+            "status": self.status,
+            "name": self.name,
+            "error": self.error,
+            "attempts": self.attempts,
+            "created_at": self.created_at.isoformat(),
+            "queue_seconds": seconds_between(self.created_at, self.started_at),
+            "run_seconds": seconds_between(self.started_at, self.finished_at),
+        }
+
+
+def seconds_between(start, end):
+    if not start or not end:
+        return None
+    return round((end - start).total_seconds(), 3)
+
+
+class ConversationSentiment(db.Model):
+    """Sentiment curve of a saved conversation, written by the sentiment-trajectories command."""
+    __tablename__ = "conversation_sentiment"
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id', ondelete="CASCADE"), primary_key=True)
+    user_turns = db.Column(db.Integer, nullable=False)
+    final_score = db.Column(db.Integer, nullable=False)  # session['user_sentiment'] after the last turn
+    min_score = db.Column(db.Integer, nullable=False)
+    max_score = db.Column(db.Integer, nullable=False)
+    warm_turn = db.Column(db.Integer)  # First user turn whose running score reached WARM_SCORE
+    hostile_turn = db.Column(db.Integer)  # First user turn at or below HOSTILE_SCORE
+    warm_turns = db.Column(db.Integer, nullable=False)  # User turns answered in each prompt tier
+    neutral_turns = db.Column(db.Integer, nullable=False)
+    hostile_turns = db.Column(db.Integer, nullable=False)
+    mean_compound = db.Column(db.Float)
+    scores = db.Column(db.Text, nullable=False)  # JSON list: running score after each user turn
+    compounds = db.Column(db.Text, nullable=False)  # JSON list: VADER compound score of each user turn
+    analyzed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,201 @@
+"""
+Offline reverse geocoder backed by a GeoNames city dump.
+
+Set GEONAMES_CITIES_FILE to a GeoNames cities file (e.g. cities1000.txt) and
+GEONAMES_ADMIN1_FILE to admin1CodesASCII.txt. The first load converts them into
+plain .npy arrays in DATA_DIR/geonames, which later loads memory-map, so a
+worker starts in milliseconds and every worker shares the same page cache.
+Cities are sorted by 1-degree grid cell and cell_starts holds where each
+cell begins, so the cells around a point are one array slice per grid row
+and a lookup only measures the distance to the cities in them.
+
+Build the arrays ahead of time with:
+    python offline_geocoder.py build
+"""
+import json
+import math
+import os
+import sys
+import threading
+import numpy as np
+from local_store import DATA_DIR
+
+CITIES_FILE = os.getenv("GEONAMES_CITIES_FILE")
+ADMIN1_FILE = os.getenv("GEONAMES_ADMIN1_FILE")
+INDEX_DIR = os.getenv("GEONAMES_INDEX_DIR", os.path.join(DATA_DIR, "geonames"))
+# Lookups with no city within this distance fall back to Nominatim
+RADIUS_KM = float(os.getenv("OFFLINE_GEOCODER_RADIUS_KM", "25"))
+
+GRID_DEGREES = 1.0
+LON_CELLS = int(360 / GRID_DEGREES)
+LAT_CELLS = int(180 / GRID_DEGREES) + 1
+EARTH_RADIUS_KM = 6371.0
+
+# Columns of the GeoNames "geoname" table dump
+NAME, LATITUDE, LONGITUDE, FEATURE_CLASS, COUNTRY_CODE, ADMIN1_CODE = 1, 4, 5, 6, 8, 10
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def enabled():
+    """Returns True when a GeoNames dump or a prebuilt index is configured."""
+    return bool(CITIES_FILE) or os.path.exists(os.path.join(INDEX_DIR, "meta.json"))
+
+
+def _cell_ids(latitudes, longitudes):
+    lat_cells = np.floor((np.asarray(latitudes) + 90) / GRID_DEGREES).astype(np.int64)
+    lon_cells = np.floor((np.asarray(longitudes) + 180) / GRID_DEGREES).astype(np.int64) % LON_CELLS
+    return lat_cells * LON_CELLS + lon_cells
+
+
+def build_index(cities_file=CITIES_FILE, admin1_file=ADMIN1_FILE, index_dir=INDEX_DIR):
+    """
+    Converts a GeoNames cities dump into the array files read by load_index.
+
+    Returns:
+        int: The number of indexed cities.
+    """
+    admin1 = {}
+    if admin1_file:
+        with open(admin1_file, encoding="utf-8") as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) >= 2:
+                    admin1[fields[0]] = fields[1]
+
+    latitudes, longitudes, names, region_ids = [], [], [], []
+    regions = {}
+    with open(cities_file, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) <= ADMIN1_CODE or fields[FEATURE_CLASS] != "P":
+                continue
+            country = fields[COUNTRY_CODE]
+            state = admin1.get(f"{country}.{fields[ADMIN1_CODE]}")
+            region = regions.setdefault((state, country), len(regions))
+            latitudes.append(float(fields[LATITUDE]))
+            longitudes.append(float(fields[LONGITUDE]))
+            names.append(fields[NAME])
+            region_ids.append(region)
+
+    cells = _cell_ids(latitudes, longitudes)
+    order = np.argsort(cells, kind="stable")
+
+    encoded = [names[i].encode("utf-8") for i in order]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(name) for name in encoded])
+
+    cell_starts = np.searchsorted(cells[order], np.arange(LAT_CELLS * LON_CELLS + 1))
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, "cell_starts.npy"), cell_starts)
+    np.save(os.path.join(index_dir, "coords.npy"), np.radians(np.column_stack([latitudes, longitudes])[order]))
+    np.save(os.path.join(index_dir, "regions.npy"), np.asarray(region_ids, dtype=np.int32)[order])
+    np.save(os.path.join(index_dir, "names.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(index_dir, "name_offsets.npy"), offsets)
+    with open(os.path.join(index_dir, "meta.json"), "w") as f:
+        json.dump({"regions": [list(region) for region in regions], "count": len(names)}, f)
+    return len(names)
+
+
+def load_index():
+    """Returns the memory-mapped index, building it from GEONAMES_CITIES_FILE on first use."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                meta_path = os.path.join(INDEX_DIR, "meta.json")
+                stale = CITIES_FILE and (
+                    not os.path.exists(meta_path) or os.path.getmtime(meta_path) < os.path.getmtime(CITIES_FILE)
+                )
+                if stale:
+                    print(f"Building offline geocoder index from {CITIES_FILE}...")
+                    build_index()
+
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                arrays = {
+                    name: np.load(os.path.join(INDEX_DIR, f"{name}.npy"), mmap_mode="r")
+                    for name in ("cell_starts", "coords", "regions", "names", "name_offsets")
+                }
+                arrays["regions_meta"] = meta["regions"]
+                _index = arrays
+    return _index
+
+
+def lookup(latitude, longitude, radius_km=RADIUS_KM):
+    """
+    Finds the nearest city to a coordinate.
+
+    Returns:
+        dict: {"city", "state", "country_code", "distance_km"}, or None if no city is
+              within radius_km.
+    """
+    index = load_index()
+    latitude, longitude = float(latitude), float(longitude)
+
+    # Grid cells that can hold a city within the radius
+    lat_span = math.ceil(radius_km / (111.0 * GRID_DEGREES))
+    cos_lat = max(math.cos(math.radians(min(abs(latitude) + lat_span * GRID_DEGREES, 89.9))), 1e-6)
+    lon_span = min(math.ceil(radius_km / (111.0 * cos_lat * GRID_DEGREES)), LON_CELLS // 2)
+    lat_cell = math.floor((latitude + 90) / GRID_DEGREES)
+    lon_cell = math.floor((longitude + 180) / GRID_DEGREES)
+
+    # Neighbouring cells of a grid row are adjacent in the arrays; only the antimeridian splits a row
+    lon_ranges = [(lon_cell - lon_span, lon_cell + lon_span)]
+    if lon_ranges[0][0] < 0:
+        lon_ranges = [(0, lon_ranges[0][1]), (lon_ranges[0][0] % LON_CELLS, LON_CELLS - 1)]
+    elif lon_ranges[0][1] >= LON_CELLS:
+        lon_ranges = [(lon_ranges[0][0], LON_CELLS - 1), (0, lon_ranges[0][1] % LON_CELLS)]
+
+    cell_starts = index["cell_starts"]
+    slices = []
+    for row in range(max(lat_cell - lat_span, 0), min(lat_cell + lat_span, LAT_CELLS - 1) + 1):
+        for first, last in lon_ranges:
+            start, end = cell_starts[row * LON_CELLS + first], cell_starts[row * LON_CELLS + last + 1]
+            if start < end:
+                slices.append((int(start), int(end)))
+    if not slices:
+        return None
+
+    candidates = np.concatenate([np.arange(start, end) for start, end in slices])
+    coords = index["coords"][candidates]
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    # Haversine distance to every candidate
+    a = (np.sin((coords[:, 0] - lat) / 2) ** 2
+         + math.cos(lat) * np.cos(coords[:, 0]) * np.sin((coords[:, 1] - lon) / 2) ** 2)
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    nearest = int(np.argmin(distances))
+    if distances[nearest] > radius_km:
+        return None
+
+    row = int(candidates[nearest])
+    offsets = index["name_offsets"]
+    name = bytes(index["names"][offsets[row]:offsets[row + 1]]).decode("utf-8")
+    state, country = index["regions_meta"][int(index["regions"][row])]
+    return {"city": name, "state": state, "country_code": country, "distance_km": round(float(distances[nearest]), 3)}
+
+
+def reverse(latitude, longitude, radius_km=RADIUS_KM):
+    """
+    lookup() shaped like Nominatim's raw answer ("address" and "display_name"), or None.
+    """
+    place = lookup(latitude, longitude, radius_km)
+    if place is None:
+        return None
+    address = {"city": place["city"], "country_code": place["country_code"].lower()}
+    if place["state"]:
+        address["state"] = place["state"]
+    return {
+        "address": address,
+        "display_name": ", ".join(part for part in (place["city"], place["state"], place["country_code"]) if part),
+        "source": "geonames",
+        "distance_km": place["distance_km"],
+    }
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["build"] or not CITIES_FILE:
+        sys.exit("Usage: GEONAMES_CITIES_FILE=cities1000.txt GEONAMES_ADMIN1_FILE=admin1CodesASCII.txt python offline_geocoder.py build")
+    print(f"Indexed {build_index()} cities into {INDEX_DIR}")
@@ -0,0 +1,129 @@
+import os
+import re
+import threading
+import time
+from context_window import estimate_tokens, truncate_to_tokens
+from gpt_prompt_maker import persona_parts
+from local_store import get_connection
+from summarizer import summarize
+
+# Size of a ghost's system prompt (persona + biography) in tokens
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "600"))
+# Cached prompts are rebuilt after this many seconds, picking up edits to the Wikipedia page
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", str(30 * 24 * 3600)))
+# Bump whenever the prompt template or trimming changes, so cached prompts are rebuilt
+PROMPT_VERSION = 2
+
+CACHE_FILE = os.getenv("PROMPT_CACHE_FILE", "prompt_cache.sqlite3")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ghost_prompts (
+  wikipedia_url TEXT PRIMARY KEY,
+  version INTEGER NOT NULL,
+  token_budget INTEGER NOT NULL,
+  prompt TEXT NOT NULL,
+  tokens INTEGER NOT NULL,
+  built_at REAL NOT NULL
+);
+"""
+
+# Wikipedia reference markers such as [12], [a] or [citation needed]
+CITATION = re.compile(r"\[(?:\d+|[a-z]|citation needed|note \d+)\]")
+# Where a trimmed biography may end: after a sentence, or failing that after a word
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*\s")
+
+_metrics = {"hits": 0, "misses": 0, "uncached": 0, "trimmed": 0, "build_seconds": 0.0}
+_metrics_lock = threading.Lock()
+
+
+def _connection():
+    return get_connection(CACHE_FILE, SCHEMA)
+
+
+def build_prompt(name, birth_year, death_year, occupation, paragraphs, wikipedia_url=None, token_budget=None):
+    """
+    Returns a ghost's system prompt, fitted to the token budget.
+
+    The persona introduction and the character instructions are always kept whole; only
+    the biography between them is trimmed. Prompts built for a Wikipedia URL are cached
+    in a SQLite file shared by every worker, keyed by the URL, PROMPT_VERSION and budget.
+
+    Args:
+        name, birth_year, death_year, occupation: The person's infobox details.
+        paragraphs (list or str): The scraped biography.
+        wikipedia_url (str): The person's page, used as the cache key. None skips the cache.
+        token_budget (int): Overrides PROMPT_TOKEN_BUDGET.
+
+    Returns:
+        str: The finished prompt.
+    """
+    token_budget = token_budget or PROMPT_TOKEN_BUDGET
+    if wikipedia_url:
+        row = _connection().execute(
+            "SELECT prompt FROM ghost_prompts WHERE wikipedia_url = ? AND version = ? AND token_budget = ? AND built_at > ?",
+            (wikipedia_url, PROMPT_VERSION, token_budget, time.time() - PROMPT_CACHE_TTL),
+        ).fetchone()
+        if row:
+            _count("hits")
+            return row["prompt"]
+
+    start = time.perf_counter()
+    introduction, instructions = persona_parts(name, birth_year, death_year, occupation)
+    biography = "\n\n".join(paragraphs) if isinstance(paragraphs, (list, tuple)) else (paragraphs or "")
+    biography = CITATION.sub("", biography).strip()
+    available = token_budget - estimate_tokens(introduction) - estimate_tokens(instructions)
+    fitted = fit_biography(biography, available)
+    prompt = f"{introduction}{fitted}{instructions}"
+    tokens = estimate_tokens(prompt)
+
+    with _metrics_lock:
+        _metrics["misses" if wikipedia_url else "uncached"] += 1
+        _metrics["trimmed"] += fitted != biography
+        _metrics["build_seconds"] += time.perf_counter() - start
+
+    if wikipedia_url:
+        _connection().execute(
+            "INSERT OR REPLACE INTO ghost_prompts (wikipedia_url, version, token_budget, prompt, tokens, built_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (wikipedia_url, PROMPT_VERSION, token_budget, prompt, tokens, time.time()),
+        )
+    print(f"Built prompt for {name}: ~{tokens} tokens (budget {token_budget})")
+    return prompt
+
+
+def fit_biography(biography, max_tokens):
+    """
+    Shrinks a biography to max_tokens.
+
+    Long biographies are summarized (see summarizer.py) so the prompt keeps the most
+    informative sentences from the whole article rather than just its opening. Plain
+    truncation, ending on a sentence or word boundary, is the fallback.
+    """
+    biography = biography.strip()
+    if estimate_tokens(biography) <= max_tokens:
+        return biography
+
+    summary = summarize(biography, max_tokens)
+    if summary and estimate_tokens(summary) <= max_tokens:
+        return summary
+
+    cut = truncate_to_tokens(biography, max_tokens)
+    sentence_ends = [match.end() for match in SENTENCE_END.finditer(cut)]
+    # Only back up to a sentence end if that doesn't throw away most of the text
+    if sentence_ends and sentence_ends[-1] >= len(cut) // 2:
+        return cut[:sentence_ends[-1]].rstrip()
+    return cut.rsplit(" ", 1)[0].rstrip() if " " in cut else cut
+
+
+def _count(name):
+    with _metrics_lock:
+        _metrics[name] += 1
+
+
+def get_metrics():
+    """Returns this worker's prompt cache hits/misses and build time."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    lookups = metrics["hits"] + metrics["misses"]
+    metrics["hit_ratio"] = round(metrics["hits"] / lookups, 4) if lookups else None
+    metrics["build_seconds"] = round(metrics["build_seconds"], 4)
+    return metrics
@@ -1,15 +1,85 @@
+import os
+import threading
+from collections import namedtuple
 from nltk.sentiment import SentimentIntensityAnalyzer
 
-# Initialize SentimentIntensityAnalyzer
-sia = SentimentIntensityAnalyzer()
+# VADER compound scores at or above `positive` count as positive (+1), at or below
+# `negative` as negative (-1); anything in between is neutral (0)
+Thresholds = namedtuple("Thresholds", ["positive", "negative"])
 
-def analyze_sentiment(user_message):
-    # Analyze the sentiment of the user message
-    sentiment_score = sia.polarity_scores(user_message)['compound']
-    
-    if sentiment_score >= 0.00:
+THRESHOLDS = Thresholds(
+    positive=float(os.getenv("SENTIMENT_POSITIVE_THRESHOLD", "0.00")),
+    negative=float(os.getenv("SENTIMENT_NEGATIVE_THRESHOLD", "-0.05")),
+)
+
+_analyzer = None
+_analyzer_lock = threading.Lock()
+
+
+def get_analyzer():
+    """
+    Returns the process-wide VADER analyzer, reading the lexicon on first use.
+
+    The analyzer is only read after it's built, so one instance serves every thread. When
+    gunicorn preloads the app (see gunicorn.conf.py) it is built once in the master and the
+    workers share its memory instead of each loading their own copy.
+    """
+    global _analyzer
+    if _analyzer is None:
+        with _analyzer_lock:
+            if _analyzer is None:
+                _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def classify(compound, thresholds=None):
+    """Maps a VADER compound score to 1 (positive), -1 (negative) or 0 (neutral)."""
+    thresholds = thresholds or THRESHOLDS
+    if thresholds.negative > thresholds.positive:
+        raise ValueError(f"Negative threshold {thresholds.negative} is above positive threshold {thresholds.positive}")
+
+    if compound >= thresholds.positive:
         return 1  # Positive sentiment
-    elif sentiment_score <= -0.05:
+    elif compound <= thresholds.negative:
         return -1  # Negative sentiment
     else:
         return 0  # Neutral sentiment
+
+
+def analyze_sentiment(user_message, thresholds=None):
+    # Analyze the sentiment of the user message
+    sentiment_score = get_analyzer().polarity_scores(user_message)['compound']
+    return classify(sentiment_score, thresholds)
+
+
+def analyze_many(messages, thresholds=None, scores=False):
+    """
+    Scores a batch of messages, e.g. for backfills and analytics over stored transcripts.
+
+    Each distinct text is scored once, so short replies that repeat across a batch
+    ("yes", "hello?", ...) cost a dictionary lookup.
+
+    Args:
+        messages (iterable): Message texts.
+        thresholds (Thresholds): Cutoffs to classify with; defaults to THRESHOLDS.
+        scores (bool): Return the raw compound scores instead of -1/0/1 labels.
+
+    Returns:
+        list: One label (or compound score) per message, in input order.
+    """
+    analyzer = get_analyzer()
+    compounds = {}
+    results = []
+    for message in messages:
+        compound = compounds.get(message)
+        if compound is None:
+            compound = compounds[message] = analyzer.polarity_scores(message)['compound']
+        results.append(compound)
+
+    if scores:
+        return results
+    return [classify(compound, thresholds) for compound in results]
+
+
+# Build the analyzer at import time so a preloaded app loads the lexicon before forking
+get_analyzer()
@@ -0,0 +1,197 @@
+"""
+Offline sentiment trajectories for saved conversations.
+
+The running score /chat keeps in session['user_sentiment'] is gone once a chat ends.
+This rebuilds it: every user message is re-scored with the current analyzer and
+thresholds, and each conversation gets its curve (the running score after every
+turn), the turn it reached WARM_SCORE / HOSTILE_SCORE and how many turns were
+answered in each prompt tier.
+
+Conversations are read in keyset-ordered chunks and each chunk is written before
+the next is read, so memory stays bounded by --chunk-size however many
+conversations there are.
+
+    flask --app server sentiment-trajectories                 # into conversation_sentiment
+    flask --app server sentiment-trajectories --parquet out.parquet
+"""
+import json
+from datetime import datetime
+import click
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from __init__ import app, db
+from models import Conversation, ConversationSentiment, Message
+from sentiment_analysis import analyze_many, classify
+from sentiment_prompt import WARM_SCORE, HOSTILE_SCORE, sentiment_tier
+
+COLUMNS = [column.name for column in ConversationSentiment.__table__.columns]
+
+
+def conversation_chunks(chunk_size, since_id=0, rescore=False, include_open=False):
+    """
+    Yields lists of conversation ids in id order, chunk_size at a time.
+
+    Only finished conversations are read unless include_open is set, and ones already in
+    conversation_sentiment are skipped unless rescore is set.
+    """
+    last_id = since_id
+    while True:
+        query = select(Conversation.id).where(Conversation.id > last_id)
+        if not include_open:
+            query = query.where(Conversation.ended_at.isnot(None))
+        if not rescore:
+            query = query.where(~select(ConversationSentiment.conversation_id).where(
+                ConversationSentiment.conversation_id == Conversation.id
+            ).exists())
+        ids = db.session.execute(query.order_by(Conversation.id).limit(chunk_size)).scalars().all()
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+
+
+def user_turns(conversation_ids):
+    """Returns {conversation_id: [user message, ...]} for a chunk of conversations."""
+    rows = db.session.execute(
+        select(Message.conversation_id, Message.content)
+        .where(Message.conversation_id.in_(conversation_ids), Message.role == "user")
+        .order_by(Message.conversation_id, Message.seq)
+    )
+    turns = {}
+    for conversation_id, content in rows:
+        turns.setdefault(conversation_id, []).append(content)
+    return turns
+
+
+def trajectory(conversation_id, compounds, thresholds=None):
+    """
+    Builds one conversation's summary row from the compound scores of its user turns.
+    """
+    scores = []
+    tiers = {"warm": 0, "neutral": 0, "hostile": 0}
+    warm_turn = hostile_turn = None
+    score = 0
+    for turn, compound in enumerate(compounds, start=1):
+        score += classify(compound, thresholds)
+        scores.append(score)
+        tiers[sentiment_tier(score)] += 1
+        if warm_turn is None and score >= WARM_SCORE:
+            warm_turn = turn
+        if hostile_turn is None and score <= HOSTILE_SCORE:
+            hostile_turn = turn
+
+    return {
+        "conversation_id": conversation_id,
+        "user_turns": len(compounds),
+        "final_score": score,
+        "min_score": min(scores, default=0),
+        "max_score": max(scores, default=0),
+        "warm_turn": warm_turn,
+        "hostile_turn": hostile_turn,
+        "warm_turns": tiers["warm"],
+        "neutral_turns": tiers["neutral"],
+        "hostile_turns": tiers["hostile"],
+        "mean_compound": round(sum(compounds) / len(compounds), 4) if compounds else None,
+        "scores": scores,
+        "compounds": [round(compound, 4) for compound in compounds],
+        "analyzed_at": datetime.utcnow(),
+    }
+
+
+def score_chunk(conversation_ids, thresholds=None):
+    """Returns the summary rows for a chunk, scoring all of its user messages in one batch."""
+    turns = user_turns(conversation_ids)
+    texts = [text for conversation_id in conversation_ids for text in turns.get(conversation_id, [])]
+    compounds = iter(analyze_many(texts, scores=True))
+    return [
+        trajectory(conversation_id, [next(compounds) for _ in turns.get(conversation_id, [])], thresholds)
+        for conversation_id in conversation_ids
+    ]
+
+
+def write_table(rows):
+    """Upserts summary rows into conversation_sentiment in one statement."""
+    records = [dict(row, scores=json.dumps(row["scores"]), compounds=json.dumps(row["compounds"])) for row in rows]
+    table = ConversationSentiment.__table__
+    if db.engine.dialect.name == "postgresql":
+        statement = pg_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.conversation_id],
+            set_={name: statement.excluded[name] for name in COLUMNS if name != "conversation_id"},
+        )
+    else:
+        statement = table.insert().prefix_with("OR REPLACE")
+    db.session.execute(statement, records)
+    db.session.commit()
+
+
+class ParquetSink:
+    """Appends each chunk to a Parquet file as its own row group. Needs pyarrow."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise click.ClickException("--parquet needs pyarrow (pip install pyarrow)")
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("conversation_id", pa.int64()),
+            ("user_turns", pa.int32()),
+            ("final_score", pa.int32()),
+            ("min_score", pa.int32()),
+            ("max_score", pa.int32()),
+            ("warm_turn", pa.int32()),
+            ("hostile_turn", pa.int32()),
+            ("warm_turns", pa.int32()),
+            ("neutral_turns", pa.int32()),
+            ("hostile_turns", pa.int32()),
+            ("mean_compound", pa.float64()),
+            ("scores", pa.list_(pa.int32())),
+            ("compounds", pa.list_(pa.float32())),
+            ("analyzed_at", pa.timestamp("us")),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in self.schema.names}
+        self.writer.write_table(self.pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+@app.cli.command("sentiment-trajectories")
+@click.option("--chunk-size", default=1000, help="Conversations read, scored and written at a time.")
+@click.option("--since-id", default=0, help="Only conversations with a larger id.")
+@click.option("--rescore", is_flag=True, help="Recompute conversations that already have a summary.")
+@click.option("--include-open", is_flag=True, help="Also score conversations that haven't ended yet.")
+@click.option("--parquet", "parquet_path", type=click.Path(dir_okay=False), help="Write a Parquet file instead of the table.")
+def sentiment_trajectories(chunk_size, since_id, rescore, include_open, parquet_path):
+    """
+    Re-scores saved conversations and stores each one's sentiment curve.
+    """
+    # A Parquet export covers every conversation, whatever the table already holds
+    sink = ParquetSink(parquet_path) if parquet_path else None
+    chunks = conversation_chunks(chunk_size, since_id, rescore or sink is not None, include_open)
+
+    total = turns = 0
+    try:
+        for conversation_ids in chunks:
+            rows = score_chunk(conversation_ids)
+            if sink:
+                sink.write(rows)
+            else:
+                write_table(rows)
+            # Nothing from this chunk is needed for the next one
+            db.session.expunge_all()
+
+            total += len(rows)
+            turns += sum(row["user_turns"] for row in rows)
+            print(f"Scored {total} conversations ({turns} user turns), up to id {conversation_ids[-1]}")
+    finally:
+        if sink:
+            sink.close()
+
+    print(f"Done: {total} conversations, {turns} user turns -> {parquet_path or 'conversation_sentiment'}")
@@ -1,13 +1,30 @@
+# Running sentiment score (the sum of analyze_sentiment over the user's messages) at which
+# the ghost turns warm, which is also when /chat reveals who the ghost is...
+WARM_SCORE = 3
+# ...and at which it turns cold and threatening
+HOSTILE_SCORE = -2
+
+
+def sentiment_tier(sentiment_score):
+    """Returns the prompt tier for a running score: "warm", "hostile" or "neutral"."""
+    if sentiment_score >= WARM_SCORE:
+        return "warm"
+    elif sentiment_score <= HOSTILE_SCORE:
+        return "hostile"
+    return "neutral"
+
+
 def generate_sentiment_prompt(sentiment_score):
     """
     Generates a custom prompt based on the sentiment score.
     """
-    if sentiment_score >= 3:
+    tier = sentiment_tier(sentiment_score)
+    if tier == "warm":
         return (
             "The ghost is warm and eager to answer questions. They respond in full sentences, "
             "openly sharing their story. Make sure the ghosts messages are not too long, they should be no longer than 3 sentences. NEVER SAY THAT YOU ARE ARTIFICAL INTELLEGENCE, OR A COMPUTER, SAY YOU ARE A GHOST."
         )
-    elif sentiment_score <= -2:
+    elif tier == "hostile":
         return (
             "The ghost's voice is cold and threatening. They warn you in fragments and imply danger. "
             "They refuse to share information about themselves and urge you to leave immediately. NO LONGER TELL THEM WHO YOU WERE, OR ABOUT YOURSELF. "
@@ -1,15 +1,30 @@
 from __init__ import app, db
-from flask import Flask, session, redirect, url_for, jsonify, request
+from flask import Flask, session, redirect, url_for, jsonify, request, Response, stream_with_context, send_from_directory
 from flask_sqlalchemy import SQLAlchemy
 import os
 import openai
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import IntegrityError
 from flask_cors import CORS
-from geopy.geocoders import Nominatim  # For converting latitude + longitude
 from wiki_scraper import fetch_wikipedia_page
 from gpt_prompt_maker import gpt_prompt_maker
+import prompt_builder
 from sentiment_analysis import analyze_sentiment
-from sentiment_prompt import generate_sentiment_prompt
+from sentiment_prompt import generate_sentiment_prompt, WARM_SCORE
+import sentiment_analytics  # Registers the sentiment-trajectories command
 from grab_picture import fetch_image_from_wikipedia
+from image_cache import cached_image_for, IMAGE_DIR, THUMBNAIL_NAME
+from server_session import load_conversation, save_conversation, clear_conversation, regenerate_session
+from context_window import build_context
+from transcripts import append_missing, get_messages, numbered_messages, render_chat_log, previews
+import transcript_writer
+import http_client
+import geocode_cache
+import ghost_cache
+from geocode_cache import reverse_geocode  # For converting latitude + longitude
+from models import User, Ghost, Conversation
+from ghost_jobs import enqueue_ghost_job, get_job, wait_for_job, job_stats
+from ghost_pool import take_pooled_ghost, refill_pool, pool_stats
 import bcrypt
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -17,45 +32,15 @@ from email.mime.text import MIMEText
 import secrets
 import random
 import re
+import json
+import base64
+import binascii
 from datetime import datetime
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
 if openai.api_key is None:
     raise ValueError("OpenAI API key is not set")
 
-class User(db.Model):
-    __tablename__ = "users"
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password = db.Column(db.String(200), nullable=False)
-    confirmation_code = db.Column(db.String(6))
-    is_email_verified = db.Column(db.Boolean, default=False)
-    reset_token = db.Column(db.String(256))
-
-    # Relationship with Conversation
-    conversations = db.relationship('Conversation', backref='user', lazy=True)
-
-class Ghost(db.Model):
-    __tablename__ = "ghosts"
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(120), nullable=False)
-    prompt = db.Column(db.Text, nullable=False)
-    city = db.Column(db.String(80))
-    state = db.Column(db.String(80))
-    image_url = db.Column(db.String(200))
-
-class Conversation(db.Model):
-    __tablename__ = 'conversations'
-
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    ghost_name = db.Column(db.String(255), nullable=False, default="Unknown")  # Ensure ghost_name exists
-    chat_log = db.Column(db.Text, nullable=False)
-    location = db.Column(db.String(255), nullable=True)  # Add location column
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-
-
 
 # Define your routes here
 @app.route("/")
@@ -144,8 +129,19 @@ openai.api_key = os.getenv("OPENAI_API_KEY")
 if openai.api_key is None:
     raise ValueError("OpenAI API key is not set")
 
-# Geolocator initialization
-geolocator = Nominatim(user_agent="phantomlink")
+# Seconds /chat waits for a running background ghost job before building the ghost itself
+GHOST_JOB_WAIT_SECONDS = float(os.getenv("GHOST_JOB_WAIT_SECONDS", "3"))
+
+# Conversation history paging; listings carry a short preview instead of the transcript
+CONVERSATIONS_PAGE_SIZE = int(os.getenv("CONVERSATIONS_PAGE_SIZE", "20"))
+CONVERSATIONS_MAX_PAGE_SIZE = 100
+CONVERSATION_PREVIEW_CHARS = 200
+
+# Cached ghost thumbnails never change (their names are content hashes)
+IMAGE_MAX_AGE = 365 * 24 * 3600
+
+# Bearer token monitoring must send to read /metrics; the route answers 404 while it's unset
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
 
 
 
@@ -324,6 +320,7 @@ def login():
 
     # Verify the user's password
     if bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
+        regenerate_session()  # Never keep a session ID that existed before login
         session["user_id"] = user.id  # Save user ID in the session
         response = jsonify({"message": "Login successful", "is_email_verified": True})
         response.headers.add("Access-Control-Allow-Origin", "http://localhost:3000")
@@ -368,9 +365,6 @@ app.config.update(
 if openai.api_key is None:
     raise ValueError("OpenAI API key is not set")
 
-# Initialize the geolocator
-geolocator = Nominatim(user_agent="phantomlink")
-
 # Variable to store the last city found
 last_city = None
 last_state = None  # Store the last known state if available
@@ -384,6 +378,116 @@ def reset_sentiment():
 
 @app.route("/chat", methods=["POST"])
 def chat():
+    data = request.json
+    user_message = data.get("message")
+
+    error = prepare_chat_turn(user_message)
+    if error:
+        return error
+
+    try:
+        conversation = load_conversation()
+        messages, session['context_summary'], prompt_tokens = build_context(conversation, session.get('context_summary'))
+
+        # Call OpenAI API with the system prompt, summary and recent turns
+        response = openai.ChatCompletion.create(
+            model="gpt-4-turbo",
+            messages=messages,
+            temperature=1,
+            max_tokens=150,
+        )
+        reply = response.choices[0].message["content"]
+        prompt_tokens = response.get("usage", {}).get("prompt_tokens", prompt_tokens)
+        print(f"Prompt tokens: {prompt_tokens}")
+
+        # Add the ghost's response to the conversation
+        conversation.append({"role": "assistant", "content": reply})
+        save_conversation(conversation)
+        checkpoint_turn(conversation)
+
+        # Return reply and sentiment in the response
+        return jsonify({"reply": reply, "sentiment": session['user_sentiment'], "prompt_tokens": prompt_tokens}), 200  # Include sentiment in response
+    except openai.error.RateLimitError:
+        return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
+    except openai.error.InvalidRequestError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error in /chat: {e}")
+        return jsonify({"error": "An internal error occurred."}), 500
+
+
+@app.route("/chat-stream", methods=["POST"])
+def chat_stream():
+    """
+    Streaming variant of /chat using server-sent events.
+
+    Emits a "token" event for every piece of the reply as OpenAI generates it, then a
+    "done" event with the full reply, the sentiment score and the estimated prompt tokens
+    (or an "error" event).
+    """
+    data = request.json
+    user_message = data.get("message")
+
+    error = prepare_chat_turn(user_message)
+    if error:
+        return error
+
+    conversation = list(load_conversation())
+    messages, session['context_summary'], prompt_tokens = build_context(conversation, session.get('context_summary'))
+    sentiment = session['user_sentiment']
+
+    def generate():
+        reply = ""
+        try:
+            chunks = openai.ChatCompletion.create(
+                model="gpt-4-turbo",
+                messages=messages,
+                temperature=1,
+                max_tokens=150,
+                stream=True,
+            )
+            for chunk in chunks:
+                token = chunk.choices[0].delta.get("content")
+                if token:
+                    reply += token
+                    yield sse_event("token", {"content": token})
+        except openai.error.RateLimitError:
+            yield sse_event("error", {"error": "Rate limit exceeded. Please try again later."})
+            return
+        except openai.error.InvalidRequestError as e:
+            yield sse_event("error", {"error": str(e)})
+            return
+        except Exception as e:
+            print(f"Error in /chat-stream: {e}")
+            yield sse_event("error", {"error": "An internal error occurred."})
+            return
+
+        # Add the ghost's full response to the conversation
+        conversation.append({"role": "assistant", "content": reply})
+        save_conversation(conversation)
+        checkpoint_turn(conversation)
+
+        yield sse_event("done", {"reply": reply, "sentiment": sentiment, "prompt_tokens": prompt_tokens})
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # Tell nginx not to buffer the stream
+    return response
+
+
+def sse_event(event, payload):
+    """Formats a server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+
+def prepare_chat_turn(user_message):
+    """
+    Sets up the conversation for a chat turn: applies the selected ghost or the
+    sentiment-driven ghost prompt, then appends the user's message.
+
+    Returns:
+        An error response if the turn can't be handled, otherwise None.
+    """
     # Retrieve location from the session
     city = session.get("city", None)
     state = session.get("state", None)
@@ -391,8 +495,10 @@ def chat():
     if not city or not state:
         return jsonify({"error": "Location not set. Please share your location first."}), 400
 
-    data = request.json
-    user_message = data.get("message")
+    conversation = load_conversation()
+    if conversation is None:
+        # A new chat gets its own conversation record
+        session.pop('conversation_id', None)
 
     # Check if a ghost has been selected
     selected_ghost_id = request.cookies.get('selectedGhostId') or session.get('selected_ghost_id')
@@ -401,16 +507,17 @@ def chat():
         # Fetch ghost data from the database
         ghost = get_ghost_by_id(selected_ghost_id)  # Function to fetch ghost data
         if ghost:
-            if 'conversation' not in session:
-                session['conversation'] = [{
+            if conversation is None:
+                conversation = [{
                     "role": "system",
                     "content": ghost['prompt']
                 }]
+                session.pop('context_summary', None)
             session['ghost_name'] = ghost['name']
     else:
         # Default behavior if no ghost is selected
-        if 'conversation' not in session:
-            session['conversation'] = [{
+        if conversation is None:
+            conversation = [{
                 "role": "system",
                 "content": f"Pretend you are a ghost from {city}, {state}, you are talking to a modern-day person. Use a lot of ellipsis, only short sentences only a few words. The ghost speaks in a neutral and reserved tone, giving no information about themselves. "
             "They answer in fragments, appearing miserable and unwelcoming. Never speak as if you were text-generative AI."
@@ -418,53 +525,164 @@ def chat():
             session['user_sentiment'] = 0  # Initialize sentiment score
             session['gpt_prompt_applied'] = False  # Track if the custom GPT prompt has been applied
             session['ghost_name'] = "Unknown Ghost"  # Initialize ghost name
+            session.pop('context_summary', None)
 
         # Update sentiment based on the user's message
         sentiment = analyze_sentiment(user_message)
         session['user_sentiment'] += sentiment  # Update the sentiment score in session
         print(f"Sentiment Score: {sentiment}")  # For debugging
 
-        # Apply GPT prompt only if the sentiment score is >= 2 and not already applied
-        if session['user_sentiment'] >= 3 and not session.get('gpt_prompt_applied'):
-            # Fetch data from Wikipedia scraper
-            result, paragraphs, wikipedia_page = fetch_wikipedia_page(city, state)
-            if result:
-                name, birth_year, death_year, occupation = result
-                prompt = gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs)
-                session['ghost_name'] = name  # Correctly store the ghost name in the session
+        # Apply GPT prompt only if the sentiment score reached WARM_SCORE and it isn't already applied
+        if session['user_sentiment'] >= WARM_SCORE and not session.get('gpt_prompt_applied'):
+            # Prefer a ready-made ghost from the city's pool, then the one prepared for this session
+            pooled = take_pooled_ghost(city, state)
+            job = None if pooled else take_prepared_ghost(city, state)
+            if pooled:
+                prompt = pooled.prompt
+                session['ghost_name'] = pooled.name
+                session['wikipedia_page'] = pooled.get_details().get("wikipedia_url")
+            elif job:
+                prompt = job.prompt
+                session['ghost_name'] = job.name
+                session['wikipedia_page'] = job.wikipedia_url
             else:
-                prompt = f"Pretend you are a ghost from {city}, {state}, you are talking to a modern-day person."
-
-            session['conversation'][0]["content"] = prompt[:2000]
+                # Fall back to fetching data from the Wikipedia scraper inline
+                result, paragraphs, wikipedia_page = fetch_wikipedia_page(city, state)
+                if result:
+                    name, birth_year, death_year, occupation = result
+                    prompt = gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs, wikipedia_page)
+                    session['ghost_name'] = name  # Correctly store the ghost name in the session
+                    session['wikipedia_page'] = wikipedia_page  # Lets add_ghost reuse the scraped page
+                else:
+                    prompt = f"Pretend you are a ghost from {city}, {state}, you are talking to a modern-day person."
+
+            # Prompts already fit PROMPT_TOKEN_BUDGET, with the persona instructions intact
+            conversation[0]["content"] = prompt
             session['gpt_prompt_applied'] = True
 
     # Add the user's message to the conversation
-    session['conversation'].append({"role": "user", "content": user_message})
-    session['conversation'] = session['conversation']
+    conversation.append({"role": "user", "content": user_message})
+    save_conversation(conversation)
+    open_conversation_record(city, state)
 
+    # Hand the database connection back to the pool before the long OpenAI call
+    db.session.close()
+    return None
+
+
+def open_conversation_record(city, state):
+    """
+    Makes sure a logged-in user's chat has a conversation row, so its turns can be saved
+    as they happen. Also keeps the row's ghost name current once the ghost is revealed.
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return
+
+    ghost_name = session.get("ghost_name", "Unknown Ghost")
     try:
-        # Call OpenAI API with the updated conversation
-        response = openai.ChatCompletion.create(
-            model="gpt-4-turbo",
-            messages=session['conversation'],
-            temperature=1,
-            max_tokens=150,
-        )
-        reply = response.choices[0].message["content"]
+        conversation_id = session.get("conversation_id")
+        if conversation_id is None:
+            record = Conversation(
+                user_id=user_id,
+                ghost_name=ghost_name,
+                location=f"{city}, {state}",
+                timestamp=datetime.utcnow(),
+            )
+            db.session.add(record)
+            db.session.commit()
+            session['conversation_id'] = record.id
+        elif session.get('conversation_ghost') != ghost_name:
+            Conversation.query.filter_by(id=conversation_id).update({"ghost_name": ghost_name})
+            db.session.commit()
+        session['conversation_ghost'] = ghost_name
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error opening conversation record: {e}")
 
-        # Add the ghost's response to the conversation
-        session['conversation'].append({"role": "assistant", "content": reply})
 
-        # Return reply and sentiment in the response
-        return jsonify({"reply": reply, "sentiment": session['user_sentiment']}), 200  # Include sentiment in response
-    except openai.error.RateLimitError:
-        return jsonify({"error": "Rate limit exceeded. Please try again later."}), 429
-    except openai.error.InvalidRequestError as e:
-        return jsonify({"error": str(e)}), 400
+def checkpoint_turn(conversation):
+    """
+    Queues the messages since the previous ghost reply for the write-behind buffer.
+
+    That is the latest user message and reply, plus the user messages of earlier turns
+    whose OpenAI call failed, which were never checkpointed.
+    """
+    conversation_id = session.get("conversation_id")
+    if conversation_id:
+        numbered = numbered_messages(conversation)
+        start = len(numbered) - 1
+        while start > 0 and numbered[start - 1][1] != "assistant":
+            start -= 1
+        transcript_writer.enqueue(conversation_id, numbered[start:])
+
+
+def queue_ghost_for_session(city, state):
+    """
+    Starts building a ghost prompt for the session's location in the background,
+    unless one is already queued for that location.
+    """
+    location = f"{city}|{state}"
+    if session.get('ghost_job_location') == location and session.get('ghost_job_id'):
+        return
+
+    try:
+        session['ghost_job_id'] = enqueue_ghost_job(city, state)
+        session['ghost_job_location'] = location
     except Exception as e:
-        print(f"Error in /chat: {e}")
-        return jsonify({"error": "An internal error occurred."}), 500
+        db.session.rollback()
+        print(f"Error queueing ghost job for {city}, {state}: {e}")
+
 
+def take_prepared_ghost(city, state):
+    """
+    Returns the session's finished ghost job for this location, or None so /chat can
+    build the ghost inline. A running job gets GHOST_JOB_WAIT_SECONDS to finish first.
+    """
+    job_id = session.pop('ghost_job_id', None)
+    location = session.pop('ghost_job_location', None)
+    if not job_id or location != f"{city}|{state}":
+        return None
+
+    try:
+        job = wait_for_job(job_id, GHOST_JOB_WAIT_SECONDS)
+    except Exception as e:
+        print(f"Error reading ghost job {job_id}: {e}")
+        return None
+
+    if job and job.status == "done" and job.prompt:
+        print(f"Using prepared ghost from job {job_id}: {job.name}")
+        return job
+    print(f"Ghost job {job_id} not ready ({job.status if job else 'still running'}); building ghost inline.")
+    return None
+
+
+@app.route("/images/<name>", methods=["GET"])
+def ghost_image(name):
+    """
+    Serves a cached ghost thumbnail. Names are content hashes, so they can be cached forever.
+    """
+    if not THUMBNAIL_NAME.match(name):
+        return jsonify({"error": "Image not found"}), 404
+    response = send_from_directory(IMAGE_DIR, name, max_age=IMAGE_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={IMAGE_MAX_AGE}, immutable"
+    return response
+
+
+@app.route("/ghost-jobs/<int:job_id>", methods=["GET"])
+def ghost_job_status(job_id):
+    """
+    Returns the status and timings of the caller's background ghost job.
+
+    Only the job queued for this session is answered; any other id is reported as not
+    found, so visitors can't walk the ids and read other people's locations.
+    """
+    if session.get('ghost_job_id') != job_id:
+        return jsonify({"error": "Job not found"}), 404
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
 
 
 def get_ghost_by_id(ghost_id):
@@ -485,7 +703,8 @@ def end_conversation():
         return jsonify({"error": "User not logged in"}), 401
 
     try:
-        if 'conversation' not in session:
+        conversation_data = load_conversation()
+        if not conversation_data:
             return jsonify({"error": "No Location Found. Please return to the homepage to share your location!"}), 400
 
         # Fetch location from session
@@ -493,35 +712,39 @@ def end_conversation():
         state = session.get("state", None)
         location = f"{city}, {state}" if city and state else "Unknown Location"
 
-        conversation_data = session['conversation']
         ghost_name = session.get("ghost_name", "Unknown Ghost")  # Fetch the ghost name from session
 
-        # Combine messages into a chat log
-        filtered_messages = [
-            {"sender": "User" if msg['role'] == "user" else "Ghost", "content": msg['content']}
-            for msg in conversation_data if msg['role'] in ["user", "assistant"]
-        ]
-        chat_log = "\n\n".join(f"{msg['sender']}: {msg['content']}" for msg in filtered_messages)
-
-        # Save conversation to the database
-        new_conversation = Conversation(
-            user_id=user_id,
-            ghost_name=ghost_name,
-            chat_log=chat_log,
-            location=location,
-            timestamp=datetime.utcnow()
-        )
-        db.session.add(new_conversation)
+        # Finalize the conversation saved during the chat; store whatever the buffer hasn't written yet
+        record = None
+        conversation_id = session.get("conversation_id")
+        if conversation_id:
+            transcript_writer.flush()
+            record = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+
+        if record is None:
+            # Chats started before logging in have no record yet
+            record = Conversation(user_id=user_id, timestamp=datetime.utcnow())
+            db.session.add(record)
+            db.session.flush()
+
+        record.ghost_name = ghost_name
+        record.location = location
+        record.ended_at = datetime.utcnow()
+        append_missing(record.id, conversation_data)
         db.session.commit()
 
         # Add ghost to the database if the name is valid
         if ghost_name != "Unknown Ghost":
             prompt = conversation_data[0]["content"]
-            add_ghost(ghost_name, prompt, city, state)
+            add_ghost(ghost_name, prompt, city, state, session.get("wikipedia_page"))
 
         # Clear session data related to the conversation
-        session.pop("conversation", None)
+        clear_conversation()
+        session.pop("conversation_id", None)
+        session.pop("conversation_ghost", None)
         session.pop("ghost_name", None)
+        session.pop("wikipedia_page", None)
+        session.pop("context_summary", None)
 
         return jsonify({"message": "Conversation saved successfully."}), 200
 
@@ -534,10 +757,11 @@ def end_conversation():
 
     
 
-def add_ghost(name, prompt, city, state):
+def add_ghost(name, prompt, city, state, wikipedia_url=None):
     """
     Adds a ghost to the database if it has a valid name.
     Fetches the ghost's image from Wikipedia; defaults to backend/pics/ghost_portrait.png if no image is found.
+    Pass the scraped wikipedia_url so the image comes from the page that was already parsed.
     """
     # Path to the default ghost portrait
     default_image = "/pics/ghost_portrait.png"
@@ -549,12 +773,12 @@ def add_ghost(name, prompt, city, state):
             print(f"Ghost '{existing_ghost}' already exists in the database. Skipping addition.")
             return
         # Generate the Wikipedia page URL and fetch the image
-        wikipedia_url = f"https://en.wikipedia.org/wiki/{name.replace(' ', '_')}"
+        wikipedia_url = wikipedia_url or f"https://en.wikipedia.org/wiki/{name.replace(' ', '_')}"
         fetched_image_url = fetch_image_from_wikipedia(wikipedia_url)
 
-        # Use the fetched image if available, otherwise default
+        # Use the fetched image if available (as a locally cached thumbnail), otherwise default
         if fetched_image_url:
-            image_url = fetched_image_url
+            image_url = cached_image_for(fetched_image_url)
 
     except Exception as e:
         print(f"Error fetching image from Wikipedia for {name}: {e}")
@@ -566,11 +790,17 @@ def add_ghost(name, prompt, city, state):
             prompt=prompt,
             city=city,
             state=state,
-            image_url=image_url  # Store the correct image URL/path
+            image_url=image_url,  # Store the correct image URL/path
+            details=json.dumps({"wikipedia_url": wikipedia_url}),
         )
         db.session.add(new_ghost)
         db.session.commit()
+        ghost_cache.invalidate(city, state)
         print(f"Ghost '{name}' added successfully with image URL: {image_url}")
+    except IntegrityError:
+        # Another request added the same ghost between our check and the insert (ux_ghosts_name)
+        db.session.rollback()
+        print(f"Ghost '{name}' was added by another request. Skipping addition.")
     except Exception as e:
         db.session.rollback()
         print(f"Error adding ghost '{name}' to database: {e}")
@@ -579,37 +809,176 @@ def add_ghost(name, prompt, city, state):
 
 @app.route("/conversations", methods=["GET"])
 def chat_history():
+    """
+    Lists the logged-in user's conversations, newest first, one page at a time.
+
+    Query parameters:
+        limit: Page size (default CONVERSATIONS_PAGE_SIZE, at most CONVERSATIONS_MAX_PAGE_SIZE).
+        cursor: The next_cursor of the previous page.
+
+    Each entry carries a short preview instead of the transcript; fetch
+    /conversations/<id> for the full chat log.
+    """
     # Ensure the user is logged in
     user_id = session.get("user_id")
     if not user_id:
         return jsonify({"error": "User not logged in"}), 401
 
     try:
-        # Query all conversations for the logged-in user
-        conversations = (
-            Conversation.query.filter_by(user_id=user_id)
-            .order_by(Conversation.timestamp.desc())
+        limit = min(int(request.args.get("limit", CONVERSATIONS_PAGE_SIZE)), CONVERSATIONS_MAX_PAGE_SIZE)
+        cursor = decode_conversation_cursor(request.args.get("cursor"))
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor."}), 400
+    if limit < 1:
+        return jsonify({"error": "Invalid limit or cursor."}), 400
+
+    try:
+        # Keyset pagination on (timestamp, id), served by idx_conversations_user_timestamp
+        query = Conversation.query.filter_by(user_id=user_id)
+        if cursor:
+            query = query.filter(tuple_(Conversation.timestamp, Conversation.id) < cursor)
+        rows = (
+            query.with_entities(
+                Conversation.id,
+                Conversation.ghost_name,
+                Conversation.location,
+                Conversation.timestamp,
+                Conversation.ended_at,
+                func.substr(Conversation.chat_log, 1, CONVERSATION_PREVIEW_CHARS).label("legacy_preview"),
+            )
+            .order_by(Conversation.timestamp.desc(), Conversation.id.desc())
+            .limit(limit + 1)
             .all()
         )
 
-        # Convert conversation objects to dictionaries
+        page = rows[:limit]
+        # Conversations saved before the messages table still carry a flat chat_log
+        message_previews = previews([convo.id for convo in page if convo.legacy_preview is None], CONVERSATION_PREVIEW_CHARS)
         conversations_data = [
             {
                 "id": convo.id,
                 "ghost_name": convo.ghost_name,
-                "chat_log": convo.chat_log,
+                "preview": convo.legacy_preview if convo.legacy_preview is not None else message_previews.get(convo.id, ""),
                 "location": convo.location,
                 "timestamp": convo.timestamp.isoformat(),
+                "in_progress": convo.ended_at is None,
             }
-            for convo in conversations
+            for convo in page
         ]
+        next_cursor = encode_conversation_cursor(page[-1].timestamp, page[-1].id) if len(rows) > limit else None
 
-        # Return the conversations in JSON format
-        return jsonify({"conversations": conversations_data}), 200
+        return conditional_json({"conversations": conversations_data, "next_cursor": next_cursor})
     except Exception as e:
         print(f"Error fetching chat history: {e}")
         return jsonify({"error": "An unexpected error occurred"}), 500
-    
+
+
+@app.route("/conversations/<int:conversation_id>", methods=["GET"])
+def get_conversation(conversation_id):
+    """
+    Returns one of the logged-in user's conversations with its full chat log.
+    """
+    user_id = session.get("user_id")
+    if not user_id:
+        return jsonify({"error": "User not logged in"}), 401
+
+    convo = Conversation.query.filter_by(id=conversation_id, user_id=user_id).first()
+    if not convo:
+        return jsonify({"error": "Conversation not found"}), 404
+
+    messages = get_messages(convo.id)
+    return conditional_json({
+        "id": convo.id,
+        "ghost_name": convo.ghost_name,
+        "chat_log": render_chat_log(messages) if messages else (convo.chat_log or ""),
+        "messages": messages,
+        "location": convo.location,
+        "timestamp": convo.timestamp.isoformat(),
+    })
+
+
+def encode_conversation_cursor(timestamp, conversation_id):
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{conversation_id}".encode()).decode()
+
+
+def decode_conversation_cursor(cursor):
+    """Turns a next_cursor back into (timestamp, id); raises ValueError if it's malformed."""
+    if not cursor:
+        return None
+    try:
+        timestamp, conversation_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(conversation_id)
+    except (UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(str(e))
+
+
+def conditional_json(payload):
+    """
+    JSON response with an ETag. Returns 304 Not Modified when the client already has it.
+
+    "private, no-cache" lets the browser keep the response but makes it revalidate each time.
+    """
+    response = jsonify(payload)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Returns this worker's performance counters for monitoring.
+
+    Requires "Authorization: Bearer <METRICS_TOKEN>". nginx doesn't proxy this route, so
+    it is only reachable from inside the deployment network.
+    """
+    supplied = request.headers.get("Authorization", "")
+    if not METRICS_TOKEN or not secrets.compare_digest(supplied, f"Bearer {METRICS_TOKEN}"):
+        return jsonify({"error": "Not found"}), 404
+
+    try:
+        ghost_jobs = job_stats()
+        ghost_pool = pool_stats()
+    except Exception as e:
+        print(f"Error reading ghost job stats: {e}")
+        ghost_jobs = ghost_pool = None
+
+    try:
+        transcripts = transcript_writer.get_metrics()
+    except Exception as e:
+        print(f"Error reading transcript writer stats: {e}")
+        transcripts = None
+
+    try:
+        geocode = geocode_cache.get_metrics()
+    except Exception as e:
+        print(f"Error reading geocode cache stats: {e}")
+        geocode = None
+
+    try:
+        prompts = prompt_builder.get_metrics()
+    except Exception as e:
+        print(f"Error reading prompt cache stats: {e}")
+        prompts = None
+
+    try:
+        ghosts = ghost_cache.get_metrics()
+    except Exception as e:
+        print(f"Error reading ghost cache stats: {e}")
+        ghosts = None
+
+    return jsonify({
+        "pid": os.getpid(),
+        "http": http_client.get_metrics(),
+        "ghost_jobs": ghost_jobs,
+        "ghost_pool": ghost_pool,
+        "geocode": geocode,
+        "ghost_cache": ghosts,
+        "prompt_builder": prompts,
+        "transcript_writer": transcripts,
+    }), 200
+
+
 @app.route("/error")
 def error_page():
     return jsonify({"error": "City and state information are required."}), 400
@@ -620,11 +989,25 @@ def reset_session():
     print("Resetting session...")  # Debug print
 
     # Keep the user logged in, but reset the conversation
-    session.pop("conversation", None)  # Remove the conversation from the session
+    conversation_id = session.pop("conversation_id", None)
+    session.pop("conversation_ghost", None)
+    if conversation_id:
+        # The abandoned chat stays in the history with the turns saved so far
+        try:
+            Conversation.query.filter_by(id=conversation_id, ended_at=None).update({"ended_at": datetime.utcnow()})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error closing conversation {conversation_id}: {e}")
+    clear_conversation()  # Remove the conversation from the session store
     session.pop("user_sentiment", None)  # Optionally reset any other relevant session state
     session.pop("gpt_prompt_applied", None)
     session.pop("ghost_name", None)
     session.pop("selected_ghost_id", None)
+    session.pop("wikipedia_page", None)
+    session.pop("context_summary", None)
+    session.pop("ghost_job_id", None)
+    session.pop("ghost_job_location", None)
 
     # Create response
     response = jsonify({"message": "Session reset successful, starting new ghost conversation."})
@@ -650,15 +1033,15 @@ def receive_location():
         return jsonify({"error": "Latitude and longitude are required."}), 400
 
     try:
-        # Convert latitude and longitude to a city name using geopy
-        location = geolocator.reverse((latitude, longitude), exactly_one=True)
-        if location and location.raw.get("address"):
-            address = location.raw.get("address", {})
+        # Convert latitude and longitude to a city name (cached per grid cell)
+        location = reverse_geocode(latitude, longitude)
+        if location and location.get("address"):
+            address = location.get("address", {})
             city = address.get("city")
 
             if not city:
                 # Try to fallback to the next thing in hierarchy
-                hierarchy = location.raw.get("display_name", "").split(", ")
+                hierarchy = location.get("display_name", "").split(", ")
                 if len(hierarchy) > 1:
                     city = hierarchy[1]  # Often the city name
 
@@ -668,6 +1051,10 @@ def receive_location():
             session['city'] = city
             session['state'] = state
 
+            # Keep the city's ghost pool warm; a cold city also gets a ghost built for this session
+            if not refill_pool(city, state):
+                queue_ghost_for_session(city, state)
+
             print(f"Determined city from coordinates: {city}, {state}")
             return jsonify({
                 "message": f"Location received successfully. latitude={latitude}, longitude={longitude}, city={city}, state={state}"
@@ -693,11 +1080,11 @@ def handle_location():
             return jsonify({"error": "Latitude and longitude are required."}), 400
 
         try:
-            # Convert latitude and longitude to a city name using geopy
-            location = geolocator.reverse((latitude, longitude), exactly_one=True)
-            if location and location.raw.get("address"):
-                city = location.raw["address"].get("city", "an unknown place")
-                state = location.raw["address"].get("state", None)
+            # Convert latitude and longitude to a city name (cached per grid cell)
+            location = reverse_geocode(latitude, longitude)
+            if location and location.get("address"):
+                city = location["address"].get("city", "an unknown place")
+                state = location["address"].get("state", None)
                 last_city = city  # Store in global variables
                 last_state = state
                 session['city'] = city  # Store in session
@@ -728,7 +1115,7 @@ def handle_location():
 @app.route("/ghosts", methods=["GET"])
 def get_ghosts():
     """
-    Endpoint to fetch ghosts based on city and state.
+    Endpoint to fetch ghosts based on city and state, served through ghost_cache.
     """
     city = request.args.get("city")
     state = request.args.get("state")
@@ -737,25 +1124,16 @@ def get_ghosts():
         return jsonify({"error": "City and state are required parameters."}), 400
 
     try:
-        # Query the database for ghosts matching the location
-        ghosts = Ghost.query.filter_by(city=city, state=state).all()
-
-        if not ghosts:
-            return jsonify({"ghosts": []}), 200
-
-        # Serialize the ghost data
-        ghost_data = [
-            {
-                "id": ghost.id,
-                "name": ghost.name,
-                "city": ghost.city,
-                "state": ghost.state,
-                "image_url": ghost.image_url,
-            }
-            for ghost in ghosts
-        ]
-
-        return jsonify({"ghosts": ghost_data}), 200
+        cached = ghost_cache.get_ghost_list(city, state)
     except Exception as e:
         print(f"Error fetching ghosts: {e}")
         return jsonify({"error": "An error occurred while fetching ghosts."}), 500
+
+    # The ETag and Last-Modified only change when a ghost is added to the city, so browsers
+    # and nginx can revalidate with a cheap 304
+    response = Response(cached["body"], mimetype="application/json")
+    response.headers["Cache-Control"] = "public, no-cache"
+    response.headers["X-Cache-Tier"] = cached["tier"]
+    response.set_etag(cached["etag"])
+    response.last_modified = datetime.utcfromtimestamp(cached["last_modified"])
+    return response.make_conditional(request)
@@ -0,0 +1,243 @@
+import json
+import os
+import random
+import secrets
+import time
+from flask import current_app, g, session
+from flask.sessions import SessionInterface, SessionMixin
+from sqlalchemy.dialects.postgresql import insert
+from werkzeug.datastructures import CallbackDict
+from local_store import get_connection
+
+# Where session data lives: "sqlite" (local file shared by the workers) or "database" (Postgres)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_FILE = os.getenv("SESSION_FILE", "sessions.sqlite3")
+# An unchanged session's expiry is pushed back on access, at most once per this many seconds
+TOUCH_INTERVAL = 60
+
+
+class SQLiteSessionStore:
+    """Keeps session records in a local SQLite file."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS server_sessions (
+      session_key TEXT PRIMARY KEY,
+      data TEXT NOT NULL,
+      expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_server_sessions_expires_at ON server_sessions (expires_at);
+    """
+
+    def _connection(self):
+        return get_connection(SESSION_FILE, self.SCHEMA)
+
+    def load(self, key):
+        return self.load_record(key)[0]
+
+    def load_record(self, key):
+        row = self._connection().execute(
+            "SELECT data, expires_at FROM server_sessions WHERE session_key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return (json.loads(row["data"]), row["expires_at"]) if row else (None, None)
+
+    def save(self, key, value, expires_at):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO server_sessions (session_key, data, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+
+    def touch(self, keys, expires_at):
+        self._connection().executemany(
+            "UPDATE server_sessions SET expires_at = ? WHERE session_key = ?", [(expires_at, key) for key in keys]
+        )
+
+    def delete(self, *keys):
+        self._connection().executemany("DELETE FROM server_sessions WHERE session_key = ?", [(key,) for key in keys])
+
+    def purge_expired(self):
+        self._connection().execute("DELETE FROM server_sessions WHERE expires_at <= ?", (time.time(),))
+
+
+class DatabaseSessionStore:
+    """Keeps session records in the server_sessions table of the app database."""
+
+    def __init__(self, db):
+        self.db = db
+        self.table = db.Table(
+            "server_sessions",
+            db.Column("session_key", db.String(128), primary_key=True),
+            db.Column("data", db.Text, nullable=False),
+            db.Column("expires_at", db.Float, nullable=False, index=True),
+        )
+        self._table_checked = False
+
+    def _engine(self):
+        engine = self.db.engine
+        if not self._table_checked:
+            self.table.create(engine, checkfirst=True)
+            self._table_checked = True
+        return engine
+
+    def load(self, key):
+        return self.load_record(key)[0]
+
+    def load_record(self, key):
+        with self._engine().connect() as connection:
+            row = connection.execute(
+                self.table.select().where(
+                    (self.table.c.session_key == key) & (self.table.c.expires_at > time.time())
+                )
+            ).first()
+        return (json.loads(row.data), row.expires_at) if row else (None, None)
+
+    def save(self, key, value, expires_at):
+        statement = insert(self.table).values(session_key=key, data=json.dumps(value), expires_at=expires_at)
+        statement = statement.on_conflict_do_update(
+            index_elements=[self.table.c.session_key],
+            set_={"data": statement.excluded.data, "expires_at": statement.excluded.expires_at},
+        )
+        with self._engine().begin() as connection:
+            connection.execute(statement)
+
+    def touch(self, keys, expires_at):
+        with self._engine().begin() as connection:
+            connection.execute(
+                self.table.update().where(self.table.c.session_key.in_(keys)).values(expires_at=expires_at)
+            )
+
+    def delete(self, *keys):
+        with self._engine().begin() as connection:
+            connection.execute(self.table.delete().where(self.table.c.session_key.in_(keys)))
+
+    def purge_expired(self):
+        with self._engine().begin() as connection:
+            connection.execute(self.table.delete().where(self.table.c.expires_at <= time.time()))
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """A session whose data is stored on the server; the cookie only carries its ID."""
+
+    def __init__(self, initial=None, sid=None, new=False, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires_at = expires_at
+        self.modified = False
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface backed by a SessionStore.
+
+    The conversation transcript is stored under its own key so it is only loaded by the
+    routes that need it (see load_conversation / save_conversation).
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data, expires_at = self.store.load_record(sid)
+            if data is not None:
+                return ServerSideSession(data, sid=sid, expires_at=expires_at)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        cookie_name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid, conversation_key(session.sid))
+                response.delete_cookie(cookie_name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        if not self.should_set_cookie(app, session):
+            # Keep an active session alive even when a request doesn't change it
+            if session.expires_at and session.expires_at < time.time() + lifetime - TOUCH_INTERVAL:
+                self.store.touch([session.sid, conversation_key(session.sid)], time.time() + lifetime)
+            return
+
+        self.store.save(session.sid, dict(session), time.time() + lifetime)
+
+        # Expired sessions are cleaned up on roughly one save in a hundred
+        if random.random() < 0.01:
+            self.store.purge_expired()
+
+        response.set_cookie(
+            cookie_name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def create_session_interface(db):
+    """Builds the session interface for the backend selected by SESSION_BACKEND."""
+    if SESSION_BACKEND == "database":
+        return ServerSideSessionInterface(DatabaseSessionStore(db))
+    return ServerSideSessionInterface(SQLiteSessionStore())
+
+
+def conversation_key(sid):
+    return f"{sid}:conversation"
+
+
+def regenerate_session():
+    """
+    Moves the current session to a new ID and deletes the old records.
+
+    Call it when the user logs in, so an ID planted before login (session fixation)
+    never becomes an authenticated session. The data and the conversation carry over.
+    """
+    interface = _interface()
+    lifetime = current_app.permanent_session_lifetime.total_seconds()
+    old_sid = session.sid
+    conversation = load_conversation()
+
+    session.sid = secrets.token_urlsafe(32)
+    if conversation is not None:
+        interface.store.save(conversation_key(session.sid), conversation, time.time() + lifetime)
+    interface.store.delete(old_sid, conversation_key(old_sid))
+    session.modified = True  # Saves the session under its new ID and issues the new cookie
+
+
+def load_conversation():
+    """
+    Loads the current session's conversation (a list of OpenAI messages), or None if
+    the session has no conversation yet. The result is cached for the rest of the request.
+    """
+    if "conversation" not in g:
+        interface = _interface()
+        g.conversation = interface.store.load(conversation_key(session.sid))
+    return g.conversation
+
+
+def save_conversation(conversation):
+    """Stores the current session's conversation."""
+    interface = _interface()
+    lifetime = current_app.permanent_session_lifetime.total_seconds()
+    interface.store.save(conversation_key(session.sid), conversation, time.time() + lifetime)
+    g.conversation = conversation
+    session.modified = True  # Make sure the session cookie is issued
+
+
+def clear_conversation():
+    """Deletes the current session's conversation."""
+    _interface().store.delete(conversation_key(session.sid))
+    g.conversation = None
+
+
+def _interface():
+    return current_app.session_interface
@@ -0,0 +1,136 @@
+"""
+Local extractive summarizer for ghost biographies.
+
+Sentences are turned into TF-IDF vectors, compared by cosine similarity, and
+ranked with TextRank (PageRank over the similarity graph), all as NumPy
+matrix operations. The best-ranked sentences that fit the token budget are
+returned in their original order. The article's first sentence, which
+Wikipedia uses to say who the person was, is always kept.
+"""
+import re
+import numpy as np
+from context_window import estimate_tokens
+
+# Longer articles are ranked on their first MAX_SENTENCES sentences
+MAX_SENTENCES = 500
+DAMPING = 0.85
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-6
+# Balance between a sentence's TextRank score and its overlap with sentences already picked
+RELEVANCE_WEIGHT = 0.6
+
+# A sentence ends at . ! or ? followed by whitespace and a capital letter, digit or quote
+SENTENCE_BOUNDARY = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]]))\s+(?=[A-Z0-9\"'(])")
+# Abbreviations that end in a period without ending the sentence
+ABBREVIATIONS = re.compile(
+    r"(?:\b(?:Mr|Mrs|Ms|Dr|St|Jr|Sr|Gen|Col|Capt|Lt|Sgt|Rev|Gov|Sen|Rep|Mt|Ft|No|vs|ca|c|b|d|U\.S|[A-Z])\.)$"
+)
+WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+STOPWORDS = frozenset("""
+a about after also an and are as at be been before but by for from had has have he her
+him his i in into is it its of on or she that the their them they this to was were which
+while who with would during later then there one two first
+""".split())
+
+
+def split_sentences(text):
+    """Splits text into sentences, without breaking after common abbreviations or initials."""
+    sentences = []
+    pending = ""
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        for piece in SENTENCE_BOUNDARY.split(paragraph.strip()):
+            pending = f"{pending} {piece}" if pending else piece
+            if not ABBREVIATIONS.search(pending.rstrip("\"')]")):
+                sentences.append(pending.strip())
+                pending = ""
+        if pending:
+            sentences.append(pending.strip())
+            pending = ""
+    return [sentence for sentence in sentences if sentence]
+
+
+def tfidf_matrix(sentences):
+    """Returns the L2-normalized TF-IDF matrix (sentences x terms) as float32."""
+    tokenized = [[word for word in WORD.findall(sentence.lower()) if word not in STOPWORDS] for sentence in sentences]
+    vocabulary = {}
+    for words in tokenized:
+        for word in words:
+            vocabulary.setdefault(word, len(vocabulary))
+
+    rows = [row for row, words in enumerate(tokenized) for _ in words]
+    columns = [vocabulary[word] for words in tokenized for word in words]
+    matrix = np.zeros((len(sentences), max(len(vocabulary), 1)), dtype=np.float32)
+    np.add.at(matrix, (rows, columns), 1.0)
+
+    # Sublinear term frequency, smoothed inverse document frequency
+    np.log1p(matrix, out=matrix)
+    document_frequency = np.count_nonzero(matrix, axis=0)
+    matrix *= (np.log((1 + len(sentences)) / (1 + document_frequency)) + 1).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def textrank(similarity):
+    """Ranks sentences by PageRank over their cosine-similarity graph (zero diagonal)."""
+    count = similarity.shape[0]
+
+    # Column-stochastic transition matrix; isolated sentences link to every sentence
+    totals = similarity.sum(axis=0)
+    transition = np.where(totals > 0, similarity / np.where(totals > 0, totals, 1), 1.0 / count)
+
+    scores = np.full(count, 1.0 / count, dtype=np.float32)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / count + DAMPING * (transition @ scores)
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+def summarize(text, max_tokens):
+    """
+    Picks the most informative sentences of a text that fit within max_tokens.
+
+    Args:
+        text (str): The text to summarize (e.g. a biography's paragraphs joined by blank lines).
+        max_tokens (int): Token budget, counted like context_window.estimate_tokens.
+
+    Returns:
+        str: The chosen sentences in their original order ("" if none fits).
+    """
+    sentences = split_sentences(text)[:MAX_SENTENCES]
+    if not sentences or max_tokens <= 0:
+        return ""
+
+    costs = [estimate_tokens(sentence) + 1 for sentence in sentences]
+    if sum(costs) <= max_tokens:
+        return " ".join(sentences)
+
+    matrix = tfidf_matrix(sentences)
+    similarity = matrix @ matrix.T
+    np.fill_diagonal(similarity, 0.0)
+    scores = textrank(similarity)
+    scores = scores / scores.max()
+
+    # Maximal marginal relevance: prefer central sentences, but penalize ones that repeat
+    # what was already picked, so the summary covers more of the life story
+    costs = np.asarray(costs)
+    chosen = [0] if costs[0] <= max_tokens else []
+    used = int(costs[chosen].sum())
+    redundancy = similarity[0].copy() if chosen else np.zeros(len(sentences), dtype=np.float32)
+    available = np.ones(len(sentences), dtype=bool)
+    available[chosen] = False
+    while True:
+        available &= costs <= max_tokens - used
+        if not available.any():
+            break
+        relevance = np.where(available, RELEVANCE_WEIGHT * scores - (1 - RELEVANCE_WEIGHT) * redundancy, -np.inf)
+        index = int(np.argmax(relevance))
+        chosen.append(index)
+        used += int(costs[index])
+        available[index] = False
+        np.maximum(redundancy, similarity[index], out=redundancy)
+
+    return " ".join(sentences[index] for index in sorted(chosen))
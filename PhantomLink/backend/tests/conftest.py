@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+TEST_DIR = tempfile.mkdtemp(prefix="phantomlink-tests-")
+
+# Keep the local SQLite stores of the modules under test out of the backend's data directory
+os.environ.setdefault("PHANTOM_DATA_DIR", TEST_DIR)
+# The backend directory is a package, so pytest imports __init__.py (and builds the app) first
+os.environ.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{os.path.join(TEST_DIR, 'app.db')}")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
@@ -0,0 +1,29 @@
+"""
+Checks extract_candidate_links against the saved list pages in benchmarks/fixtures/list_pages.
+"""
+import glob
+import json
+import os
+import pytest
+from benchmarks.candidate_extraction import FIXTURE_DIR, check_candidates, expected_fetches, extract_all_links
+from wiki_parser import parse_html
+from wiki_scraper import extract_candidate_links
+
+with open(os.path.join(FIXTURE_DIR, "expected_people.json"), encoding="utf-8") as f:
+    EXPECTED_PEOPLE = json.load(f)
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))), ids=os.path.basename)
+def test_extractor_keeps_every_listed_person(path):
+    with open(path, encoding="utf-8") as f:
+        soup = parse_html(f.read())
+
+    assert check_candidates(extract_all_links(soup), extract_candidate_links(soup), EXPECTED_PEOPLE[os.path.basename(path)]) == []
+
+
+def test_expected_fetches_counts_listed_people_among_candidates():
+    people = ["https://en.wikipedia.org/wiki/A", "https://en.wikipedia.org/wiki/B"]
+    candidates = people + ["https://en.wikipedia.org/wiki/Springfield", "https://en.wikipedia.org/wiki/Oregon"]
+
+    assert expected_fetches(candidates, people) == 5 / 3
+    assert expected_fetches(candidates, None) is None
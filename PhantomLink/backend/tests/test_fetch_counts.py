@@ -0,0 +1,126 @@
+"""
+Checks that picking a ghost downloads every page at most once: the list page, the
+Google fallback, the person pages and the portrait lookup that follows.
+"""
+import threading
+from collections import Counter
+import pytest
+import requests
+import candidate_index
+import grab_picture
+import http_client
+import wiki_scraper
+
+LIST_URL = "https://en.wikipedia.org/wiki/List_of_people_from_Springfield,_Oregon"
+FALLBACK_LIST_URL = "https://en.wikipedia.org/wiki/List_of_people_from_Springfield_(Oregon)"
+GOOGLE_URL = "https://www.google.com/search?q=Wikipedia page for People that Lived In Springfield, Oregon"
+DECEASED_URL = "https://en.wikipedia.org/wiki/Ada_Example"
+LIVING_URL = "https://en.wikipedia.org/wiki/Bob_Example"
+
+GOOGLE_HTML = f"""
+<html><body>
+  <a href="/search?q=other">Other result</a>
+  <a href="/url?q={FALLBACK_LIST_URL}&sa=U&ved=0">List of people from Springfield</a>
+</body></html>
+"""
+
+LIST_HTML = """
+<html><head><title>List of people from Springfield</title></head><body>
+<div id="mw-content-text"><div class="mw-parser-output">
+  <h2><span class="mw-headline">Notable people</span></h2>
+  <ul>
+    <li><a href="/wiki/Ada_Example">Ada Example</a>, painter</li>
+    <li><a href="/wiki/Bob_Example">Bob Example</a>, actor</li>
+  </ul>
+  <h2><span class="mw-headline">See also</span></h2>
+  <ul><li><a href="/wiki/Cy_Example">Cy Example</a></li></ul>
+</div></div>
+</body></html>
+"""
+
+
+def person_html(name, died):
+    died_row = "<tr><th>Died</th><td>March 3, 1950</td></tr>" if died else ""
+    return f"""
+<html><head><title>{name} - Wikipedia</title></head><body>
+<h1 id="firstHeading">{name}</h1>
+<table class="infobox">
+  <tr><td><img src="//upload.wikimedia.org/{name.replace(' ', '_')}.jpg"></td></tr>
+  <tr><th>Born</th><td>May 1, 1880</td></tr>
+  {died_row}
+  <tr><th>Occupation</th><td>Painter</td></tr>
+</table>
+<p>{name} lived in Springfield.</p>
+</body></html>
+"""
+
+
+PAGES = {
+    GOOGLE_URL: GOOGLE_HTML,
+    FALLBACK_LIST_URL: LIST_HTML,
+    DECEASED_URL: person_html("Ada Example", died=True),
+    LIVING_URL: person_html("Bob Example", died=False),
+}
+
+
+class StubResponse:
+    def __init__(self, url, text, status_code):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for {self.url}", response=self)
+
+
+@pytest.fixture
+def fetches(monkeypatch, tmp_path):
+    """Serves PAGES instead of the network and counts the GETs per URL."""
+    counts = Counter()
+    lock = threading.Lock()
+
+    def get(url, **kwargs):
+        with lock:
+            counts[url] += 1
+        if url in PAGES:
+            return StubResponse(url, PAGES[url], 200)
+        return StubResponse(url, "<html><title>Not Found</title></html>", 404)
+
+    monkeypatch.setattr(http_client, "get", get)
+    monkeypatch.setattr(candidate_index, "INDEX_FILE", str(tmp_path / "candidate_index.sqlite3"))
+    monkeypatch.setattr(wiki_scraper, "WIKI_BACKEND", "html")
+    monkeypatch.setattr(grab_picture, "WIKI_BACKEND", "html")
+    return counts
+
+
+def test_ghost_pick_fetches_each_page_once(fetches):
+    details, paragraphs, person_url = wiki_scraper.fetch_wikipedia_page("Springfield", "Oregon")
+    image_url = grab_picture.fetch_image_from_wikipedia(person_url)
+
+    assert person_url == DECEASED_URL
+    assert details == ("Ada Example", 1880, "1950", "Painter")
+    assert paragraphs == ["Ada Example lived in Springfield."]
+    assert image_url == "https://upload.wikimedia.org/Ada_Example.jpg"
+
+    assert fetches[LIST_URL] == 1
+    assert fetches[GOOGLE_URL] == 1
+    assert fetches[FALLBACK_LIST_URL] == 1
+    assert fetches[DECEASED_URL] == 1
+    assert set(fetches) <= {LIST_URL, GOOGLE_URL, FALLBACK_LIST_URL, DECEASED_URL, LIVING_URL}
+    assert max(fetches.values()) == 1
+
+
+def test_indexed_city_is_not_fetched_again(fetches):
+    wiki_scraper.fetch_wikipedia_page("Springfield", "Oregon")
+    first = Counter(fetches)
+
+    # The list page and Ada's verdict are indexed now. Bob is probed in the same round as
+    # Ada, so at most his page is left to fetch
+    details, _, person_url = wiki_scraper.fetch_wikipedia_page("Springfield", "Oregon")
+    grab_picture.fetch_image_from_wikipedia(person_url)
+
+    assert person_url == DECEASED_URL
+    assert details[0] == "Ada Example"
+    assert set(fetches - first) <= {LIVING_URL}
+    assert max(fetches.values()) == 1
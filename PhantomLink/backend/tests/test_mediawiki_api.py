@@ -0,0 +1,153 @@
+"""
+Runs the MediaWiki/Wikidata backend against a local stub of both APIs.
+"""
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import pytest
+import candidate_index
+import mediawiki_api
+
+# Wikidata items of the stub wiki, by canonical article title
+ITEMS = {
+    "Ada Example": "Q101",
+    "Robert Example": "Q102",
+    "Springfield Mill": "Q103",
+}
+ITEMS.update({f"Person {number}": f"Q{1000 + number}" for number in range(120)})
+
+# Titles the stub normalizes or redirects, like the real API does
+NORMALIZED = {"ada Example": "Ada Example"}
+REDIRECTS = {"Bob Example": "Robert Example"}
+
+# SPARQL rows for the humans among the items (Q103 is a building)
+PEOPLE = {
+    "Q101": {"birthYear": "1880", "deathYear": "1950", "occupation": "painter"},
+    "Q102": {"birthYear": "1975", "occupation": "actor"},
+}
+PEOPLE.update({f"Q{1000 + number}": {"birthYear": "1900", "deathYear": "1990"} for number in range(120)})
+
+VALUES = re.compile(r"VALUES \?item \{([^}]*)\}")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append((url.path, params))
+        if url.path == "/sparql":
+            body = self.sparql(params)
+        elif params.get("prop") == "pageprops":
+            body = self.pageprops(params)
+        else:
+            body = self.summary(params)
+
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def pageprops(self, params):
+        normalized, redirects, pages = [], [], []
+        for title in params["titles"].split("|"):
+            if title in NORMALIZED:
+                normalized.append({"from": title, "to": NORMALIZED[title]})
+                title = NORMALIZED[title]
+            if title in REDIRECTS:
+                redirects.append({"from": title, "to": REDIRECTS[title]})
+                title = REDIRECTS[title]
+            page = {"title": title}
+            if title in ITEMS:
+                page["pageprops"] = {"wikibase_item": ITEMS[title]}
+            pages.append(page)
+        return {"query": {"normalized": normalized, "redirects": redirects, "pages": pages}}
+
+    def sparql(self, params):
+        item_ids = re.findall(r"wd:(Q\d+)", VALUES.search(params["query"]).group(1))
+        bindings = []
+        for item_id in item_ids:
+            if item_id in PEOPLE:
+                row = {"item": {"type": "uri", "value": f"http://www.wikidata.org/entity/{item_id}"}}
+                row.update({name: {"type": "literal", "value": value} for name, value in PEOPLE[item_id].items()})
+                bindings.append(row)
+        return {"head": {"vars": ["item", "birthYear", "deathYear", "occupation"]}, "results": {"bindings": bindings}}
+
+    def summary(self, params):
+        title = params["titles"]
+        return {"query": {"pages": [{
+            "title": title,
+            "extract": f"{title} was a painter.\n\n{title} lived in Springfield.",
+            "thumbnail": {"source": f"https://upload.wikimedia.org/{title.replace(' ', '_')}.jpg"},
+        }]}}
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_api(monkeypatch, tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setattr(mediawiki_api, "MEDIAWIKI_API_URL", f"{base_url}/w/api.php")
+    monkeypatch.setattr(mediawiki_api, "WIKIDATA_SPARQL_URL", f"{base_url}/sparql")
+    monkeypatch.setattr(candidate_index, "INDEX_FILE", str(tmp_path / "candidate_index.sqlite3"))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_wikidata_ids_follow_normalization_and_redirects(stub_api):
+    ids = mediawiki_api.fetch_wikidata_ids(["ada Example", "Bob Example", "Springfield Mill", "No Such Page"])
+
+    assert ids == {"ada Example": "Q101", "Bob Example": "Q102", "Springfield Mill": "Q103"}
+    assert len(stub_api.requests) == 1
+
+
+def test_lookups_are_split_into_batches_of_50(stub_api):
+    titles = [f"Person {number}" for number in range(120)]
+    ids = mediawiki_api.fetch_wikidata_ids(titles)
+    facts = mediawiki_api.fetch_life_facts(sorted(ids.values()))
+
+    pageprops = [params["titles"].split("|") for path, params in stub_api.requests if path == "/w/api.php"]
+    sparql = [re.findall(r"wd:(Q\d+)", VALUES.search(params["query"]).group(1))
+              for path, params in stub_api.requests if path == "/sparql"]
+    assert [len(batch) for batch in pageprops] == [50, 50, 20]
+    assert [len(batch) for batch in sparql] == [50, 50, 20]
+    assert len(ids) == len(facts) == 120
+    assert facts["Q1000"] == {"is_human": True, "birth_year": 1900, "death_year": 1990, "occupation": None}
+
+
+def test_life_facts_mark_non_humans(stub_api):
+    facts = mediawiki_api.fetch_life_facts(["Q101", "Q102", "Q103"])
+
+    assert facts["Q101"] == {"is_human": True, "birth_year": 1880, "death_year": 1950, "occupation": "painter"}
+    assert facts["Q102"] == {"is_human": True, "birth_year": 1975, "death_year": None, "occupation": "actor"}
+    assert facts["Q103"]["is_human"] is False
+
+
+def test_find_deceased_person(stub_api):
+    urls = [
+        "https://en.wikipedia.org/wiki/Ada_Example",
+        "https://en.wikipedia.org/wiki/Bob_Example",
+        "https://en.wikipedia.org/wiki/Springfield_Mill",
+    ]
+    details, paragraphs, person_url = mediawiki_api.find_deceased_person(urls)
+
+    assert person_url == urls[0]
+    assert details == ("Ada Example", 1880, "1950", "Painter")
+    assert paragraphs == ["Ada Example was a painter.", "Ada Example lived in Springfield."]
+    # pageprops, SPARQL and the chosen person's text and image: three requests in all
+    assert [path for path, _ in stub_api.requests] == ["/w/api.php", "/sparql", "/w/api.php"]
+
+    assert candidate_index.get_verdict(urls[0])[0] is True
+    assert candidate_index.get_verdict(urls[1]) == (False, None, None)
+    assert candidate_index.get_verdict(urls[2]) == (False, None, None)
+    assert candidate_index.get_image(urls[0]) == (True, "https://upload.wikimedia.org/Ada_Example.jpg")
@@ -0,0 +1,25 @@
+"""
+Checks that parse_person_page reads the saved person pages in benchmarks/fixtures/person_pages
+the same way as the original full-tree path.
+"""
+import glob
+import os
+import pytest
+import wiki_parser
+from benchmarks.person_page_parsing import FIXTURE_DIR, compare
+
+PAGES = sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html")))
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_parse_person_page_matches_original(path):
+    with open(path, encoding="utf-8") as f:
+        assert compare(f.read()) == []
+
+
+def test_fixtures_cover_both_verdicts():
+    verdicts = set()
+    for path in PAGES:
+        with open(path, encoding="utf-8") as f:
+            verdicts.add(wiki_parser.parse_person_page(f.read())["is_deceased"])
+    assert verdicts == {True, False}
@@ -0,0 +1,109 @@
+"""
+EXPLAIN regression test for the hot lookups on conversations, ghosts and users.
+
+Applies the migrations to a scratch schema of the Postgres database in
+TEST_DATABASE_URL, seeds it with enough users, conversations and ghosts for the
+planner to prefer an index, and fails if a plan reads one of those tables with
+a sequential scan. Skipped when TEST_DATABASE_URL isn't set.
+
+    TEST_DATABASE_URL=postgresql://... python -m pytest tests/test_query_plans.py
+"""
+import json
+import os
+import pytest
+from sqlalchemy import create_engine, text
+from migrate import list_migrations
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCHEMA = f"query_plans_{os.getpid()}"
+
+USERS = 2_000
+CONVERSATIONS = 100_000
+GHOSTS = 20_000
+CITIES = 1_000
+
+pytestmark = pytest.mark.skipif(
+    not (TEST_DATABASE_URL or "").startswith("postgresql"), reason="TEST_DATABASE_URL is not a Postgres URL"
+)
+
+# The lookups as the routes send them: (description, SQL, parameters)
+QUERIES = [
+    ("/conversations first page",
+     "SELECT id, ghost_name, location, timestamp, ended_at, substr(chat_log, 1, 120) FROM conversations "
+     "WHERE user_id = :user_id ORDER BY timestamp DESC, id DESC LIMIT 21",
+     {"user_id": 42}),
+    ("/conversations next page",
+     "SELECT id, ghost_name, location, timestamp, ended_at, substr(chat_log, 1, 120) FROM conversations "
+     "WHERE user_id = :user_id AND (timestamp, id) < (now() - interval '1 day', :last_id) "
+     "ORDER BY timestamp DESC, id DESC LIMIT 21",
+     {"user_id": 42, "last_id": CONVERSATIONS // 2}),
+    ("/ghosts by city and state",
+     "SELECT * FROM ghosts WHERE city = :city AND state = :state",
+     {"city": "City 7", "state": "State 7"}),
+    ("add_ghost name lookup",
+     "SELECT * FROM ghosts WHERE name = :name LIMIT 1",
+     {"name": "Seed Ghost 77"}),
+    ("pooled ghost for /chat",
+     "SELECT * FROM ghosts WHERE city = :city AND state = :state AND pooled ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED",
+     {"city": "City 7", "state": "State 7"}),
+    ("/reset-password token lookup",
+     "SELECT * FROM users WHERE reset_token = :token LIMIT 1",
+     {"token": "abc"}),
+]
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.connect() as connection:
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        connection.execute(text(f"SET search_path TO {SCHEMA}"))
+        try:
+            for _, _, path in list_migrations():
+                with open(path) as f:
+                    connection.execution_options(no_parameters=True).exec_driver_sql(f.read())
+            seed(connection)
+            connection.commit()
+            yield connection
+        finally:
+            connection.rollback()
+            connection.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+            connection.commit()
+    engine.dispose()
+
+
+def seed(connection):
+    connection.execute(text(
+        "INSERT INTO users (username, email, password, reset_token) "
+        "SELECT 'seed_user_' || n, 'seed_user_' || n || '@example.com', 'x', "
+        "CASE WHEN n % 100 = 0 THEN md5(n::text) END FROM generate_series(1, :users) AS n"
+    ), {"users": USERS})
+    connection.execute(text(
+        "INSERT INTO conversations (user_id, ghost_name, location, timestamp, ended_at) "
+        "SELECT 1 + n % :users, 'Ghost ' || (n % 500), 'Spokane, Washington', "
+        "now() - (n || ' minutes')::interval, now() - (n || ' minutes')::interval "
+        "FROM generate_series(1, :conversations) AS n"
+    ), {"users": USERS, "conversations": CONVERSATIONS})
+    connection.execute(text(
+        "INSERT INTO ghosts (name, prompt, city, state, pooled) "
+        "SELECT 'Seed Ghost ' || n, 'prompt', 'City ' || (n % :cities), 'State ' || (n % :cities), n % 10 = 0 "
+        "FROM generate_series(1, :ghosts) AS n"
+    ), {"ghosts": GHOSTS, "cities": CITIES})
+    connection.execute(text("ANALYZE users; ANALYZE conversations; ANALYZE ghosts"))
+
+
+def seq_scans(plan):
+    """Yields the relations read by a sequential scan anywhere in a JSON plan tree."""
+    if plan["Node Type"] == "Seq Scan":
+        yield plan["Relation Name"]
+    for child in plan.get("Plans", []):
+        yield from seq_scans(child)
+
+
+@pytest.mark.parametrize("description, sql, params", QUERIES, ids=[query[0] for query in QUERIES])
+def test_no_seq_scan(connection, description, sql, params):
+    raw = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+    plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+
+    scanned = set(seq_scans(plan)) & {"conversations", "ghosts", "users"}
+    assert not scanned, f"{description} reads {', '.join(sorted(scanned))} with a Seq Scan"
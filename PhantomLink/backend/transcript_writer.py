@@ -0,0 +1,103 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from __init__ import app, db
+from transcripts import insert_ignoring_duplicates
+
+# Buffered messages are written at least this often (seconds)...
+FLUSH_INTERVAL = float(os.getenv("TRANSCRIPT_FLUSH_INTERVAL", "1"))
+# ...or as soon as this many are waiting
+BATCH_SIZE = int(os.getenv("TRANSCRIPT_BATCH_SIZE", "200"))
+# A batch that keeps failing is dropped after this many attempts (the session still has the chat)
+MAX_ATTEMPTS = 5
+
+_pending = []
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_flusher = {"pid": None, "thread": None}
+_metrics = {"queued": 0, "written": 0, "flushes": 0, "errors": 0, "dropped": 0, "flush_seconds": 0.0}
+
+
+def enqueue(conversation_id, messages):
+    """
+    Buffers messages for a saved conversation; a background thread inserts them in batches.
+
+    Args:
+        conversation_id (int): The conversation the messages belong to.
+        messages (list): (seq, role, content) tuples. Each seq is written at most once, so
+                         re-sending a message is harmless.
+    """
+    rows = [
+        {"conversation_id": conversation_id, "seq": seq, "role": role, "content": content, "created_at": datetime.utcnow()}
+        for seq, role, content in messages
+    ]
+    _ensure_flusher()
+    with _lock:
+        _pending.extend((row, 0) for row in rows)
+        _metrics["queued"] += len(rows)
+        full = len(_pending) >= BATCH_SIZE
+    if full:
+        _wakeup.set()
+
+
+def flush():
+    """Writes every buffered message now, in one transaction. Safe to call from any thread."""
+    with _lock:
+        batch = _pending[:]
+        del _pending[:]
+    if not batch:
+        return 0
+
+    start = time.perf_counter()
+    try:
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(insert_ignoring_duplicates(connection.dialect.name), [row for row, _ in batch])
+    except Exception as e:
+        print(f"Error writing {len(batch)} buffered messages: {e}")
+        retry = [(row, attempts + 1) for row, attempts in batch if attempts + 1 < MAX_ATTEMPTS]
+        with _lock:
+            _pending[:0] = retry
+            _metrics["errors"] += 1
+            _metrics["dropped"] += len(batch) - len(retry)
+        return 0
+
+    with _lock:
+        _metrics["written"] += len(batch)
+        _metrics["flushes"] += 1
+        _metrics["flush_seconds"] += time.perf_counter() - start
+    return len(batch)
+
+
+def _ensure_flusher():
+    """Starts this process's flush thread; a forked worker starts its own."""
+    pid = os.getpid()
+    if _flusher["pid"] == pid:
+        return
+    with _lock:
+        if _flusher["pid"] != pid:
+            thread = threading.Thread(target=_run, name="transcript-writer", daemon=True)
+            _flusher.update(pid=pid, thread=thread)
+            thread.start()
+
+
+def _run():
+    while True:
+        _wakeup.wait(FLUSH_INTERVAL)
+        _wakeup.clear()
+        flush()
+
+
+def get_metrics():
+    """Returns this worker's buffer size and write counters."""
+    with _lock:
+        metrics = dict(_metrics, pending=len(_pending))
+    metrics["avg_batch"] = round(metrics["written"] / metrics["flushes"], 2) if metrics["flushes"] else None
+    metrics["flush_seconds"] = round(metrics["flush_seconds"], 4)
+    return metrics
+
+
+# Write what's left when the worker shuts down cleanly
+atexit.register(flush)
@@ -0,0 +1,110 @@
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from __init__ import db
+from models import Message
+
+# Labels used when a transcript is shown as plain text
+SENDER_LABELS = {"user": "User", "assistant": "Ghost"}
+
+
+def append_messages(conversation_id, messages):
+    """
+    Appends user/assistant messages to a saved conversation in one INSERT.
+
+    The caller commits. Messages with other roles (e.g. the system prompt) are skipped.
+
+    Args:
+        conversation_id (int): The conversation to extend.
+        messages (list): OpenAI-style {"role", "content"} dicts, oldest first.
+
+    Returns:
+        int: The seq of the last stored message.
+    """
+    last_seq = db.session.query(func.max(Message.seq)).filter_by(conversation_id=conversation_id).scalar() or 0
+    now = datetime.utcnow()
+    rows = []
+    for message in messages:
+        if message["role"] in SENDER_LABELS:
+            last_seq += 1
+            rows.append({
+                "conversation_id": conversation_id,
+                "seq": last_seq,
+                "role": message["role"],
+                "content": message["content"],
+                "created_at": now,
+            })
+    if rows:
+        db.session.execute(Message.__table__.insert(), rows)
+    return last_seq
+
+
+def numbered_messages(conversation):
+    """Returns (seq, role, content) for the user/assistant messages of a session conversation."""
+    chat = [message for message in conversation if message["role"] in SENDER_LABELS]
+    return [(seq, message["role"], message["content"]) for seq, message in enumerate(chat, start=1)]
+
+
+def append_missing(conversation_id, conversation):
+    """
+    Stores the messages of a session conversation that aren't in the database yet.
+
+    Messages are matched by position and every seq that isn't stored is inserted, including
+    gaps left by write-behind batches that were never written. So this is safe to call after
+    the buffer has already stored part (or all) of the conversation. The caller commits.
+
+    Returns:
+        int: The seq of the last stored message.
+    """
+    stored = {seq for (seq,) in db.session.query(Message.seq).filter_by(conversation_id=conversation_id)}
+    now = datetime.utcnow()
+    rows = [
+        {"conversation_id": conversation_id, "seq": seq, "role": role, "content": content, "created_at": now}
+        for seq, role, content in numbered_messages(conversation)
+        if seq not in stored
+    ]
+    if rows:
+        # The write-behind flusher may store some of these rows at the same time
+        db.session.execute(insert_ignoring_duplicates(db.engine.dialect.name), rows)
+    return max(stored | {row["seq"] for row in rows}, default=0)
+
+
+def insert_ignoring_duplicates(dialect_name):
+    """Returns an INSERT into messages that skips rows whose (conversation_id, seq) is already stored."""
+    if dialect_name == "postgresql":
+        return pg_insert(Message.__table__).on_conflict_do_nothing()
+    return Message.__table__.insert().prefix_with("OR IGNORE")
+
+
+def get_messages(conversation_id):
+    """Returns a conversation's messages as {"role", "content"} dicts, oldest first."""
+    rows = (
+        Message.query.filter_by(conversation_id=conversation_id)
+        .with_entities(Message.role, Message.content)
+        .order_by(Message.seq)
+        .all()
+    )
+    return [{"role": role, "content": content} for role, content in rows]
+
+
+def render_chat_log(messages):
+    """Formats messages as the "User: ...\n\nGhost: ..." text shown in the chat history."""
+    return "\n\n".join(f"{SENDER_LABELS[message['role']]}: {message['content']}" for message in messages)
+
+
+def previews(conversation_ids, length):
+    """
+    Returns {conversation_id: preview} built from each conversation's first two messages.
+    """
+    if not conversation_ids:
+        return {}
+    rows = (
+        Message.query.filter(Message.conversation_id.in_(conversation_ids), Message.seq <= 2)
+        .with_entities(Message.conversation_id, Message.role, func.substr(Message.content, 1, length))
+        .order_by(Message.conversation_id, Message.seq)
+        .all()
+    )
+    grouped = {}
+    for conversation_id, role, content in rows:
+        grouped.setdefault(conversation_id, []).append({"role": role, "content": content})
+    return {conversation_id: render_chat_log(messages)[:length] for conversation_id, messages in grouped.items()}
@@ -0,0 +1,82 @@
+import re
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401  (only checks that the faster parser is installed)
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# Person pages only need the title, heading, infobox table and paragraphs
+PERSON_PAGE_TAGS = SoupStrainer(["title", "h1", "table", "p"])
+INFOBOX_ONLY = SoupStrainer("table", class_="infobox")
+
+
+def parse_html(html, parse_only=None):
+    """Parses HTML with lxml when it's installed, falling back to html.parser."""
+    return BeautifulSoup(html, PARSER, parse_only=parse_only)
+
+
+def parse_person_page(html):
+    """
+    Parses a Wikipedia person page in a single pass over its infobox and paragraphs.
+
+    Only the tags the scraper reads are kept in the tree, and the infobox rows are
+    walked once for the born/died/occupation fields and the portrait.
+
+    Args:
+        html (str): The page's HTML.
+
+    Returns:
+        dict: title, name, birth_year, death_year, occupation, image_url, paragraphs and
+              is_deceased (True when the infobox has non-empty Born and Died rows).
+    """
+    soup = parse_html(html, PERSON_PAGE_TAGS)
+
+    title_tag = soup.find("title")
+    heading = soup.find("h1", {"id": "firstHeading"})
+    page = {
+        "title": title_tag.get_text() if title_tag else None,
+        "name": heading.get_text() if heading else None,
+        "birth_year": None,
+        "death_year": None,
+        "occupation": None,
+        "image_url": None,
+        "paragraphs": [],
+        "is_deceased": False,
+    }
+
+    infobox = soup.find("table", class_="infobox")
+    if infobox:
+        born = died = None
+        for row in infobox.find_all("tr"):
+            if page["image_url"] is None:
+                image_tag = row.find("img")
+                if image_tag and image_tag.get("src"):
+                    page["image_url"] = f"https:{image_tag['src']}"
+
+            label = row.find("th")
+            value = row.find("td")
+            if not label or not value:
+                continue
+
+            label_text = label.get_text(strip=True)
+            if label_text == "Born" and born is None:
+                born = value.get_text(strip=True)
+                match = re.search(r"\d{4}", born)
+                page["birth_year"] = int(match.group(0)) if match else None
+            elif label_text == "Died" and died is None:
+                died = value.get_text(strip=True)
+                match = re.search(r"(\d{4})", value.text)
+                page["death_year"] = match.group(1) if match else None
+            elif label_text == "Occupation" and page["occupation"] is None:
+                page["occupation"] = value.get_text(strip=True)
+
+        page["is_deceased"] = bool(born and died)
+
+    for paragraph in soup.find_all("p"):
+        text = paragraph.get_text()
+        if text.strip():
+            page["paragraphs"].append(text)
+
+    return page
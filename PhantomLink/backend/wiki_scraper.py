@@ -1,21 +1,71 @@
 import requests
+import http_client
 from bs4 import BeautifulSoup
 import random
-import re
-
-def fetch_wikipedia_page(city, state):
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import candidate_index
+import mediawiki_api
+from keyed_lock import KeyedLock
+from wiki_parser import parse_html, parse_person_page
+
+# Number of candidate person pages probed at the same time
+PROBE_FANOUT = int(os.getenv("WIKI_PROBE_FANOUT", "4"))
+# "html" scrapes rendered pages; "api" uses the MediaWiki and Wikidata APIs
+WIKI_BACKEND = os.getenv("WIKI_BACKEND", "html")
+
+# Serializes probes of one person page within this process
+_probe_lock = KeyedLock()
+
+def fetch_wikipedia_page(city, state, exclude=()):
+    """
+    Finds a random deceased person from a city's "List of people from" page.
+
+    Pass the person URLs that are already taken as `exclude` (e.g. a city's pooled ghosts)
+    to get someone new.
+
+    Returns:
+        tuple: (details, paragraphs, person_url), or (None, [], None) if nobody qualifies.
+    """
     if not city or not state:
         print("Error: City or state is None.")
         return None, [], None  # Return None if city or state is not provided
 
+    # Once the index knows enough deceased people for a city, picks skip the network
+    cached = candidate_index.pick_deceased(city, state, exclude)
+    if cached:
+        print(f"Picked indexed deceased person for {city}, {state}: {cached[2]}")
+        return cached
+
+    candidates = candidate_index.get_candidates(city, state)
+    if candidates is not None:
+        # Until then, probe candidates that were never checked so the index keeps growing
+        result = find_candidate(candidate_index.get_unchecked_candidates(city, state), exclude)
+        if result[0] is None:
+            # Every candidate has been checked: settle for any known deceased person
+            result = candidate_index.pick_deceased(city, state, exclude, min_known=1) or result
+        return result
+
+    if WIKI_BACKEND == "api":
+        list_title = f"List of people from {city}, {state}"
+        try:
+            candidates = mediawiki_api.fetch_list_candidates(list_title)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"An error occurred while fetching {list_title} from the MediaWiki API: {e}")
+            candidates = None
+        if candidates is not None:
+            candidate_index.save_candidates(city, state, mediawiki_api.MEDIAWIKI_API_URL, candidates)
+            return find_candidate(candidates, exclude)
+
+    index_city, index_state = city, state
     city = city.replace(' ', '_')
     state = state.replace(' ', '_')
     url = f"https://en.wikipedia.org/wiki/List_of_people_from_{city},_{state}"
 
     try:
-        response = requests.get(url)
+        response = http_client.get(url)
         response.raise_for_status()
-        return fetch_and_parse_wikipedia_page(url)
+        return fetch_and_parse_wikipedia_page(url, index_city, index_state, html=response.text, exclude=exclude)
 
     except requests.exceptions.RequestException as e:
         # Perform a Google search if the Wikipedia page is not found
@@ -23,7 +73,7 @@ def fetch_wikipedia_page(city, state):
         google_search_url = f"https://www.google.com/search?q={query}"
 
         try:
-            search_response = requests.get(google_search_url, headers={"User-Agent": "Mozilla/5.0"})
+            search_response = http_client.get(google_search_url, headers={"User-Agent": "Mozilla/5.0"})
             search_response.raise_for_status()
 
             search_soup = BeautifulSoup(search_response.text, 'html.parser')
@@ -35,7 +85,7 @@ def fetch_wikipedia_page(city, state):
                 cleaned_link = first_wikipedia_link.split('&')[0].replace('/url?q=', '')
                 if cleaned_link.startswith('/wiki/'):
                     cleaned_link = f"https://en.wikipedia.org{cleaned_link}"
-                return fetch_and_parse_wikipedia_page(cleaned_link)
+                return fetch_and_parse_wikipedia_page(cleaned_link, index_city, index_state, exclude=exclude)
 
             else:
                 print(f"No Wikipedia results found for {city}, {state}.")
@@ -47,135 +97,223 @@ def fetch_wikipedia_page(city, state):
 
 
 
-def fetch_and_parse_wikipedia_page(url):
+def fetch_and_parse_wikipedia_page(url, city=None, state=None, html=None, exclude=()):
+    """
+    Scrapes a "List of people from" page and returns a random deceased person from it.
+
+    When city and state are given, the candidate list is stored in the candidate index
+    so later picks for the same city skip the list page. Pass the page's html if it was
+    already downloaded so it isn't fetched a second time. Candidates in `exclude` are
+    indexed but never picked.
+    """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+        if html is None:
+            response = http_client.get(url)
+            response.raise_for_status()
+            html = response.text
+        soup = parse_html(html)
         title = soup.find('title').get_text()
         print(f"Page Title: {title}")
 
-        notable_people = []
+        notable_people = extract_candidate_links(soup)
+        print(f"Found {len(notable_people)} candidate people")
 
-        for list_item in soup.find_all('a', href=True):
-            href = list_item['href']
-            if href.startswith('/wiki/') and ':' not in href and '#' not in href:
-                full_url = f"https://en.wikipedia.org{href}"
-                notable_people.append(full_url)
+        if city and state:
+            candidate_index.save_candidates(city, state, url, notable_people)
 
-        while notable_people:
-            random_person_url = random.choice(notable_people)
+        return find_candidate(notable_people, exclude)
 
-            try:
-                person_response = requests.get(random_person_url)
-                person_response.raise_for_status()
-                person_soup = BeautifulSoup(person_response.text, 'html.parser')
+    except requests.exceptions.RequestException as e:
+        print(f"An error occurred while fetching the Wikipedia page: {e}")
+        return None, [], None  # Return None in case of errors
 
-                if is_person_deceased(person_soup):
-                    person_title = person_soup.find('title').get_text()
-                    print(f"\nFound deceased person's Wikipedia page: {person_title}")
-                    print(f"URL: {random_person_url}")
 
-                    paragraphs = []
-                    for paragraph in person_soup.select('p'):
-                        if paragraph.get_text(strip=True):
-                            paragraphs.append(paragraph.get_text())
+def extract_candidate_links(soup):
+    """
+    Collects candidate person URLs from the list body of a "List of people from" page.
+
+    Only the first link of each list entry before the "See also"/"References" sections is
+    kept, duplicates are dropped and links that are obviously not people are skipped.
+
+    Args:
+        soup (BeautifulSoup): The parsed list page.
+
+    Returns:
+        list: Full Wikipedia URLs of the candidate people, in page order.
+    """
+    # The article body of a full page; action=parse output is the article body already
+    content = soup.select_one('#mw-content-text .mw-parser-output') or soup
+
+    candidates = []
+    seen = set()
+    for element in content.find_all(['h2', 'li'], recursive=True):
+        if element.name == 'h2':
+            headline = element.find(class_='mw-headline') or element
+            if headline.get_text(strip=True) in END_SECTIONS:
+                break
+            continue
+
+        # Skip entries that belong to navigation boxes, references or the table of contents
+        if element.find_parent(class_=NON_CONTENT_CLASSES) or element.find_parent(id='toc'):
+            continue
+
+        link = element.find('a', href=True)
+        if not link:
+            continue
+
+        href = link['href']
+        if not is_candidate_person_link(href) or href in seen:
+            continue
+
+        seen.add(href)
+        candidates.append(f"https://en.wikipedia.org{href}")
+
+    return candidates
+
+
+# Section headings that end the list body of a "List of people from" page
+END_SECTIONS = {"See also", "References", "Notes", "Further reading", "External links", "Sources"}
+
+# Containers whose links are never people from the list
+NON_CONTENT_CLASSES = ["navbox", "vertical-navbox", "reflist", "references", "toc", "sidebar", "hatnote", "metadata"]
+
+# Title fragments of articles that are clearly not about a person
+NON_PERSON_PREFIXES = ("List_of_", "Lists_of_", "Main_Page", "Timeline_of_", "History_of_", "Outline_of_")
+NON_PERSON_WORDS = (
+    "_County", "University", "College", "High_School", "_School", "Company", "Corporation",
+    "(band)", "(film)", "(album)", "(song)", "(TV_series)", "(newspaper)", "(magazine)", "(company)",
+)
+US_STATES = {
+    "Alabama", "Alaska", "Arizona", "Arkansas", "California", "Colorado", "Connecticut", "Delaware",
+    "Florida", "Georgia_(U.S._state)", "Hawaii", "Idaho", "Illinois", "Indiana", "Iowa", "Kansas",
+    "Kentucky", "Louisiana", "Maine", "Maryland", "Massachusetts", "Michigan", "Minnesota",
+    "Mississippi", "Missouri", "Montana", "Nebraska", "Nevada", "New_Hampshire", "New_Jersey",
+    "New_Mexico", "New_York_(state)", "North_Carolina", "North_Dakota", "Ohio", "Oklahoma", "Oregon",
+    "Pennsylvania", "Rhode_Island", "South_Carolina", "South_Dakota", "Tennessee", "Texas", "Utah",
+    "Vermont", "Virginia", "Washington_(state)", "West_Virginia", "Wisconsin", "Wyoming",
+    "Washington,_D.C.", "United_States", "United_Kingdom", "Canada", "Mexico",
+}
+
+
+def is_candidate_person_link(href):
+    """
+    Returns True if a Wikipedia href could point to an article about a person.
+    """
+    if not href.startswith('/wiki/') or ':' in href or '#' in href or '?' in href:
+        return False
+
+    title = href[len('/wiki/'):]
+    if title.startswith(NON_PERSON_PREFIXES) or title in US_STATES:
+        return False
+    if title.isdigit() or any(word in title for word in NON_PERSON_WORDS):
+        return False
+    # "City,_State" style place articles
+    if ',_' in title and not title.endswith(('Jr.', 'Sr.', 'II', 'III')):
+        return False
+
+    return True
+
+
+def find_candidate(candidate_urls, exclude=()):
+    """
+    Picks a deceased person from candidate URLs with the configured WIKI_BACKEND,
+    skipping the URLs in `exclude`.
+    """
+    if exclude:
+        excluded = set(exclude)
+        candidate_urls = [url for url in candidate_urls if url not in excluded]
+    if WIKI_BACKEND == "api":
+        return mediawiki_api.find_deceased_person(candidate_urls)
+    return find_deceased_person(candidate_urls)
+
+
+def find_deceased_person(candidate_urls, fanout=PROBE_FANOUT):
+    """
+    Probes random candidates, up to `fanout` at a time, and returns the first one that
+    is deceased. Probes that have not started yet are cancelled; probes
+    already in flight finish in the background and only record their verdicts.
+
+    Returns:
+        tuple: (details, paragraphs, person_url), or (None, [], None) if no candidate qualifies.
+    """
+    notable_people = list(candidate_urls)
+    random.shuffle(notable_people)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, fanout))
+    pending = {}
+    try:
+        while notable_people or pending:
+            while notable_people and len(pending) < max(1, fanout):
+                person_url = notable_people.pop()
+                pending[executor.submit(probe_person, person_url)] = person_url
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                person_url = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Error probing {person_url}: {e}")
+                    continue
+
+                if result:
+                    details, paragraphs = result
+                    return details, paragraphs, person_url
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print("No valid deceased pages found.")
+    return None, [], None  # Return None if no valid deceased people found
+
+
+def probe_person(person_url):
+    """
+    Checks whether a person page describes a deceased person, using the candidate index first.
+
+    Returns:
+        tuple: (details, paragraphs) for a deceased person, otherwise None.
+    """
+    verdict = candidate_index.get_verdict(person_url)
+    if verdict is None:
+        with _probe_lock(person_url):
+            # A probe of the same page still running from an earlier pick may have finished while we waited
+            verdict = candidate_index.get_verdict(person_url)
+            if verdict is None:
+                return _download_and_judge(person_url)
+
+    is_deceased, details, paragraphs = verdict
+    return (details, paragraphs) if is_deceased else None
+
+
+def _download_and_judge(person_url):
+    """Downloads a person page and records its verdict (and portrait) in the candidate index."""
+    try:
+        person_response = http_client.get(person_url)
+        person_response.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None
 
-                    # Return both extracted details and the paragraphs
-                    name, birth_year, death_year, occupation = extract_person_details(person_soup)
-                    return (name, birth_year, death_year, occupation), paragraphs, random_person_url
+    page = parse_person_page(person_response.text)
 
-                else:
-                    notable_people.remove(random_person_url)
+    if not page["is_deceased"]:
+        candidate_index.save_verdict(person_url, False)
+        return None
 
-            except requests.exceptions.RequestException:
-                notable_people.remove(random_person_url)
+    print(f"\nFound deceased person's Wikipedia page: {page['title']}")
+    print(f"URL: {person_url}")
+    print(f"NAME: {page['name']}, BORN: {page['birth_year']}, DIED: {page['death_year']}, OCCUPATION: {page['occupation']}")
 
-        if not notable_people:
-            print("No valid deceased pages found.")
-            return None, [], None  # Return None if no valid deceased people found
+    # Return both extracted details and the paragraphs
+    details = (page["name"], page["birth_year"], page["death_year"], page["occupation"])
+    paragraphs = page["paragraphs"]
+    candidate_index.save_verdict(person_url, True, details, paragraphs)
 
-    except requests.exceptions.RequestException as e:
-        print(f"An error occurred while fetching the Wikipedia page: {e}")
-        return None, [], None  # Return None in case of errors
+    # Keep the infobox image so add_ghost doesn't download this page again
+    candidate_index.save_image(person_url, page["image_url"])
+    return details, paragraphs
 
 
-def extract_person_details(person_soup):
-    try:
-        name = person_soup.find('h1', {'id': 'firstHeading'}).get_text()
-        print(f"NAME: {name}")
-
-        infobox = person_soup.find('table', {'class': 'infobox'})
-        birth_year = None
-        death_year = None
-        occupation = None  # Initialize occupation
-
-        if infobox:
-            birth_row = infobox.find('th', text='Born')
-            death_row = infobox.find('th', text='Died')
-            occupation_row = infobox.find('th', text='Occupation')  # Occupation row
-
-            if birth_row:
-                birth_date = birth_row.find_next('td').get_text(strip=True)
-                birth_year = extract_year_from_date(birth_date)
-                print(f"BIRTH YEAR: {birth_year}")
-
-            if death_row:
-                death_info = death_row.find_next('td')
-                if death_info:
-                    death_year_match = re.search(r'(\d{4})', death_info.text)
-                    if death_year_match:
-                        death_year = death_year_match.group(1)
-                        print(f"Death year: {death_year}")
-                    else:
-                        print("Death year not found in the death information.")
-
-            # Extract occupation if available
-            if occupation_row:
-                print("Occupation row found!")
-                occupation_info = occupation_row.find_next('td').get_text(strip=True)
-                occupation = occupation_info
-                print(f"Occupation: {occupation}")
-
-        else:
-            print("No infobox found.")
-
-        return name, birth_year, death_year, occupation
-
-    except Exception as e:
-        print(f"Error extracting details: {e}")
-        return None, None, None, None
-
-
-def extract_year_from_date(date_string):
-    match = re.search(r'\d{4}', date_string)
-    return int(match.group(0)) if match else None
-
-def send_to_gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs):
-    # Combine paragraphs into a single string
-    paragraphs_string = "\n".join(paragraphs)
-    
-    # Define the maximum allowed length (in characters)
-    max_length = 2000
-    
-    # Truncate the prompt if it's too long
-    limited_prompt = paragraphs_string[:max_length]
-    
+def send_to_gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs, wikipedia_url=None):
+    # The prompt builder trims the paragraphs to the prompt's token budget
     from gpt_prompt_maker import gpt_prompt_maker
-    gpt_prompt_maker(name, birth_year, death_year, occupation, limited_prompt)
-
-def is_person_deceased(person_soup):
-    infobox = person_soup.find('table', {'class': 'infobox'})
-    
-    if infobox:
-        born_row = infobox.find('th', text='Born')
-        died_row = infobox.find('th', text='Died')
-        
-        if born_row and died_row:
-            birth_date = born_row.find_next('td').get_text(strip=True)
-            death_date = died_row.find_next('td').get_text(strip=True)
-            
-            if birth_date and death_date:
-                return True
-
-    return False
+    return gpt_prompt_maker(name, birth_year, death_year, occupation, paragraphs, wikipedia_url)
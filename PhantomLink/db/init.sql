@@ -1,6 +1,9 @@
 -- Switch to the correct database
 \c phantomdb;
 
+-- Bootstraps a fresh database. Later schema changes and indexes live in
+-- backend/migrations and are applied by backend/migrate.py when the backend starts.
+
 -- Create Users table if it doesn't exist
 CREATE TABLE IF NOT EXISTS users (
   id SERIAL PRIMARY KEY,
@@ -19,8 +22,14 @@ CREATE TABLE IF NOT EXISTS ghosts (
   prompt TEXT NOT NULL,
   city VARCHAR(80),
   state VARCHAR(80),
-  image_url VARCHAR(200)
+  image_url VARCHAR(200),
+  details TEXT,                          -- JSON: birth_year, death_year, occupation, wikipedia_url
+  pooled BOOLEAN NOT NULL DEFAULT FALSE  -- Ready-made ghost not handed out by /chat yet
 );
+-- Existing databases: re-running this file adds the ghost pool columns
+ALTER TABLE ghosts ADD COLUMN IF NOT EXISTS details TEXT;
+ALTER TABLE ghosts ADD COLUMN IF NOT EXISTS pooled BOOLEAN NOT NULL DEFAULT FALSE;
+CREATE INDEX IF NOT EXISTS idx_ghosts_pool ON ghosts (city, state, id) WHERE pooled;
 
 -- Create Conversations table if it doesn't exist (without foreign key constraint on ghost_id)
 CREATE TABLE IF NOT EXISTS conversations (
@@ -32,6 +41,25 @@ CREATE TABLE IF NOT EXISTS conversations (
   timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP  -- Timestamp for the conversation
 );
 
+-- Background jobs that build a ghost prompt as soon as a location is shared
+CREATE TABLE IF NOT EXISTS ghost_jobs (
+  id SERIAL PRIMARY KEY,
+  kind VARCHAR(16) NOT NULL DEFAULT 'session',  -- session or pool
+  city VARCHAR(80) NOT NULL,
+  state VARCHAR(80) NOT NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'queued',  -- queued, running, done, failed
+  name VARCHAR(120),
+  prompt TEXT,
+  wikipedia_url VARCHAR(500),
+  error TEXT,
+  attempts INT NOT NULL DEFAULT 0,
+  created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  started_at TIMESTAMP,
+  finished_at TIMESTAMP
+);
+ALTER TABLE ghost_jobs ADD COLUMN IF NOT EXISTS kind VARCHAR(16) NOT NULL DEFAULT 'session';
+CREATE INDEX IF NOT EXISTS idx_ghost_jobs_status_id ON ghost_jobs (status, id);
+
 
 
 -- I want the conversations table to contain the users previous conversations to view. It should store the
@@ -38,6 +38,9 @@ const ChatHistory = () => {
   const [loggedIn, setLoggedIn] = useState(false);
   const [username, setUsername] = useState("");
   const [conversations, setConversations] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [chatLogs, setChatLogs] = useState({}); // Full transcripts, fetched when a card is expanded
   const [expandedConversation, setExpandedConversation] = useState(null);
 
   useEffect(() => {
@@ -62,12 +65,15 @@ const ChatHistory = () => {
     checkUserSession();
   }, [navigate]);
 
-  const fetchConversations = async () => {
+  // Loads one page of conversation summaries; pass the previous page's cursor to load the next one
+  const fetchConversations = async (cursor = null) => {
     try {
-      const res = await fetch(`${API_URL}/conversations`, { credentials: "include" });
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+      const res = await fetch(`${API_URL}/conversations${query}`, { credentials: "include" });
       if (res.ok) {
         const data = await res.json();
-        setConversations(data.conversations);
+        setConversations((prev) => (cursor ? [...prev, ...data.conversations] : data.conversations));
+        setNextCursor(data.next_cursor);
       } else {
         notification.error({ message: "Error", description: "Failed to load conversations." });
       }
@@ -95,8 +101,32 @@ const ChatHistory = () => {
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    await fetchConversations(nextCursor);
+    setLoadingMore(false);
+  };
+
+  const fetchChatLog = async (id) => {
+    try {
+      const res = await fetch(`${API_URL}/conversations/${id}`, { credentials: "include" });
+      if (res.ok) {
+        const data = await res.json();
+        setChatLogs((prev) => ({ ...prev, [id]: data.chat_log }));
+      } else {
+        notification.error({ message: "Error", description: "Failed to load the conversation." });
+      }
+    } catch (err) {
+      console.error("Error fetching conversation:", err);
+      notification.error({ message: "Error", description: "An unexpected error occurred." });
+    }
+  };
+
   const toggleExpansion = (id) => {
     setExpandedConversation((prev) => (prev === id ? null : id));
+    if (chatLogs[id] === undefined) {
+      fetchChatLog(id);
+    }
   };
 
   const dropdownMenu = (
@@ -162,17 +192,24 @@ const ChatHistory = () => {
               >
                 {expandedConversation === conversation.id ? (
                   <div className={styles.chatLogExpanded}>
-                    <ChatLog chatLog={conversation.chat_log} />
+                    <ChatLog chatLog={chatLogs[conversation.id] ?? conversation.preview} />
                   </div>
                 ) : (
                   <Paragraph ellipsis={{ rows: 3 }}>
-                    {conversation.chat_log}
+                    {conversation.preview}
                   </Paragraph>
                 )}
               </Card>
             ))
           )}
         </div>
+        {nextCursor && (
+          <Space style={{ marginTop: 16 }}>
+            <Button type="primary" loading={loadingMore} onClick={loadMore}>
+              Load more
+            </Button>
+          </Space>
+        )}
       </Content>
 
       <Footer className={styles.footer}>
@@ -9,6 +9,9 @@ const API_URL = process.env.REACT_APP_API_URL || "/api";
 const { Header, Content, Footer } = Layout;
 const { Title, Paragraph } = Typography;
 
+// Cached thumbnails are served by the backend ("/images/<hash>.webp"); other images are used as-is
+const ghostImageSrc = (imageUrl) => (imageUrl && imageUrl.startsWith("/images/") ? `${API_URL}${imageUrl}` : imageUrl);
+
 const useIsMobile = () => {
   const [isMobile, setIsMobile] = useState(window.innerWidth < 720);
   useEffect(() => {
@@ -215,7 +218,7 @@ const GhostsInYourArea = () => {
                   <Card
                     hoverable
                     className={styles.card}
-                    cover={<div className={styles.ghostImage}><img alt={ghost.name} src={ghost.image_url} /></div>}
+                    cover={<div className={styles.ghostImage}><img alt={ghost.name} src={ghostImageSrc(ghost.image_url)} loading="lazy" /></div>}
                   >
                     <Card.Meta title={ghost.name} description={`City: ${ghost.city}`} />
                     <Button